@@ -6,6 +6,10 @@ import { fileURLToPath } from 'url';
 const __filename = fileURLToPath(import.meta.url);
 const __dirname = path.dirname(__filename);
 
+// Placeholder silence when no TTS engine is used
+const FALLBACK_SAMPLE_RATE = 22050;
+const FALLBACK_DURATION = 2; // seconds
+
 /**
  * Generate TTS audio from text
  */
@@ -25,16 +29,18 @@ export async function generateTTS({ text, agentId, language = 'he' }) {
  */
 async function generateWithCoquiTTS(text, agentId, language) {
 	try {
+		// WAV bytes in the body; the endpoint takes its arguments as query params
 		const response = await axios.post(
 			`${
 				process.env.PYTHON_SERVICES_URL || 'http://localhost:8000'
-			}/generate-tts`,
-			{
-				text,
-				language,
-				voice: getHebrewVoice(language),
-			},
+			}/generate-tts/audio`,
+			null,
 			{
+				params: {
+					text,
+					language,
+					voice: getHebrewVoice(language),
+				},
 				timeout: 30000,
 				responseType: 'arraybuffer',
 			}
@@ -54,12 +60,16 @@ async function generateWithCoquiTTS(text, agentId, language) {
 		// Save audio file
 		await fs.writeFile(audioPath, response.data);
 
-		// Get audio duration (simplified)
-		const duration = estimateAudioDuration(text);
+		// Exact length of what the Python service synthesized
+		const { duration, sampleRate, numSamples } = readWavInfo(
+			Buffer.from(response.data)
+		);
 
 		return {
 			audioUrl: `/uploads/audio/${audioId}.wav`,
 			duration,
+			sampleRate,
+			numSamples,
 			provider: 'coqui',
 		};
 	} catch (error) {
@@ -73,16 +83,18 @@ async function generateWithCoquiTTS(text, agentId, language) {
  */
 async function generateWithPiperTTS(text, agentId, language) {
 	try {
+		// WAV bytes in the body; the endpoint takes its arguments as query params
 		const response = await axios.post(
 			`${
 				process.env.PYTHON_SERVICES_URL || 'http://localhost:8000'
-			}/generate-tts`,
-			{
-				text,
-				language,
-				voice: getPiperVoice(language),
-			},
+			}/generate-tts/audio`,
+			null,
 			{
+				params: {
+					text,
+					language,
+					voice: getPiperVoice(language),
+				},
 				timeout: 30000,
 				responseType: 'arraybuffer',
 			}
@@ -102,12 +114,16 @@ async function generateWithPiperTTS(text, agentId, language) {
 		// Save audio file
 		await fs.writeFile(audioPath, response.data);
 
-		// Get audio duration (simplified)
-		const duration = estimateAudioDuration(text);
+		// Exact length of what the Python service synthesized
+		const { duration, sampleRate, numSamples } = readWavInfo(
+			Buffer.from(response.data)
+		);
 
 		return {
 			audioUrl: `/uploads/audio/${audioId}.wav`,
 			duration,
+			sampleRate,
+			numSamples,
 			provider: 'piper',
 		};
 	} catch (error) {
@@ -133,9 +149,9 @@ async function generateFallbackTTS(text, agentId) {
 		await fs.mkdir(path.dirname(audioPath), { recursive: true });
 
 		// Create a simple WAV file header (44 bytes) + silence
-		const duration = estimateAudioDuration(text);
-		const sampleRate = 22050;
-		const numSamples = Math.floor(duration * sampleRate);
+		const sampleRate = FALLBACK_SAMPLE_RATE;
+		const numSamples = Math.round(FALLBACK_DURATION * sampleRate);
+		const duration = numSamples / sampleRate;
 		const buffer = Buffer.alloc(44 + numSamples * 2); // 16-bit audio
 
 		// WAV header
@@ -161,6 +177,8 @@ async function generateFallbackTTS(text, agentId) {
 		return {
 			audioUrl: `/uploads/audio/${audioId}.wav`,
 			duration,
+			sampleRate,
+			numSamples,
 			provider: 'fallback',
 		};
 	} catch (error) {
@@ -196,16 +214,44 @@ function getPiperVoice(language) {
 }
 
 /**
- * Estimate audio duration based on text length
+ * Read sample rate, sample count and duration from a PCM WAV buffer
  */
-function estimateAudioDuration(text) {
-	// Rough estimation: ~150 words per minute for Hebrew
-	const wordsPerMinute = 150;
-	const wordCount = text.split(/\s+/).length;
-	const durationInMinutes = wordCount / wordsPerMinute;
-
-	// Minimum 2 seconds, maximum 30 seconds
-	return Math.max(2, Math.min(30, durationInMinutes * 60));
+function readWavInfo(buffer) {
+	if (
+		buffer.length < 12 ||
+		buffer.toString('ascii', 0, 4) !== 'RIFF' ||
+		buffer.toString('ascii', 8, 12) !== 'WAVE'
+	) {
+		throw new Error('TTS response is not a WAV file');
+	}
+
+	let sampleRate = null;
+	let blockAlign = null;
+	let offset = 12;
+
+	// Walk the chunks instead of assuming a 44-byte header
+	while (offset + 8 <= buffer.length) {
+		const chunkId = buffer.toString('ascii', offset, offset + 4);
+		const chunkSize = buffer.readUInt32LE(offset + 4);
+		const body = offset + 8;
+
+		if (chunkId === 'fmt ') {
+			sampleRate = buffer.readUInt32LE(body + 4);
+			blockAlign = buffer.readUInt16LE(body + 12);
+		} else if (chunkId === 'data') {
+			if (!sampleRate || !blockAlign) {
+				break;
+			}
+			// Streamed headers carry an open-ended size, so trust the bytes we got
+			const dataSize = Math.min(chunkSize, buffer.length - body);
+			const numSamples = Math.floor(dataSize / blockAlign);
+			return { sampleRate, numSamples, duration: numSamples / sampleRate };
+		}
+
+		offset = body + chunkSize + (chunkSize % 2);
+	}
+
+	throw new Error('TTS response has no WAV format or data chunk');
 }
 
 /**
@@ -0,0 +1,81 @@
+"""
+Whole-clip audio feature extraction for lip sync
+Computes a framed STFT, energy and dominant frequency for every video frame in one pass
+"""
+import numpy as np
+
+DEFAULT_SAMPLE_RATE = 22050
+DEFAULT_FRAME_RATE = 25
+DEFAULT_WINDOW_SIZE = 1024
+
+# Frames processed per FFT call, bounds the temporary spectrum size on long clips
+BLOCK_FRAMES = 256
+
+
+def count_frames(num_samples: int, sample_rate: int = DEFAULT_SAMPLE_RATE,
+                 frame_rate: int = DEFAULT_FRAME_RATE) -> int:
+    """Number of video frames covering the given number of audio samples"""
+    return int(num_samples / sample_rate * frame_rate)
+
+
+def frame_audio(audio_data, sample_rate: int = DEFAULT_SAMPLE_RATE,
+                frame_rate: int = DEFAULT_FRAME_RATE,
+                window_size: int = DEFAULT_WINDOW_SIZE):
+    """
+    Build a (num_frames, window_size) view of analysis windows centred on each frame.
+    Returns the windows and the number of real (non-padding) samples in each one.
+    """
+    audio_data = np.asarray(audio_data, dtype=np.float32)
+    if audio_data.ndim > 1:
+        # Mix down multi-channel audio
+        audio_data = audio_data.mean(axis=1)
+
+    num_frames = count_frames(len(audio_data), sample_rate, frame_rate)
+    half = window_size // 2
+
+    # Zero padding lets edge windows share the same shape as the rest
+    padded = np.pad(audio_data, (half, half))
+    windows = np.lib.stride_tricks.sliding_window_view(padded, window_size)
+
+    centers = (np.arange(num_frames) * sample_rate / frame_rate).astype(np.int64)
+    frames = windows[centers]
+
+    starts = np.maximum(centers - half, 0)
+    ends = np.minimum(centers + half, len(audio_data))
+    valid = np.maximum(ends - starts, 1)
+
+    return frames, valid
+
+
+def extract_audio_features(audio_data, sample_rate: int = DEFAULT_SAMPLE_RATE,
+                           frame_rate: int = DEFAULT_FRAME_RATE,
+                           window_size: int = DEFAULT_WINDOW_SIZE):
+    """
+    Compute per-frame audio features for the whole clip.
+    Returns a dict of NumPy arrays, one entry per video frame.
+    """
+    frames, valid = frame_audio(audio_data, sample_rate, frame_rate, window_size)
+    num_frames = len(frames)
+    num_bins = window_size // 2 + 1
+
+    spectrum = np.empty((num_frames, num_bins), dtype=np.float32)
+    for start in range(0, num_frames, BLOCK_FRAMES):
+        block = frames[start:start + BLOCK_FRAMES]
+        spectrum[start:start + len(block)] = np.abs(np.fft.rfft(block, axis=1))
+
+    # Normalised frequency (cycles per sample) of the strongest bin
+    freqs = np.fft.rfftfreq(window_size).astype(np.float32)
+    dominant_freq = freqs[np.argmax(spectrum, axis=1)] if num_frames else np.zeros(0, np.float32)
+
+    energy = np.abs(frames).sum(axis=1) / valid
+    rms = np.sqrt(np.square(frames).sum(axis=1) / valid)
+
+    return {
+        'times': np.arange(num_frames, dtype=np.float32) / frame_rate,
+        'energy': energy.astype(np.float32),
+        'rms': rms.astype(np.float32),
+        'dominant_freq': dominant_freq,
+        'spectrum': spectrum,
+        'sample_rate': sample_rate,
+        'frame_rate': frame_rate,
+    }
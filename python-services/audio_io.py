@@ -0,0 +1,213 @@
+"""
+Audio I/O helpers
+Reads duration and sample rate from WAV/FLAC headers without decoding,
+reads PCM through mmap (WAV) or block-wise through soundfile, and only resamples when needed
+"""
+import os
+import struct
+
+import numpy as np
+
+try:
+    import soundfile as sf
+    SOUNDFILE_AVAILABLE = True
+except ImportError:
+    SOUNDFILE_AVAILABLE = False
+
+WAVE_FORMAT_PCM = 0x0001
+WAVE_FORMAT_IEEE_FLOAT = 0x0003
+WAVE_FORMAT_EXTENSIBLE = 0xFFFE
+
+READ_BLOCK_FRAMES = 65536
+
+
+def _parse_wav_header(f, file_size):
+    """Walk the RIFF chunks up to the data chunk"""
+    riff, _, wave = struct.unpack('<4sI4s', f.read(12))
+    if riff != b'RIFF' or wave != b'WAVE':
+        raise ValueError("Not a RIFF/WAVE file")
+
+    fmt = None
+    while True:
+        header = f.read(8)
+        if len(header) < 8:
+            raise ValueError("WAV file has no data chunk")
+        chunk_id, chunk_size = struct.unpack('<4sI', header)
+
+        if chunk_id == b'fmt ':
+            body = f.read(chunk_size)
+            audio_format, channels, sample_rate, _, block_align, bits = struct.unpack('<HHIIHH', body[:16])
+            if audio_format == WAVE_FORMAT_EXTENSIBLE and len(body) >= 26:
+                # Real format code is the first two bytes of the SubFormat GUID
+                audio_format = struct.unpack('<H', body[24:26])[0]
+            fmt = (audio_format, channels, sample_rate, block_align, bits)
+            f.seek(chunk_size % 2, os.SEEK_CUR)
+        elif chunk_id == b'data':
+            if fmt is None:
+                raise ValueError("WAV data chunk before fmt chunk")
+            data_offset = f.tell()
+            # Streaming writers leave the size unset, fall back to the end of the file
+            data_size = min(chunk_size, file_size - data_offset)
+            return fmt, data_offset, data_size
+        else:
+            f.seek(chunk_size + chunk_size % 2, os.SEEK_CUR)
+
+
+def _probe_wav(audio_path):
+    with open(audio_path, 'rb') as f:
+        (audio_format, channels, sample_rate, block_align, bits), data_offset, data_size = \
+            _parse_wav_header(f, os.fstat(f.fileno()).st_size)
+
+    frames = data_size // block_align if block_align else 0
+    return {
+        'format': 'WAV',
+        'sample_rate': sample_rate,
+        'channels': channels,
+        'frames': frames,
+        'duration': frames / sample_rate if sample_rate else 0.0,
+        'audio_format': audio_format,
+        'bits_per_sample': bits,
+        'data_offset': data_offset,
+        'data_size': data_size
+    }
+
+
+def _probe_flac(audio_path):
+    with open(audio_path, 'rb') as f:
+        if f.read(4) != b'fLaC':
+            raise ValueError("Not a FLAC file")
+        # First metadata block is always STREAMINFO
+        block_header = f.read(4)
+        if block_header[0] & 0x7F != 0:
+            raise ValueError("FLAC file is missing STREAMINFO")
+        streaminfo = f.read(34)
+
+    # 20 bits sample rate, 3 bits channels-1, 5 bits bits-per-sample-1, 36 bits total samples
+    packed = int.from_bytes(streaminfo[10:18], 'big')
+    sample_rate = packed >> 44
+    channels = ((packed >> 41) & 0x7) + 1
+    bits = ((packed >> 36) & 0x1F) + 1
+    frames = packed & 0xFFFFFFFFF
+
+    return {
+        'format': 'FLAC',
+        'sample_rate': sample_rate,
+        'channels': channels,
+        'frames': frames,
+        'duration': frames / sample_rate if sample_rate else 0.0,
+        'bits_per_sample': bits
+    }
+
+
+def probe_audio(audio_path):
+    """Read sample rate, channel count, frame count and duration from the file header"""
+    with open(audio_path, 'rb') as f:
+        magic = f.read(4)
+
+    if magic == b'RIFF':
+        return _probe_wav(audio_path)
+    if magic == b'fLaC':
+        return _probe_flac(audio_path)
+
+    if SOUNDFILE_AVAILABLE:
+        info = sf.info(audio_path)
+        return {
+            'format': info.format,
+            'sample_rate': info.samplerate,
+            'channels': info.channels,
+            'frames': info.frames,
+            'duration': info.frames / info.samplerate if info.samplerate else 0.0
+        }
+
+    raise ValueError(f"Unsupported audio format: {audio_path}")
+
+
+def get_audio_duration(audio_path) -> float:
+    """Audio duration in seconds from the file header"""
+    return probe_audio(audio_path)['duration']
+
+
+def resample(audio, source_rate, target_rate):
+    """Resample mono audio; a no-op when the rates already match"""
+    if source_rate == target_rate:
+        return audio
+
+    try:
+        import librosa
+        return librosa.resample(audio, orig_sr=source_rate, target_sr=target_rate).astype(np.float32)
+    except ImportError:
+        return resample_linear(audio, source_rate, target_rate)
+
+
+def resample_linear(audio, source_rate, target_rate):
+    """Linear-interpolation resampling, cheap and dependency-free"""
+    if source_rate == target_rate:
+        return np.asarray(audio, dtype=np.float32)
+    duration = len(audio) / source_rate
+    target_len = int(round(duration * target_rate))
+    positions = np.arange(target_len) * (source_rate / target_rate)
+    return np.interp(positions, np.arange(len(audio)), audio).astype(np.float32)
+
+
+def _read_wav_mmap(audio_path, info):
+    """Map the data chunk of an uncompressed WAV and convert it to float32 in one pass"""
+    audio_format = info['audio_format']
+    bits = info['bits_per_sample']
+
+    if audio_format == WAVE_FORMAT_PCM and bits == 16:
+        dtype, scale = np.dtype('<i2'), 1.0 / 32768
+    elif audio_format == WAVE_FORMAT_PCM and bits == 32:
+        dtype, scale = np.dtype('<i4'), 1.0 / 2147483648
+    elif audio_format == WAVE_FORMAT_IEEE_FLOAT and bits == 32:
+        dtype, scale = np.dtype('<f4'), None
+    else:
+        return None
+
+    samples = info['frames'] * info['channels']
+    if samples == 0:
+        return np.zeros((0, info['channels']), dtype=np.float32)
+
+    data = np.memmap(audio_path, dtype=dtype, mode='r', offset=info['data_offset'], shape=(samples,))
+    data = data.reshape(-1, info['channels'])
+
+    if scale is None:
+        return np.array(data, dtype=np.float32)
+    return data.astype(np.float32) * np.float32(scale)
+
+
+def _read_soundfile_blocks(audio_path, block_frames):
+    """Decode block by block into a preallocated float32 buffer"""
+    with sf.SoundFile(audio_path) as f:
+        audio = np.empty((f.frames, f.channels), dtype=np.float32)
+        position = 0
+        while position < f.frames:
+            count = min(block_frames, f.frames - position)
+            read = f.read(out=audio[position:position + count])
+            if len(read) == 0:
+                break
+            position += len(read)
+        return audio[:position]
+
+
+def read_audio(audio_path, target_rate=None, mono=True, block_frames=READ_BLOCK_FRAMES):
+    """
+    Read audio as float32 and return (audio, sample_rate).
+    Resampling only happens when target_rate differs from the file's own rate.
+    """
+    info = probe_audio(audio_path)
+
+    audio = _read_wav_mmap(audio_path, info) if info['format'] == 'WAV' else None
+    if audio is None:
+        if not SOUNDFILE_AVAILABLE:
+            raise ValueError(f"Cannot decode {audio_path} without soundfile")
+        audio = _read_soundfile_blocks(audio_path, block_frames)
+
+    if mono:
+        audio = audio[:, 0] if audio.shape[1] == 1 else audio.mean(axis=1, dtype=np.float32)
+
+    sample_rate = info['sample_rate']
+    if target_rate and target_rate != sample_rate:
+        audio = resample(np.ascontiguousarray(audio), sample_rate, target_rate)
+        sample_rate = target_rate
+
+    return audio, sample_rate
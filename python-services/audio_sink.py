@@ -0,0 +1,147 @@
+"""
+Audio sink for synthesized speech
+Writes whole NumPy buffers as 16-bit PCM WAV in bulk, to a file or to an in-memory
+buffer that can be returned directly in an HTTP response.
+Internally TTS audio is mono float32 at the engine's own sample rate; every result
+carries its exact sample count, rate and duration
+"""
+import io
+import struct
+
+import numpy as np
+
+SAMPLE_WIDTH = 2  # 16-bit PCM
+PCM_FORMAT = 'pcm_s16le'
+
+# RIFF/data sizes for streams whose length is not known up front
+STREAMING_DATA_SIZE = 0xFFFFFFFF
+
+WAV_HEADER_SIZE = 44
+
+
+def wav_header(sample_rate, channels=1, num_frames=None):
+    """16-bit PCM WAV header; num_frames=None writes open-ended sizes for streaming"""
+    block_align = channels * SAMPLE_WIDTH
+    if num_frames is None:
+        riff_size = data_size = STREAMING_DATA_SIZE
+    else:
+        data_size = num_frames * block_align
+        riff_size = WAV_HEADER_SIZE - 8 + data_size
+
+    return (
+        struct.pack('<4sI4s', b'RIFF', riff_size, b'WAVE')
+        + struct.pack('<4sIHHIIHH', b'fmt ', 16, 1, channels, sample_rate,
+                      sample_rate * block_align, block_align, SAMPLE_WIDTH * 8)
+        + struct.pack('<4sI', b'data', data_size)
+    )
+
+
+def to_float32_mono(audio):
+    """Any engine output (float64, int16, (n, channels)) to contiguous mono float32 in [-1, 1]"""
+    audio = np.asarray(audio)
+    if audio.dtype == np.int16:
+        audio = audio.astype(np.float32) * np.float32(1.0 / 32768)
+    if audio.ndim == 2:
+        audio = audio[:, 0] if audio.shape[1] == 1 else audio.mean(axis=1)
+    return np.ascontiguousarray(audio.reshape(-1), dtype=np.float32)
+
+
+def audio_info(audio, sample_rate):
+    """Exact sample count, rate and duration of a mono buffer"""
+    samples = len(audio)
+    return {
+        'samples': samples,
+        'sample_rate': sample_rate,
+        'duration': samples / sample_rate if sample_rate else 0.0
+    }
+
+
+def to_pcm16(audio):
+    """Float audio in [-1, 1] (or int16 samples) to little-endian 16-bit PCM bytes"""
+    audio = np.asarray(audio)
+    if audio.dtype == np.int16:
+        return audio.astype('<i2', copy=False).tobytes()
+
+    pcm = np.clip(audio.astype(np.float32, copy=False), -1.0, 1.0) * 32767
+    return pcm.astype('<i2').tobytes()
+
+
+class WavSink:
+    """Writes NumPy audio buffers to a WAV file, or to memory when no path is given"""
+
+    def __init__(self, output_path=None, sample_rate=22050, channels=1):
+        self.output_path = output_path
+        self.sample_rate = sample_rate
+        self.channels = channels
+        self.frame_count = 0
+
+        self.file = open(output_path, 'wb') if output_path else io.BytesIO()
+        # Placeholder header, rewritten with the real sizes on close
+        self.file.write(wav_header(sample_rate, channels, 0))
+
+    def write(self, audio):
+        """Append a whole buffer of samples in one write"""
+        audio = np.asarray(audio)
+        if audio.ndim == 1 and self.channels > 1:
+            raise ValueError(f"Expected {self.channels} channels, got mono audio")
+
+        self.file.write(to_pcm16(audio))
+        self.frame_count += len(audio)
+
+    def write_silence(self, duration):
+        self.write(np.zeros(int(self.sample_rate * duration), dtype=np.int16))
+
+    @property
+    def duration(self):
+        return self.frame_count / self.sample_rate
+
+    def info(self):
+        """Sample count, rate, duration and format of what has been written"""
+        return {
+            'samples': self.frame_count,
+            'sample_rate': self.sample_rate,
+            'channels': self.channels,
+            'duration': self.duration,
+            'format': PCM_FORMAT
+        }
+
+    def close(self):
+        """Finalize the header; returns the WAV bytes for in-memory sinks"""
+        if self.file.closed:
+            return None
+
+        self.file.seek(0)
+        self.file.write(wav_header(self.sample_rate, self.channels, self.frame_count))
+
+        if self.output_path:
+            self.file.close()
+            return None
+
+        data = self.file.getvalue()
+        self.file.close()
+        return data
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+        return False
+
+
+def write_wav(output_path, audio, sample_rate):
+    """Write a complete buffer to a WAV file and return its info"""
+    audio = np.asarray(audio)
+    channels = 1 if audio.ndim == 1 else audio.shape[1]
+    with WavSink(output_path, sample_rate, channels) as sink:
+        sink.write(audio)
+    return sink.info()
+
+
+def encode_wav(audio, sample_rate):
+    """Encode a complete buffer as WAV bytes in memory"""
+    audio = np.asarray(audio)
+    channels = 1 if audio.ndim == 1 else audio.shape[1]
+    sink = WavSink(None, sample_rate, channels)
+    sink.write(audio)
+    return sink.close()
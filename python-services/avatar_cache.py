@@ -0,0 +1,231 @@
+"""
+Photo-hash deduplication cache for avatar generation
+Generated avatars are keyed by the photo's content hash plus base_avatar_id and description.
+A perceptual hash (64-bit dHash) can also match re-encoded or resized copies, but only when enabled:
+it captures overall layout only, so different people on the same backdrop can collide.
+Entries are small JSON records in sharded directories, kept under an entry budget with LRU eviction.
+Evicting or invalidating an entry only forgets the mapping, the avatar files stay in place
+"""
+import hashlib
+import json
+import os
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from pathlib import Path
+
+import cv2
+import numpy as np
+
+DEFAULT_MAX_ENTRIES = int(os.getenv('AVATAR_CACHE_MAX_ENTRIES', 1024))
+# Max differing dHash bits for two photos to count as the same; negative (the default) means exact matches only
+DEFAULT_PHASH_DISTANCE = int(os.getenv('AVATAR_CACHE_PHASH_DISTANCE', -1))
+
+# Bump when the avatar pipeline output changes so old entries are not reused
+CACHE_FORMAT_VERSION = 1
+
+HASH_BLOCK_SIZE = 1024 * 1024
+DHASH_SIZE = 8
+
+
+def content_hash(photo_path):
+    """SHA-256 of the photo bytes, read in blocks"""
+    digest = hashlib.sha256()
+    with open(photo_path, 'rb') as f:
+        for block in iter(lambda: f.read(HASH_BLOCK_SIZE), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def perceptual_hash(photo_path):
+    """64-bit difference hash of a 1/8-scale grayscale decode, as 16 hex digits"""
+    image = cv2.imread(photo_path, cv2.IMREAD_REDUCED_GRAYSCALE_8)
+    if image is None:
+        raise ValueError("Could not load image")
+    small = cv2.resize(image, (DHASH_SIZE + 1, DHASH_SIZE), interpolation=cv2.INTER_AREA)
+    bits = (small[:, 1:] > small[:, :-1]).ravel()
+    return f'{int(np.packbits(bits).view(">u8")[0]):016x}'
+
+
+def hamming_distance(first, second):
+    return bin(int(first, 16) ^ int(second, 16)).count('1')
+
+
+def normalize_description(description):
+    return ' '.join(description.split()) if description else None
+
+
+class AvatarCache:
+    """Maps photos (exact or near-duplicate) plus generation options to generated avatars"""
+
+    def __init__(self, root_dir, max_entries=DEFAULT_MAX_ENTRIES, phash_distance=DEFAULT_PHASH_DISTANCE):
+        self.root_dir = Path(root_dir)
+        self.max_entries = max_entries
+        self.phash_distance = phash_distance
+        self.lock = threading.Lock()
+
+        self.entries = OrderedDict()  # key -> record, least recently used first
+        self.hits = 0
+        self.perceptual_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+        self.root_dir.mkdir(parents=True, exist_ok=True)
+        self._load_index()
+
+    def _load_index(self):
+        """Rebuild the LRU order from the records already on disk"""
+        found = []
+        for record_path in self.root_dir.glob('*/*.json'):
+            try:
+                with open(record_path, encoding='utf-8') as f:
+                    record = json.load(f)
+                found.append((record_path.stat().st_mtime, record_path.stem, record))
+            except (OSError, ValueError):
+                continue
+
+        for _, key, record in sorted(found, key=lambda item: item[0]):
+            self.entries[key] = record
+
+    def make_key(self, photo_hash, base_avatar_id, description):
+        """Cache key for one photo with one set of generation options"""
+        payload = json.dumps(
+            [CACHE_FORMAT_VERSION, photo_hash, base_avatar_id, normalize_description(description)],
+            ensure_ascii=False
+        )
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+    def record_path(self, key):
+        return self.root_dir / key[:2] / f'{key}.json'
+
+    def _find(self, key, phash, base_avatar_id, description):
+        """Exact key first, then the closest perceptual match with the same options (caller holds the lock)"""
+        if key in self.entries:
+            return key, False
+        if self.phash_distance < 0 or phash is None:
+            return None, False
+
+        description = normalize_description(description)
+        best, best_distance = None, self.phash_distance + 1
+        for candidate, record in self.entries.items():
+            if record['base_avatar_id'] != base_avatar_id or record['description'] != description:
+                continue
+            if record['phash'] is None:
+                continue
+            distance = hamming_distance(record['phash'], phash)
+            if distance < best_distance:
+                best, best_distance = candidate, distance
+        return best, best is not None
+
+    def get(self, key, phash, base_avatar_id, description):
+        """Return the cached avatar for this photo and options, or None"""
+        with self.lock:
+            match, perceptual = self._find(key, phash, base_avatar_id, description)
+            record = self.entries.get(match) if match else None
+
+        # The avatar files may have been removed behind the cache's back
+        if record and not all(os.path.exists(path) for path in record.get('files', [])):
+            self.invalidate(match)
+            record = None
+
+        with self.lock:
+            if record is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self.perceptual_hits += perceptual
+            self.entries.move_to_end(match)
+
+        try:
+            # Touch so LRU order survives restarts
+            os.utime(self.record_path(match))
+        except OSError:
+            pass
+
+        return {**record['result'], 'cached': True, 'cache_match': 'perceptual' if perceptual else 'exact'}
+
+    def put(self, key, photo_hash, phash, base_avatar_id, description, result, files=()):
+        """Remember a generated avatar; files are the local paths its URLs point to"""
+        result = {name: value for name, value in result.items() if name not in ('cached', 'cache_match')}
+        record = {
+            'photo_hash': photo_hash,
+            'phash': phash,
+            'base_avatar_id': base_avatar_id,
+            'description': normalize_description(description),
+            'result': result,
+            'files': [str(path) for path in files],
+            'created_at': time.time()
+        }
+
+        record_path = self.record_path(key)
+        record_path.parent.mkdir(parents=True, exist_ok=True)
+        record_temp = record_path.with_name(f'.{key}.{uuid.uuid4().hex}.json')
+        with open(record_temp, 'w', encoding='utf-8') as f:
+            json.dump(record, f, ensure_ascii=False)
+        os.replace(record_temp, record_path)
+
+        with self.lock:
+            self.entries.pop(key, None)
+            self.entries[key] = record
+        self._evict()
+
+        return {**result, 'cached': False}
+
+    def _remove(self, key):
+        """Forget one entry (caller holds the lock); the avatar files are left alone"""
+        self.entries.pop(key, None)
+        try:
+            self.record_path(key).unlink()
+        except OSError:
+            pass
+
+    def _evict(self):
+        """Drop least recently used entries until the cache fits its budget"""
+        with self.lock:
+            while len(self.entries) > self.max_entries:
+                self._remove(next(iter(self.entries)))
+                self.evictions += 1
+
+    def invalidate(self, key):
+        """Forget one entry so the next upload regenerates; returns whether it existed"""
+        with self.lock:
+            existed = key in self.entries
+            self._remove(key)
+            self.invalidations += existed
+        return existed
+
+    def invalidate_avatar(self, avatar_id):
+        """Forget every entry that resolves to this avatar; returns how many were removed"""
+        with self.lock:
+            keys = [key for key, record in self.entries.items() if record['result'].get('avatar_id') == avatar_id]
+            for key in keys:
+                self._remove(key)
+            self.invalidations += len(keys)
+        return len(keys)
+
+    def clear(self):
+        """Forget every entry; returns how many were removed"""
+        with self.lock:
+            keys = list(self.entries)
+            for key in keys:
+                self._remove(key)
+            self.invalidations += len(keys)
+        return len(keys)
+
+    def get_stats(self):
+        """Counters for health reporting"""
+        with self.lock:
+            lookups = self.hits + self.misses
+            return {
+                'entries': len(self.entries),
+                'max_entries': self.max_entries,
+                'phash_distance': self.phash_distance,
+                'hits': self.hits,
+                'perceptual_hits': self.perceptual_hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'invalidations': self.invalidations,
+                'hit_rate': round(self.hits / lookups, 4) if lookups else 0.0
+            }
@@ -0,0 +1,115 @@
+"""
+Precomputed base avatar templates
+Templates are built once with vectorized code, stored as versioned .npy files and
+memory-mapped read-only, so every worker process shares the same pages and requests
+deform them into their own output buffers without copying the template
+"""
+import os
+import shutil
+import uuid
+from pathlib import Path
+
+import numpy as np
+
+# Bump when the template geometry changes so stale files are rebuilt
+TEMPLATE_VERSION = 1
+
+DEFAULT_TEMPLATE_DIR = os.getenv(
+    'AVATAR_TEMPLATE_DIR',
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), 'avatar_templates')
+)
+
+GRID_ROWS = 20
+GRID_COLUMNS = 15
+GRID_HALF_WIDTH = 0.7
+
+TEMPLATE_IDS = ('male_adult', 'female_adult')
+TEMPLATE_ARRAYS = ('vertices', 'faces', 'texture_coords')
+
+
+def build_face_vertices(gender, age):
+    """Basic face shape on a GRID_ROWS x GRID_COLUMNS grid (row-major, y then x)"""
+    x, y = np.meshgrid(
+        np.linspace(-GRID_HALF_WIDTH, GRID_HALF_WIDTH, GRID_COLUMNS),
+        np.linspace(-1, 1, GRID_ROWS)
+    )
+    z = 0.1 * np.sin(np.pi * x) * np.cos(np.pi * y)
+    return np.column_stack([x.ravel(), y.ravel(), z.ravel()])
+
+
+def build_face_faces():
+    """Two triangles per grid quad"""
+    rows, columns = np.meshgrid(np.arange(GRID_ROWS - 1), np.arange(GRID_COLUMNS - 1), indexing='ij')
+    v1 = (rows * GRID_COLUMNS + columns).ravel()
+    v2 = v1 + 1
+    v3 = v1 + GRID_COLUMNS
+    v4 = v3 + 1
+    # (quads, 2, 3) -> interleaved [v1, v2, v3], [v2, v4, v3] per quad
+    return np.stack([np.column_stack([v1, v2, v3]), np.column_stack([v2, v4, v3])], axis=1).reshape(-1, 3)
+
+
+def build_texture_coords():
+    """UV per grid vertex"""
+    u, v = np.meshgrid(np.linspace(0, 1, GRID_COLUMNS), np.linspace(0, 1, GRID_ROWS))
+    return np.column_stack([u.ravel(), v.ravel()])
+
+
+def build_template(template_id):
+    gender, age = template_id.split('_', 1)
+    return {
+        'vertices': build_face_vertices(gender, age),
+        'faces': build_face_faces(),
+        'texture_coords': build_texture_coords()
+    }
+
+
+def template_path(template_dir, template_id):
+    return Path(template_dir) / f'v{TEMPLATE_VERSION}' / template_id
+
+
+def save_template(template_dir, template_id, arrays):
+    """Write a template's arrays to a temp directory and move it into place in one rename"""
+    final_path = template_path(template_dir, template_id)
+    temp_path = final_path.with_name(f'.{template_id}.{uuid.uuid4().hex}')
+    temp_path.mkdir(parents=True)
+    try:
+        for name, array in arrays.items():
+            np.save(temp_path / f'{name}.npy', np.ascontiguousarray(array))
+        os.replace(temp_path, final_path)
+    except OSError:
+        # Another worker got there first; its copy is identical
+        if not final_path.exists():
+            raise
+    finally:
+        shutil.rmtree(temp_path, ignore_errors=True)
+
+
+def map_template(template_dir, template_id):
+    """Read-only memory maps of a stored template"""
+    path = template_path(template_dir, template_id)
+    return {name: np.load(path / f'{name}.npy', mmap_mode='r') for name in TEMPLATE_ARRAYS}
+
+
+def load_base_avatars(template_dir=DEFAULT_TEMPLATE_DIR, template_ids=TEMPLATE_IDS):
+    """Memory-mapped templates, building and storing any that are missing for this version"""
+    templates = {}
+    for template_id in template_ids:
+        try:
+            if not template_path(template_dir, template_id).exists():
+                save_template(template_dir, template_id, build_template(template_id))
+                print(f"✅ Built avatar template {template_id} v{TEMPLATE_VERSION}")
+            templates[template_id] = map_template(template_dir, template_id)
+        except (OSError, ValueError) as e:
+            # Read-only or broken asset dir: keep serving from memory
+            print(f"❌ Failed to map avatar template {template_id}: {e}")
+            templates[template_id] = build_template(template_id)
+            for array in templates[template_id].values():
+                array.flags.writeable = False
+    return templates
+
+
+def scale_vertices(vertices, scale_x, scale_y):
+    """Scale x and y of read-only template vertices into a fresh output buffer"""
+    output = np.empty(vertices.shape, dtype=vertices.dtype)
+    np.multiply(vertices, np.array([scale_x, scale_y, 1.0], dtype=vertices.dtype), out=output)
+    return output
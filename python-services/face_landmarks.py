@@ -0,0 +1,52 @@
+"""
+Landmark adapter for MediaPipe FaceMesh results
+Converts a landmark list to a contiguous float32 (N, 3) array in one pass and slices
+facial regions with precomputed index arrays, so downstream steps never loop in Python
+"""
+from itertools import chain
+from operator import attrgetter
+
+import numpy as np
+
+_get_xyz = attrgetter('x', 'y', 'z')
+
+# Index arrays per facial region, built once at import
+LANDMARK_REGIONS = {
+    'face_contour': np.arange(0, 17),
+    'left_eyebrow': np.arange(17, 22),
+    'right_eyebrow': np.arange(22, 27),
+    'nose': np.arange(27, 36),
+    'left_eye': np.arange(36, 42),
+    'right_eye': np.arange(42, 48),
+    'outer_lips': np.arange(48, 60),
+    'inner_lips': np.arange(60, 68)
+}
+LANDMARK_REGIONS['eyebrows'] = np.concatenate([LANDMARK_REGIONS['left_eyebrow'], LANDMARK_REGIONS['right_eyebrow']])
+LANDMARK_REGIONS['eyes'] = np.concatenate([LANDMARK_REGIONS['left_eye'], LANDMARK_REGIONS['right_eye']])
+LANDMARK_REGIONS['mouth'] = np.concatenate([LANDMARK_REGIONS['outer_lips'], LANDMARK_REGIONS['inner_lips']])
+
+for region_indices in LANDMARK_REGIONS.values():
+    region_indices.flags.writeable = False
+
+
+def landmarks_to_array(face_landmarks):
+    """NormalizedLandmarkList (or a list of landmarks) to a contiguous float32 (N, 3) array of x, y, z"""
+    landmarks = getattr(face_landmarks, 'landmark', face_landmarks)
+    count = len(landmarks)
+    # Straight into a preallocated buffer, no intermediate lists or per-point arrays
+    coords = np.fromiter(chain.from_iterable(map(_get_xyz, landmarks)), dtype=np.float32, count=count * 3)
+    return coords.reshape(count, 3)
+
+
+def to_pixel_coords(landmarks, width, height):
+    """
+    Normalized x, y to pixels in a new float64 array; z is left as is.
+    Scaled in float64 like the landmark floats themselves, so truncating to int gives the same pixels
+    """
+    return landmarks * np.array([width, height, 1], dtype=np.float64)
+
+
+def extract_regions(points, names=None):
+    """Slice each facial region out of an (N, ...) landmark array"""
+    names = LANDMARK_REGIONS if names is None else names
+    return {name: points[LANDMARK_REGIONS[name]] for name in names}
@@ -0,0 +1,173 @@
+"""
+Bounded pool of pre-initialized MediaPipe FaceMesh detectors
+A FaceMesh graph is expensive to build and not safe to share between threads, so each
+request checks one instance out for its exclusive use and returns it when done
+"""
+import os
+import queue
+import threading
+import time
+from contextlib import contextmanager
+
+import numpy as np
+
+try:
+    import mediapipe as mp
+    MEDIAPIPE_AVAILABLE = True
+except ImportError:
+    MEDIAPIPE_AVAILABLE = False
+
+DEFAULT_POOL_SIZE = int(os.getenv('FACE_MESH_POOL_SIZE', min(4, os.cpu_count() or 1)))
+DEFAULT_TIMEOUT = float(os.getenv('FACE_MESH_POOL_TIMEOUT', 30))
+
+WARMUP_IMAGE_SIZE = 128
+
+
+def create_face_mesh():
+    """FaceMesh configured for single still photos"""
+    if not MEDIAPIPE_AVAILABLE:
+        raise RuntimeError("mediapipe is not installed")
+    return mp.solutions.face_mesh.FaceMesh(
+        static_image_mode=True,
+        max_num_faces=1,
+        refine_landmarks=True,
+        min_detection_confidence=0.5
+    )
+
+
+class FaceMeshPool:
+    """Hands out FaceMesh instances to one caller at a time, creating at most size of them"""
+
+    def __init__(self, size=DEFAULT_POOL_SIZE, factory=create_face_mesh, timeout=DEFAULT_TIMEOUT, name='face_mesh'):
+        self.size = size
+        self.factory = factory
+        self.timeout = timeout
+        self.name = name
+
+        # LIFO so the most recently used (hottest) instance is handed out first
+        self.idle = queue.LifoQueue()
+        self.lock = threading.Lock()
+        self.created = 0
+
+        self.checkouts = 0
+        self.waits = 0  # checkouts that found no idle instance
+        self.waiting = 0
+        self.timeouts = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+        self.total_hold = 0.0
+        self.total_init = 0.0
+
+    def _create(self):
+        """Build an instance and run one dummy image through it so graph init is paid up front"""
+        started_at = time.perf_counter()
+        instance = self.factory()
+        instance.process(np.zeros((WARMUP_IMAGE_SIZE, WARMUP_IMAGE_SIZE, 3), dtype=np.uint8))
+        with self.lock:
+            self.total_init += time.perf_counter() - started_at
+        return instance
+
+    def warm_up(self):
+        """Create every instance of the pool now instead of on first use (called at startup)"""
+        with self.lock:
+            missing = self.size - self.created
+            self.created += missing
+
+        for built in range(missing):
+            try:
+                self.idle.put(self._create())
+            except Exception:
+                # Give back this slot and every one not built yet, so later checkouts can grow into them
+                with self.lock:
+                    self.created -= missing - built
+                raise
+
+        print(f"✅ {self.name} pool ready with {self.size} instances")
+
+    def _acquire(self, timeout):
+        # Queue behind callers already waiting instead of grabbing a just-returned instance
+        if not self.waiting:
+            try:
+                return self.idle.get_nowait(), False
+            except queue.Empty:
+                pass
+
+        with self.lock:
+            grow = self.created < self.size
+            if grow:
+                self.created += 1
+
+        if grow:
+            try:
+                return self._create(), True
+            except Exception:
+                with self.lock:
+                    self.created -= 1
+                raise
+
+        with self.lock:
+            self.waiting += 1
+        try:
+            return self.idle.get(timeout=timeout), True
+        except queue.Empty:
+            with self.lock:
+                self.timeouts += 1
+            raise TimeoutError(f"No {self.name} instance free after {timeout}s ({self.size} in use)")
+        finally:
+            with self.lock:
+                self.waiting -= 1
+
+    @contextmanager
+    def checkout(self, timeout=None):
+        """Exclusive use of one instance for the duration of the with block"""
+        started_at = time.perf_counter()
+        instance, waited = self._acquire(self.timeout if timeout is None else timeout)
+        acquired_at = time.perf_counter()
+
+        try:
+            yield instance
+        finally:
+            self.idle.put(instance)
+            released_at = time.perf_counter()
+
+            wait = acquired_at - started_at
+            with self.lock:
+                self.checkouts += 1
+                self.waits += waited
+                self.total_wait += wait
+                self.max_wait = max(self.max_wait, wait)
+                self.total_hold += released_at - acquired_at
+
+    def close(self):
+        """Release the idle instances' graphs"""
+        while True:
+            try:
+                instance = self.idle.get_nowait()
+            except queue.Empty:
+                break
+            instance.close()
+            with self.lock:
+                self.created -= 1
+
+    def get_stats(self):
+        """Pool occupancy and checkout wait times for health reporting"""
+        with self.lock:
+            idle = self.idle.qsize()
+            return {
+                'size': self.size,
+                'created': self.created,
+                'idle': idle,
+                'in_use': self.created - idle,
+                'waiting': self.waiting,
+                'checkouts': self.checkouts,
+                'waits': self.waits,
+                'timeouts': self.timeouts,
+                'avg_wait_ms': round(self.total_wait / self.checkouts * 1000, 2) if self.checkouts else 0.0,
+                'max_wait_ms': round(self.max_wait * 1000, 2),
+                'avg_detect_ms': round(self.total_hold / self.checkouts * 1000, 2) if self.checkouts else 0.0,
+                'avg_init_ms': round(self.total_init / self.created * 1000, 2) if self.created else 0.0
+            }
+
+
+# Shared by every detector in the process
+face_mesh_pool = FaceMeshPool()
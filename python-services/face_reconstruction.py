@@ -8,93 +8,154 @@ import mediapipe as mp
 import trimesh
 import os
 import tempfile
+import asyncio
+import time
+import uuid
 from typing import Optional
 
+from face_mesh_pool import face_mesh_pool
+from face_landmarks import landmarks_to_array, to_pixel_coords, extract_regions
+from photo_decode import load_face_region
+from avatar_cache import AvatarCache, content_hash, perceptual_hash
+
+AVATAR_DIR = "uploads/avatars"
+
 # Initialize MediaPipe
-mp_face_mesh = mp.solutions.face_mesh
 mp_drawing = mp.solutions.drawing_utils
 
+# Repeat uploads (and client retries) of the same photo reuse the avatar already generated
+avatar_cache = AvatarCache(os.path.join(AVATAR_DIR, "cache"))
+
+# cache key -> task still generating that avatar, so concurrent duplicates share it
+avatar_tasks = {}
+
+def warm_up_face_mesh():
+    """Build the FaceMesh pool once so requests never pay for graph init (called at startup)"""
+    face_mesh_pool.warm_up()
+
+def detect_face_landmarks(image_rgb):
+    """Normalized float32 (N, 3) landmarks of the first face on a pooled FaceMesh, or None if no face was found"""
+    with face_mesh_pool.checkout() as face_mesh:
+        results = face_mesh.process(image_rgb)
+    
+    if not results.multi_face_landmarks:
+        return None
+    return landmarks_to_array(results.multi_face_landmarks[0])
+
+def detect_face_in_photo(photo_path: str):
+    """
+    Find the face on a reduced decode, then run landmarks on the face crop at working resolution.
+    Returns (decoded region, face crop as RGB, landmarks normalized to the crop)
+    """
+    region = load_face_region(photo_path, detect_face_landmarks)
+    face_rgb = cv2.cvtColor(region["face"], cv2.COLOR_BGR2RGB)
+    
+    landmarks = detect_face_landmarks(face_rgb)
+    if landmarks is None:
+        raise ValueError("No face detected in image")
+    return region, face_rgb, landmarks
+
+def get_photo_hashes(photo_path: str):
+    """(content hash, perceptual hash) of an uploaded photo; no perceptual hash when that matching is off"""
+    phash = perceptual_hash(photo_path) if avatar_cache.phash_distance >= 0 else None
+    return content_hash(photo_path), phash
+
 async def generate_avatar_from_photo(
     photo_path: str, 
     base_avatar_id: Optional[str] = None,
     description: Optional[str] = None
 ):
     """
-    Generate 3D avatar from uploaded photo
+    Generate 3D avatar from uploaded photo, reusing the avatar of an identical or near-identical photo
+    """
+    try:
+        photo_hash, phash = await asyncio.get_running_loop().run_in_executor(None, get_photo_hashes, photo_path)
+        cache_key = avatar_cache.make_key(photo_hash, base_avatar_id, description)
+        
+        cached = avatar_cache.get(cache_key, phash, base_avatar_id, description)
+        if cached:
+            return cached
+        
+        task = avatar_tasks.get(cache_key)
+        if task is None:
+            task = asyncio.get_running_loop().create_task(
+                generate_cached_avatar(cache_key, photo_hash, phash, photo_path, base_avatar_id, description)
+            )
+            avatar_tasks[cache_key] = task
+            task.add_done_callback(lambda _: avatar_tasks.pop(cache_key, None))
+        
+        # Shielded so a disconnecting client does not cancel work other requests are waiting on
+        return await asyncio.shield(task)
+        
+    except Exception as e:
+        print(f"Error in face reconstruction: {e}")
+        raise e
+
+async def generate_cached_avatar(
+    cache_key: str,
+    photo_hash: str,
+    phash: str,
+    photo_path: str,
+    base_avatar_id: Optional[str],
+    description: Optional[str]
+):
+    """Run the full pipeline once and record the result in the avatar cache"""
+    result, files = await build_avatar_from_photo(photo_path, base_avatar_id, description)
+    return avatar_cache.put(cache_key, photo_hash, phash, base_avatar_id, description, result, files)
+
+async def build_avatar_from_photo(
+    photo_path: str,
+    base_avatar_id: Optional[str] = None,
+    description: Optional[str] = None
+):
+    """
+    Detect, mesh and export an avatar; returns (result, local paths of the files it references)
     """
     try:
-        # Load image
-        image = cv2.imread(photo_path)
-        if image is None:
-            raise ValueError("Could not load image")
+        # Decode coarse-to-fine and detect landmarks with a pooled MediaPipe FaceMesh, off the event loop
+        region, image_rgb, face_landmarks = await asyncio.get_running_loop().run_in_executor(
+            None, detect_face_in_photo, photo_path
+        )
+        
+        # Extract facial features
+        facial_features = extract_facial_features(image_rgb, face_landmarks)
+        
+        # Generate 3D mesh
+        mesh = create_3d_face_mesh(facial_features, image_rgb)
         
-        # Convert BGR to RGB
-        image_rgb = cv2.cvtColor(image, cv2.COLOR_BGR2RGB)
+        # Save mesh as GLB; ids must be unique now that cached results point at these files
+        avatar_id = f"avatar_{uuid.uuid4().hex}"
+        mesh_path = f"{AVATAR_DIR}/{avatar_id}.glb"
+        mesh.export(mesh_path)
+        
+        # Generate thumbnail
+        thumbnail_path = f"{AVATAR_DIR}/{avatar_id}_thumb.jpg"
+        generate_thumbnail(region["preview"], thumbnail_path)
+        
+        result = {
+            "avatar_id": avatar_id,
+            "model_url": f"/uploads/avatars/{avatar_id}.glb",
+            "thumbnail_url": f"/uploads/avatars/{avatar_id}_thumb.jpg",
+            "type": "photo-generated",
+            "decode": region["stats"]
+        }
+        return result, [mesh_path, thumbnail_path]
         
-        # Detect face landmarks using MediaPipe
-        with mp_face_mesh.FaceMesh(
-            static_image_mode=True,
-            max_num_faces=1,
-            refine_landmarks=True,
-            min_detection_confidence=0.5
-        ) as face_mesh:
-            results = face_mesh.process(image_rgb)
-            
-            if not results.multi_face_landmarks:
-                raise ValueError("No face detected in image")
-            
-            # Get face landmarks
-            face_landmarks = results.multi_face_landmarks[0]
-            
-            # Extract facial features
-            facial_features = extract_facial_features(image_rgb, face_landmarks)
-            
-            # Generate 3D mesh
-            mesh = create_3d_face_mesh(facial_features, image_rgb)
-            
-            # Save mesh as GLB
-            avatar_id = f"avatar_{int(time.time())}"
-            mesh_path = f"uploads/avatars/{avatar_id}.glb"
-            mesh.export(mesh_path)
-            
-            # Generate thumbnail
-            thumbnail_path = f"uploads/avatars/{avatar_id}_thumb.jpg"
-            generate_thumbnail(image, thumbnail_path)
-            
-            return {
-                "avatar_id": avatar_id,
-                "model_url": f"/uploads/avatars/{avatar_id}.glb",
-                "thumbnail_url": f"/uploads/avatars/{avatar_id}_thumb.jpg",
-                "type": "photo-generated"
-            }
-            
     except Exception as e:
         print(f"Error in face reconstruction: {e}")
         raise e
 
 def extract_facial_features(image, landmarks):
-    """Extract facial features from landmarks"""
+    """Extract facial features from an (N, 3) landmark array"""
     h, w, _ = image.shape
     
-    # Convert normalized coordinates to pixel coordinates
-    points = []
-    for landmark in landmarks.landmark:
-        x = int(landmark.x * w)
-        y = int(landmark.y * h)
-        points.append([x, y])
-    
-    points = np.array(points)
+    # Convert normalized coordinates to whole pixel coordinates in one pass
+    points = to_pixel_coords(landmarks, w, h)[:, :2].astype(np.int32)
     
     # Extract key facial features
-    features = {
-        'face_contour': points[0:17],  # Face outline
-        'eyebrows': points[17:27],     # Eyebrows
-        'nose': points[27:36],         # Nose
-        'eyes': points[36:48],         # Eyes
-        'mouth': points[48:68],        # Mouth
-        'face_width': np.linalg.norm(points[0] - points[16]),
-        'face_height': np.linalg.norm(points[8] - points[27])
-    }
+    features = extract_regions(points, ('face_contour', 'eyebrows', 'nose', 'eyes', 'mouth'))
+    features['face_width'] = np.linalg.norm(points[0] - points[16])
+    features['face_height'] = np.linalg.norm(points[8] - points[27])
     
     return features
 
@@ -102,19 +163,16 @@ def create_3d_face_mesh(features, image):
     """Create 3D mesh from facial features"""
     # This is a simplified version - in production, you'd use more sophisticated 3D reconstruction
     
-    # Create basic face mesh
-    vertices = []
-    faces = []
+    contour = features['face_contour']
+    count = len(contour)
     
-    # Generate vertices based on facial features
-    for i, point in enumerate(features['face_contour']):
-        # Add depth based on face shape
-        depth = np.sin(i * np.pi / len(features['face_contour'])) * 0.1
-        vertices.append([point[0], point[1], depth])
+    # Vertices from the face outline, with depth based on face shape
+    depth = np.sin(np.arange(count) * np.pi / count) * 0.1
+    vertices = np.column_stack([contour[:, 0], contour[:, 1], depth])
     
-    # Create triangular faces
-    for i in range(len(features['face_contour']) - 1):
-        faces.append([i, i + 1, len(features['face_contour'])])
+    # Triangle fan along the outline
+    indices = np.arange(count - 1)
+    faces = np.column_stack([indices, indices + 1, np.full(count - 1, count)])
     
     # Create mesh
     mesh = trimesh.Trimesh(vertices=vertices, faces=faces)
@@ -19,48 +19,36 @@ from pathlib import Path
 # Add the parent directory to the path so we can import other modules
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
+from face_mesh_pool import face_mesh_pool
+from face_landmarks import landmarks_to_array, to_pixel_coords, extract_regions
+from photo_decode import load_face_region
+from avatar_templates import load_base_avatars, scale_vertices
+
 class FaceReconstructionService:
     def __init__(self):
         self.mp_face_mesh = mp.solutions.face_mesh
         self.mp_drawing = mp.solutions.drawing_utils
-        self.face_mesh = self.mp_face_mesh.FaceMesh(
-            static_image_mode=True,
-            max_num_faces=1,
-            refine_landmarks=True,
-            min_detection_confidence=0.5
-        )
         
-        # Base avatar templates (would be loaded from files)
+        # FaceMesh is not thread-safe; each detection checks out its own pre-built instance
+        self.face_mesh_pool = face_mesh_pool
+        self.face_mesh_pool.warm_up()
+        
+        # Base avatar templates, memory-mapped read-only and shared by every worker process
         self.base_avatars = self.load_base_avatars()
         
     def load_base_avatars(self):
         """Load base avatar templates"""
-        # In a real implementation, this would load actual 3D models
-        return {
-            'male_adult': {
-                'vertices': self.generate_base_face_vertices('male', 'adult'),
-                'faces': self.generate_base_face_faces(),
-                'texture_coords': self.generate_base_texture_coords()
-            },
-            'female_adult': {
-                'vertices': self.generate_base_face_vertices('female', 'adult'),
-                'faces': self.generate_base_face_faces(),
-                'texture_coords': self.generate_base_texture_coords()
-            }
-        }
+        # Built once per template version and stored as .npy files
+        return load_base_avatars()
     
     def generate_avatar(self, photo_path, base_avatar_id=None, description=None):
         """Generate 3D avatar from photo"""
         try:
-            # Load and process image
-            image = cv2.imread(photo_path)
-            if image is None:
-                raise ValueError("Could not load image")
+            # Find the face on a reduced decode, then decode just the face at working resolution
+            region = load_face_region(photo_path, self.detect_face_landmarks)
+            image_rgb = cv2.cvtColor(region['face'], cv2.COLOR_BGR2RGB)
             
-            # Convert BGR to RGB
-            image_rgb = cv2.cvtColor(image, cv2.COLOR_BGR2RGB)
-            
-            # Detect face landmarks
+            # Detect face landmarks on the face crop
             landmarks = self.detect_face_landmarks(image_rgb)
             if landmarks is None:
                 raise ValueError("No face detected in image")
@@ -78,13 +66,14 @@ class FaceReconstructionService:
             avatar_id = str(uuid.uuid4())
             output_path = self.export_glb(textured_mesh, avatar_id)
             
-            # Generate thumbnail
-            thumbnail_path = self.generate_thumbnail(image_rgb, avatar_id)
+            # Generate thumbnail from the reduced whole-photo decode
+            thumbnail_path = self.generate_thumbnail(cv2.cvtColor(region['preview'], cv2.COLOR_BGR2RGB), avatar_id)
             
             return {
                 'avatar_id': avatar_id,
                 'model_url': f'/public/avatars/{avatar_id}.glb',
                 'thumbnail_url': f'/public/avatars/{avatar_id}_thumb.jpg',
+                'decode': region['stats'],
                 'success': True
             }
             
@@ -98,20 +87,14 @@ class FaceReconstructionService:
     def detect_face_landmarks(self, image):
         """Detect facial landmarks using MediaPipe"""
         try:
-            results = self.face_mesh.process(image)
+            with self.face_mesh_pool.checkout() as face_mesh:
+                results = face_mesh.process(image)
             
             if not results.multi_face_landmarks:
                 return None
             
-            # Get the first face
-            face_landmarks = results.multi_face_landmarks[0]
-            
-            # Convert to numpy array
-            landmarks = []
-            for landmark in face_landmarks.landmark:
-                landmarks.append([landmark.x, landmark.y, landmark.z])
-            
-            return np.array(landmarks)
+            # First face as a float32 (N, 3) array, converted in bulk
+            return landmarks_to_array(results.multi_face_landmarks[0])
             
         except Exception as e:
             print(f"Error detecting landmarks: {e}")
@@ -122,22 +105,14 @@ class FaceReconstructionService:
         h, w = image.shape[:2]
         
         # Convert normalized coordinates to pixel coordinates
-        landmarks_pixel = landmarks.copy()
-        landmarks_pixel[:, 0] *= w
-        landmarks_pixel[:, 1] *= h
+        landmarks_pixel = to_pixel_coords(landmarks, w, h)
         
         # Extract key facial features
-        features = {
-            'face_contour': landmarks_pixel[0:17],  # Face outline
-            'left_eyebrow': landmarks_pixel[17:22],
-            'right_eyebrow': landmarks_pixel[22:27],
-            'nose': landmarks_pixel[27:36],
-            'left_eye': landmarks_pixel[36:42],
-            'right_eye': landmarks_pixel[42:48],
-            'outer_lips': landmarks_pixel[48:60],
-            'inner_lips': landmarks_pixel[60:68],
-            'all_landmarks': landmarks_pixel
-        }
+        features = extract_regions(landmarks_pixel, (
+            'face_contour', 'left_eyebrow', 'right_eyebrow', 'nose',
+            'left_eye', 'right_eye', 'outer_lips', 'inner_lips'
+        ))
+        features['all_landmarks'] = landmarks_pixel
         
         return features
     
@@ -151,9 +126,9 @@ class FaceReconstructionService:
                 # Default to female adult template
                 base_template = self.base_avatars['female_adult']
             
-            # Get base vertices and faces
-            base_vertices = base_template['vertices'].copy()
-            base_faces = base_template['faces'].copy()
+            # Template arrays are read-only; deformation writes into a new buffer
+            base_vertices = base_template['vertices']
+            base_faces = base_template['faces']
             
             # Modify vertices based on facial features
             modified_vertices = self.modify_vertices_for_face(base_vertices, facial_features)
@@ -177,8 +152,6 @@ class FaceReconstructionService:
         # This is a simplified version - in reality, this would involve
         # complex 3D morphing algorithms
         
-        modified_vertices = base_vertices.copy()
-        
         # Calculate face dimensions
         face_contour = facial_features['face_contour']
         face_width = np.max(face_contour[:, 0]) - np.min(face_contour[:, 0])
@@ -188,10 +161,8 @@ class FaceReconstructionService:
         scale_x = face_width / 100.0  # Normalize to reasonable scale
         scale_y = face_height / 100.0
         
-        modified_vertices[:, 0] *= scale_x
-        modified_vertices[:, 1] *= scale_y
-        
-        return modified_vertices
+        # Written straight into a fresh buffer, the template itself is never copied or touched
+        return scale_vertices(base_vertices, scale_x, scale_y)
     
     def apply_description_modifications(self, vertices, description):
         """Apply modifications based on text description"""
@@ -248,50 +219,6 @@ class FaceReconstructionService:
         except Exception as e:
             print(f"Error generating thumbnail: {e}")
             raise
-    
-    def generate_base_face_vertices(self, gender, age):
-        """Generate base face vertices (simplified)"""
-        # This would load actual 3D face templates
-        # For now, generate a simple face shape
-        vertices = []
-        
-        # Generate a basic face shape
-        for y in np.linspace(-1, 1, 20):
-            for x in np.linspace(-0.7, 0.7, 15):
-                z = 0.1 * np.sin(np.pi * x) * np.cos(np.pi * y)
-                vertices.append([x, y, z])
-        
-        return np.array(vertices)
-    
-    def generate_base_face_faces(self):
-        """Generate base face faces (triangles)"""
-        faces = []
-        
-        # Generate triangular faces for the mesh
-        for i in range(19):  # 20 vertices in y direction
-            for j in range(14):  # 15 vertices in x direction
-                if i < 19 and j < 14:
-                    # Two triangles per quad
-                    v1 = i * 15 + j
-                    v2 = i * 15 + j + 1
-                    v3 = (i + 1) * 15 + j
-                    v4 = (i + 1) * 15 + j + 1
-                    
-                    faces.append([v1, v2, v3])
-                    faces.append([v2, v4, v3])
-        
-        return np.array(faces)
-    
-    def generate_base_texture_coords(self):
-        """Generate base texture coordinates"""
-        # Generate UV coordinates for texture mapping
-        uvs = []
-        
-        for y in np.linspace(0, 1, 20):
-            for x in np.linspace(0, 1, 15):
-                uvs.append([x, y])
-        
-        return np.array(uvs)
 
 def main():
     """Main function for testing"""
@@ -0,0 +1,167 @@
+"""
+Content-addressed cache for per-clip audio features
+Decoded PCM and derived arrays (mel, energy, ...) are keyed by audio content hash plus sample rate,
+kept in a byte-bounded in-memory LRU and optionally persisted as memory-mapped .npy files
+"""
+import hashlib
+import os
+import threading
+import uuid
+from collections import OrderedDict
+from pathlib import Path
+
+import numpy as np
+
+DEFAULT_MAX_BYTES = int(os.getenv('LIPSYNC_FEATURE_CACHE_BYTES', 256 * 1024 * 1024))
+DEFAULT_CACHE_DIR = os.getenv('LIPSYNC_FEATURE_CACHE_DIR')
+
+HASH_BLOCK_SIZE = 1024 * 1024
+# Remembered file hashes; uploads get unique temp paths, so this has to be bounded
+FILE_KEY_CACHE_SIZE = 1024
+
+
+def hash_file(path):
+    """SHA-256 of a file's contents, read in blocks"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(HASH_BLOCK_SIZE), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+class FeatureCache:
+    """Two-tier (memory LRU + optional on-disk .npy) cache of named arrays per clip"""
+
+    def __init__(self, max_bytes=DEFAULT_MAX_BYTES, cache_dir=DEFAULT_CACHE_DIR):
+        self.max_bytes = max_bytes
+        self.cache_dir = Path(cache_dir) if cache_dir else None
+        self.entries = OrderedDict()  # (key, name) -> array
+        self.total_bytes = 0
+        self.lock = threading.Lock()
+
+        # (path, mtime, size) -> content hash, so repeat lookups skip re-hashing the file (LRU)
+        self.file_keys = OrderedDict()
+
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+        if self.cache_dir:
+            self.cache_dir.mkdir(parents=True, exist_ok=True)
+
+    def key_for_file(self, audio_path, sample_rate):
+        """Cache key for an audio file: content hash plus target sample rate"""
+        stat = os.stat(audio_path)
+        file_id = (os.path.realpath(audio_path), stat.st_mtime_ns, stat.st_size)
+
+        with self.lock:
+            content_hash = self.file_keys.get(file_id)
+            if content_hash is not None:
+                self.file_keys.move_to_end(file_id)
+
+        if content_hash is None:
+            content_hash = hash_file(audio_path)
+            with self.lock:
+                self.file_keys[file_id] = content_hash
+                while len(self.file_keys) > FILE_KEY_CACHE_SIZE:
+                    self.file_keys.popitem(last=False)
+
+        return f'{content_hash[:40]}_{sample_rate}'
+
+    def disk_path(self, key, name):
+        """Sharded location of an array on disk"""
+        return self.cache_dir / key[:2] / key / f'{name}.npy'
+
+    def get(self, key, name):
+        """Return a cached array or None"""
+        with self.lock:
+            array = self.entries.get((key, name))
+            if array is not None:
+                self.entries.move_to_end((key, name))
+                self.hits += 1
+                return array
+
+        if self.cache_dir:
+            path = self.disk_path(key, name)
+            if path.exists():
+                try:
+                    # Memory-mapped read-only, pages are shared between processes
+                    array = np.load(path, mmap_mode='r')
+                except (OSError, ValueError) as e:
+                    print(f"Feature cache read error for {path}: {e}")
+                else:
+                    with self.lock:
+                        self.disk_hits += 1
+                    self._store(key, name, array)
+                    return array
+
+        with self.lock:
+            self.misses += 1
+        return None
+
+    def put(self, key, name, array):
+        """Cache an array in memory and, if enabled, on disk"""
+        array = np.asarray(array)
+
+        if self.cache_dir:
+            path = self.disk_path(key, name)
+            path.parent.mkdir(parents=True, exist_ok=True)
+            temp_path = path.with_name(f'.{name}.{uuid.uuid4().hex}.npy')
+            np.save(temp_path, array)
+            os.replace(temp_path, path)
+
+        # Views are copied so the budget counts every byte they keep alive; the cache holds
+        # a read-only view either way and the caller's own array stays writeable
+        array = array.view() if array.flags.owndata else array.copy()
+        array.flags.writeable = False
+
+        self._store(key, name, array)
+        return array
+
+    def get_or_compute(self, key, names, compute):
+        """Return {name: array} for all names, calling compute() once if any of them is missing"""
+        arrays = {}
+        for name in names:
+            array = self.get(key, name)
+            if array is None:
+                break
+            arrays[name] = array
+        else:
+            return arrays
+
+        computed = compute()
+        return {name: self.put(key, name, computed[name]) for name in names}
+
+    def _store(self, key, name, array):
+        with self.lock:
+            previous = self.entries.pop((key, name), None)
+            if previous is not None:
+                self.total_bytes -= previous.nbytes
+
+            self.entries[(key, name)] = array
+            self.total_bytes += array.nbytes
+
+            # Evict least recently used arrays until under budget (always keep the newest)
+            while self.total_bytes > self.max_bytes and len(self.entries) > 1:
+                _, evicted = self.entries.popitem(last=False)
+                self.total_bytes -= evicted.nbytes
+                self.evictions += 1
+
+    def get_stats(self):
+        """Counters for health reporting"""
+        with self.lock:
+            return {
+                'entries': len(self.entries),
+                'bytes': self.total_bytes,
+                'max_bytes': self.max_bytes,
+                'disk_tier': str(self.cache_dir) if self.cache_dir else None,
+                'hits': self.hits,
+                'disk_hits': self.disk_hits,
+                'misses': self.misses,
+                'evictions': self.evictions
+            }
+
+
+# Shared by every lip sync renderer in the process
+feature_cache = FeatureCache()
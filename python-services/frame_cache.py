@@ -0,0 +1,114 @@
+"""
+Quantized mouth-shape frame cache for lip sync
+Lip shapes are snapped to a fixed set of viseme-like buckets and the rendered
+output for each (avatar_id, bucket) is produced once and served from a bounded LRU cache
+"""
+import os
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+# Openness bin edges fall on multiples of 0.1 so the open/closed mouth threshold (0.3) is preserved
+MOUTH_OPENNESS_BINS = 10
+LIP_WIDTH_BINS = 4
+LIP_WIDTH_RANGE = (0.2, 0.8)
+
+DEFAULT_CACHE_SIZE = int(os.getenv('LIPSYNC_FRAME_CACHE_SIZE', 128))
+
+
+def quantize_lip_shapes(lip_shapes, openness_bins=MOUTH_OPENNESS_BINS, width_bins=LIP_WIDTH_BINS):
+    """Map per-frame lip shape arrays to integer bucket ids"""
+    openness = np.asarray(lip_shapes['mouth_openness'])
+    width = np.asarray(lip_shapes['lip_width'])
+
+    open_idx = np.clip((openness * openness_bins).astype(np.int32), 0, openness_bins - 1)
+
+    low, high = LIP_WIDTH_RANGE
+    width_idx = ((width - low) / (high - low) * width_bins).astype(np.int32)
+    width_idx = np.clip(width_idx, 0, width_bins - 1)
+
+    return open_idx * width_bins + width_idx
+
+
+def bucket_to_lip_shape(bucket, openness_bins=MOUTH_OPENNESS_BINS, width_bins=LIP_WIDTH_BINS):
+    """Representative lip shape parameters at the centre of a bucket"""
+    open_idx, width_idx = divmod(int(bucket), width_bins)
+
+    low, high = LIP_WIDTH_RANGE
+    mouth_openness = (open_idx + 0.5) / openness_bins
+    lip_width = low + (width_idx + 0.5) / width_bins * (high - low)
+
+    return {
+        'mouth_openness': mouth_openness,
+        'lip_width': lip_width,
+        'lip_height': 0.3 + 0.2 * mouth_openness
+    }
+
+
+class LipShapeFrameCache:
+    """Thread-safe LRU cache of rendered frames keyed by (avatar_id, bucket)"""
+
+    def __init__(self, max_size=DEFAULT_CACHE_SIZE):
+        self.max_size = max_size
+        self.frames = OrderedDict()
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get_or_render(self, avatar_id, bucket, render):
+        """Return the cached frame for a bucket, rendering it with render(bucket) on a miss"""
+        key = (avatar_id, int(bucket))
+
+        with self.lock:
+            frame = self.frames.get(key)
+            if frame is not None:
+                self.frames.move_to_end(key)
+                self.hits += 1
+                return frame
+            self.misses += 1
+
+        # Render outside the lock so other threads are not blocked
+        frame = render(key[1])
+        frame.flags.writeable = False
+
+        with self.lock:
+            self.frames[key] = frame
+            self.frames.move_to_end(key)
+            while len(self.frames) > self.max_size:
+                self.frames.popitem(last=False)
+                self.evictions += 1
+
+        return frame
+
+    def missing(self, avatar_id, buckets):
+        """Buckets with no cached frame for this avatar (does not count as lookups)"""
+        with self.lock:
+            return [int(bucket) for bucket in buckets if (avatar_id, int(bucket)) not in self.frames]
+
+    def invalidate(self, avatar_id=None):
+        """Drop cached frames for one avatar, or everything"""
+        with self.lock:
+            if avatar_id is None:
+                self.frames.clear()
+            else:
+                for key in [key for key in self.frames if key[0] == avatar_id]:
+                    del self.frames[key]
+
+    def get_stats(self):
+        """Hit/miss counters for health reporting"""
+        with self.lock:
+            lookups = self.hits + self.misses
+            return {
+                'size': len(self.frames),
+                'max_size': self.max_size,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'hit_rate': round(self.hits / lookups, 4) if lookups else 0.0
+            }
+
+
+# Shared by every lip sync renderer in the process
+frame_cache = LipShapeFrameCache()
@@ -0,0 +1,131 @@
+"""
+Mouth-region compositing for lip sync
+Keeps a static base frame per avatar and rewrites only the mouth region of a reused output buffer
+"""
+import cv2
+import numpy as np
+
+from frame_cache import LIP_WIDTH_RANGE
+
+FRAME_SIZE = (640, 480)  # width, height
+
+# Largest lip height produced by the lip shape mapping (0.3 + 0.2 * openness)
+MAX_LIP_HEIGHT = 0.5
+
+DEBUG_TEXT_ORIGIN = (10, 30)
+DEBUG_TEXT_SCALE = 1
+DEBUG_TEXT_THICKNESS = 2
+
+
+def create_base_frame(face_region, frame_size=FRAME_SIZE):
+    """Render the static parts of a frame: gray background and face"""
+    frame = np.full((frame_size[1], frame_size[0], 3), 128, dtype=np.uint8)
+    cv2.rectangle(frame, face_region, (200, 200, 200), -1)
+    return frame
+
+
+def draw_mouth(frame, face_region, lip_shape):
+    """Draw the mouth for a set of lip shape parameters"""
+    lip_center = (
+        face_region[0] + face_region[2] // 2,
+        face_region[1] + face_region[3] // 2
+    )
+
+    lip_width = int(face_region[2] * lip_shape['lip_width'])
+    lip_height = int(face_region[3] * lip_shape['lip_height'])
+
+    if lip_shape['mouth_openness'] > 0.3:
+        # Open mouth
+        mouth_rect = (
+            lip_center[0] - lip_width // 2,
+            lip_center[1] - lip_height // 2,
+            lip_width,
+            lip_height
+        )
+        cv2.rectangle(frame, mouth_rect, (0, 0, 0), -1)
+    else:
+        # Closed mouth
+        cv2.ellipse(frame, lip_center, (lip_width // 2, lip_height // 4), 0, 0, 360, (0, 0, 0), -1)
+
+    return frame
+
+
+def draw_debug_label(frame, frame_idx):
+    """Stamp the frame number in the top-left corner"""
+    cv2.putText(frame, f'Frame {frame_idx}', DEBUG_TEXT_ORIGIN, cv2.FONT_HERSHEY_SIMPLEX,
+                DEBUG_TEXT_SCALE, (255, 255, 255), DEBUG_TEXT_THICKNESS)
+
+
+def get_mouth_box(face_region, frame_shape):
+    """Bounding box (x, y, width, height) that contains every mouth shape for a face region"""
+    face_x, face_y, face_w, face_h = face_region
+    center_x = face_x + face_w // 2
+    center_y = face_y + face_h // 2
+
+    # One pixel margin for antialiasing and rounding in the drawing calls
+    half_w = int(face_w * LIP_WIDTH_RANGE[1]) // 2 + 1
+    half_h = int(face_h * MAX_LIP_HEIGHT) // 2 + 1
+
+    frame_h, frame_w = frame_shape[:2]
+    x0 = max(0, center_x - half_w)
+    y0 = max(0, center_y - half_h)
+    x1 = min(frame_w, center_x + half_w + 1)
+    y1 = min(frame_h, center_y + half_h + 1)
+
+    return (x0, y0, x1 - x0, y1 - y0)
+
+
+class FrameCompositor:
+    """
+    Composite mouth patches onto a static base frame.
+    The returned frame is a single preallocated buffer that is overwritten by the next call,
+    so consumers must finish with (or copy) a frame before requesting another one.
+    """
+
+    def __init__(self, base_frame, face_region, debug_overlay=False):
+        self.base_frame = base_frame
+        self.face_region = face_region
+        self.mouth_box = get_mouth_box(face_region, base_frame.shape)
+        self.debug_overlay = debug_overlay
+        self.buffer = base_frame.copy()
+
+        # Area touched by the debug label, restored from the base frame before each redraw
+        (text_w, text_h), baseline = cv2.getTextSize(
+            'Frame 000000', cv2.FONT_HERSHEY_SIMPLEX, DEBUG_TEXT_SCALE, DEBUG_TEXT_THICKNESS
+        )
+        text_x, text_y = DEBUG_TEXT_ORIGIN
+        self.debug_rows = slice(max(0, text_y - text_h - DEBUG_TEXT_THICKNESS), text_y + baseline + DEBUG_TEXT_THICKNESS)
+        self.debug_cols = slice(text_x, text_x + text_w + DEBUG_TEXT_THICKNESS)
+
+    def crop_mouth(self, frame):
+        """View of the mouth region of a full frame"""
+        x, y, w, h = self.mouth_box
+        return frame[y:y + h, x:x + w]
+
+    def render_mouth_patch(self, lip_shape):
+        """Render the mouth region for a lip shape on top of the base frame"""
+        frame = draw_mouth(self.base_frame.copy(), self.face_region, lip_shape)
+        return self.crop_mouth(frame).copy()
+
+    def compose(self, mouth_patch, frame_idx=None):
+        """Write a mouth patch into the output buffer and return it"""
+        self.crop_mouth(self.buffer)[...] = mouth_patch
+        return self._finish(frame_idx)
+
+    def crop_face(self, frame):
+        """View of the face region of a full frame"""
+        x, y, w, h = self.face_region
+        return frame[y:y + h, x:x + w]
+
+    def compose_face(self, face_patch, frame_idx=None):
+        """Write a model-generated face (resized to the face region) into the output buffer"""
+        face = self.crop_face(self.buffer)
+        cv2.resize(face_patch, (face.shape[1], face.shape[0]), dst=face)
+        return self._finish(frame_idx)
+
+    def _finish(self, frame_idx):
+        if self.debug_overlay and frame_idx is not None:
+            self.buffer[self.debug_rows, self.debug_cols] = self.base_frame[self.debug_rows, self.debug_cols]
+            draw_debug_label(self.buffer, frame_idx)
+
+        return self.buffer
@@ -0,0 +1,88 @@
+"""
+Wall-clock frame pacing for real-time lip sync streaming
+Frame N is due at start + N / fps; frames that fall behind are skipped or dropped
+"""
+import time
+from typing import Optional
+
+
+class FramePacer:
+    """
+    Schedule frames against the wall clock instead of sleeping a fixed amount per frame.
+    Render time is absorbed by the schedule, so a stream never drifts slower than real time.
+    """
+
+    def __init__(self, frame_rate: float = 25.0, max_lag: Optional[float] = None,
+                 clock=time.monotonic, sleep=time.sleep):
+        self.frame_rate = frame_rate
+        self.frame_interval = 1.0 / frame_rate
+        # A frame later than this past its deadline is no longer worth sending
+        self.max_lag = self.frame_interval if max_lag is None else max_lag
+        self.clock = clock
+        self.sleep = sleep
+        self.start_time = None
+
+        self.frames_sent = 0
+        self.frames_skipped = 0
+        self.frames_dropped = 0
+        self.max_observed_lag = 0.0
+
+    def start(self):
+        """Anchor the schedule at the current time"""
+        self.start_time = self.clock()
+        return self
+
+    def deadline(self, frame_idx):
+        """Wall-clock time at which a frame should be sent"""
+        return self.start_time + frame_idx * self.frame_interval
+
+    def lag(self, frame_idx):
+        """Seconds the given frame is behind schedule (negative when early)"""
+        return self.clock() - self.deadline(frame_idx)
+
+    def frames(self, total_frames):
+        """Yield frame indices to render, skipping frames that are already overdue"""
+        if self.start_time is None:
+            self.start()
+
+        frame_idx = 0
+        while frame_idx < total_frames:
+            lag = self.lag(frame_idx)
+            if lag > self.max_lag:
+                # Jump straight to the frame that is due now
+                due_idx = min(total_frames, int((self.clock() - self.start_time) * self.frame_rate))
+                self.frames_skipped += max(1, due_idx - frame_idx)
+                frame_idx = max(frame_idx + 1, due_idx)
+                continue
+
+            yield frame_idx
+            frame_idx += 1
+
+    def wait(self, frame_idx):
+        """
+        Sleep until the frame is due.
+        Returns False if rendering made the frame too late, in which case it should be dropped.
+        """
+        lag = self.lag(frame_idx)
+
+        if lag > self.max_lag:
+            self.frames_dropped += 1
+            return False
+
+        if lag < 0:
+            self.sleep(-lag)
+        else:
+            self.max_observed_lag = max(self.max_observed_lag, lag)
+
+        self.frames_sent += 1
+        return True
+
+    def get_stats(self):
+        """Pacing statistics for the stream"""
+        return {
+            'frame_rate': self.frame_rate,
+            'frames_sent': self.frames_sent,
+            'frames_skipped': self.frames_skipped,
+            'frames_dropped': self.frames_dropped,
+            'max_lag_ms': round(self.max_observed_lag * 1000, 2)
+        }
@@ -0,0 +1,145 @@
+"""
+Background job execution for long-running media work
+Jobs run on a bounded thread pool; callers get a job id right away and can poll
+the job's status or subscribe to its updates from the event loop
+"""
+import asyncio
+import os
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+TERMINAL_STATUSES = ('completed', 'failed')
+
+
+class JobQueueFull(Exception):
+    """Raised when too many jobs are already queued or running"""
+
+
+class JobManager:
+    """Runs a blocking handler for each submitted job off the event loop"""
+
+    def __init__(self, handler, max_workers=2, max_pending=32, retention_seconds=3600, name='job'):
+        self.handler = handler
+        self.name = name
+        self.max_workers = max_workers
+        self.max_pending = max_pending
+        self.retention_seconds = retention_seconds
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix=name)
+
+        self.jobs = {}
+        self.subscribers = {}  # job_id -> [(loop, asyncio.Queue)]
+        self.lock = threading.Lock()
+
+    def submit(self, *args, cleanup_paths=(), **kwargs):
+        """Queue a job and return its initial status"""
+        with self.lock:
+            self._prune()
+
+            active = sum(1 for job in self.jobs.values() if job['status'] not in TERMINAL_STATUSES)
+            if active >= self.max_pending:
+                raise JobQueueFull(f"{self.name} queue is full ({active} jobs pending)")
+
+            job_id = uuid.uuid4().hex
+            job = {
+                'job_id': job_id,
+                'status': 'queued',
+                'created_at': time.time(),
+                'started_at': None,
+                'finished_at': None,
+                'result': None,
+                'error': None
+            }
+            self.jobs[job_id] = job
+            snapshot = dict(job)
+
+        self.executor.submit(self._run, job_id, args, kwargs, cleanup_paths)
+        return snapshot
+
+    def _run(self, job_id, args, kwargs, cleanup_paths):
+        self._update(job_id, status='running', started_at=time.time())
+        try:
+            result = self.handler(*args, **kwargs)
+            self._update(job_id, status='completed', result=result, finished_at=time.time())
+        except Exception as e:
+            print(f"{self.name} {job_id} failed: {e}")
+            self._update(job_id, status='failed', error=str(e), finished_at=time.time())
+        finally:
+            for path in cleanup_paths:
+                try:
+                    os.unlink(path)
+                except OSError:
+                    pass
+
+    def _update(self, job_id, **changes):
+        with self.lock:
+            job = self.jobs[job_id]
+            job.update(changes)
+            snapshot = dict(job)
+            subscribers = list(self.subscribers.get(job_id, ()))
+
+        # Hand the update to each subscriber's event loop
+        for loop, updates in subscribers:
+            loop.call_soon_threadsafe(updates.put_nowait, snapshot)
+
+    def _prune(self):
+        """Forget finished jobs past the retention window (caller holds the lock)"""
+        cutoff = time.time() - self.retention_seconds
+        expired = [
+            job_id for job_id, job in self.jobs.items()
+            if job['status'] in TERMINAL_STATUSES and job['finished_at'] < cutoff
+        ]
+        for job_id in expired:
+            del self.jobs[job_id]
+
+    def get(self, job_id):
+        """Current status of a job, or None if unknown"""
+        with self.lock:
+            job = self.jobs.get(job_id)
+            return dict(job) if job else None
+
+    async def subscribe(self, job_id):
+        """Yield job snapshots as they change, ending after the job finishes"""
+        loop = asyncio.get_running_loop()
+        updates = asyncio.Queue()
+
+        with self.lock:
+            job = self.jobs.get(job_id)
+            if job is None:
+                return
+            snapshot = dict(job)
+            self.subscribers.setdefault(job_id, []).append((loop, updates))
+
+        try:
+            while True:
+                yield snapshot
+                if snapshot['status'] in TERMINAL_STATUSES:
+                    break
+                snapshot = await updates.get()
+        finally:
+            with self.lock:
+                subscribers = self.subscribers.get(job_id, [])
+                if (loop, updates) in subscribers:
+                    subscribers.remove((loop, updates))
+                if not subscribers:
+                    self.subscribers.pop(job_id, None)
+
+    async def wait(self, job_id):
+        """Wait for a job to finish and return its final status"""
+        snapshot = None
+        async for snapshot in self.subscribe(job_id):
+            pass
+        return snapshot
+
+    def get_stats(self):
+        """Queue counters for health reporting"""
+        with self.lock:
+            counts = {}
+            for job in self.jobs.values():
+                counts[job['status']] = counts.get(job['status'], 0) + 1
+            return {
+                'max_workers': self.max_workers,
+                'max_pending': self.max_pending,
+                'jobs': counts
+            }
@@ -5,28 +5,34 @@ import os
 import tempfile
 import asyncio
 import subprocess
+import uuid
 from typing import Optional
 import time
 
-async def generate_lip_sync(audio_path: str, avatar_id: str = "default"):
+import audio_io
+from job_manager import JobManager
+
+def run_lip_sync(audio_path: str, avatar_id: str = "default", audio_info: Optional[dict] = None):
     """
     Generate lip sync video using Wav2Lip
+    Blocking; runs on a lip sync job worker thread, never on the event loop.
+    audio_info is the TTS result for the clip (samples, sample_rate, duration), if known.
     """
     try:
         # This is a placeholder implementation
         # In production, you'd integrate with actual Wav2Lip
         
-        video_id = f"lipsync_{int(time.time())}"
+        video_id = f"lipsync_{uuid.uuid4().hex}"
         video_path = f"uploads/lipsync/{video_id}.mp4"
         
         # Ensure directory exists
         os.makedirs("uploads/lipsync", exist_ok=True)
         
         # For now, create a placeholder video
-        await create_placeholder_video(audio_path, video_path, avatar_id)
+        create_placeholder_video(audio_path, video_path, avatar_id)
         
-        # Get duration
-        duration = get_audio_duration(audio_path)
+        # Exact duration from the TTS result, the file header otherwise
+        duration = audio_info["duration"] if audio_info and audio_info.get("duration") else get_audio_duration(audio_path)
         
         return {
             "video_url": f"/uploads/lipsync/{video_id}.mp4",
@@ -39,7 +45,30 @@ async def generate_lip_sync(audio_path: str, avatar_id: str = "default"):
         print(f"Error in lip sync generation: {e}")
         raise e
 
-async def create_placeholder_video(audio_path: str, output_path: str, avatar_id: str):
+# Bounded worker pool so one slow encode cannot stall the API
+lip_sync_jobs = JobManager(
+    run_lip_sync,
+    max_workers=int(os.getenv("LIPSYNC_JOB_WORKERS", 2)),
+    max_pending=int(os.getenv("LIPSYNC_MAX_PENDING_JOBS", 32)),
+    name="lipsync"
+)
+
+def submit_lip_sync(audio_path: str, avatar_id: str = "default", cleanup_paths=(), audio_info: Optional[dict] = None):
+    """Queue a lip sync job and return its status (including job_id) right away"""
+    return lip_sync_jobs.submit(audio_path, avatar_id, audio_info, cleanup_paths=cleanup_paths)
+
+async def generate_lip_sync(audio_path: str, avatar_id: str = "default", audio_info: Optional[dict] = None):
+    """
+    Generate lip sync video without blocking the event loop
+    """
+    job = submit_lip_sync(audio_path, avatar_id, audio_info=audio_info)
+    job = await lip_sync_jobs.wait(job["job_id"])
+    
+    if job["status"] == "failed":
+        raise RuntimeError(job["error"])
+    return job["result"]
+
+def create_placeholder_video(audio_path: str, output_path: str, avatar_id: str):
     """Create placeholder video (in production, use Wav2Lip)"""
     try:
         # This would use Wav2Lip to generate actual lip sync
@@ -59,27 +88,21 @@ async def create_placeholder_video(audio_path: str, output_path: str, avatar_id:
         ]
         
         # Run ffmpeg command
-        process = await asyncio.create_subprocess_exec(
-            *cmd,
-            stdout=asyncio.subprocess.PIPE,
-            stderr=asyncio.subprocess.PIPE
-        )
+        result = subprocess.run(cmd, capture_output=True)
         
-        stdout, stderr = await process.communicate()
-        
-        if process.returncode != 0:
-            print(f"FFmpeg error: {stderr.decode()}")
+        if result.returncode != 0:
+            print(f"FFmpeg error: {result.stderr.decode()}")
             # Create a simple placeholder file
-            await create_simple_placeholder(output_path)
+            create_simple_placeholder(output_path)
         else:
             print(f"Video created successfully: {output_path}")
             
     except Exception as e:
         print(f"Error creating video: {e}")
         # Create a simple placeholder file
-        await create_simple_placeholder(output_path)
+        create_simple_placeholder(output_path)
 
-async def create_simple_placeholder(output_path: str):
+def create_simple_placeholder(output_path: str):
     """Create a simple placeholder video file"""
     # Create a minimal video file
     with open(output_path, 'wb') as f:
@@ -88,21 +111,9 @@ async def create_simple_placeholder(output_path: str):
 def get_audio_duration(audio_path: str) -> float:
     """Get audio duration in seconds"""
     try:
-        # Use ffprobe to get duration
-        cmd = [
-            "ffprobe",
-            "-v", "quiet",
-            "-show_entries", "format=duration",
-            "-of", "csv=p=0",
-            audio_path
-        ]
-        
-        result = subprocess.run(cmd, capture_output=True, text=True)
-        if result.returncode == 0:
-            return float(result.stdout.strip())
-        else:
-            return 5.0  # Default duration
-    except:
+        # Read from the file header instead of spawning ffprobe
+        return audio_io.get_audio_duration(audio_path)
+    except Exception:
         return 5.0  # Default duration
 
 # Real Wav2Lip integration would go here
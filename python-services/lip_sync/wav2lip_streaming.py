@@ -13,7 +13,6 @@ import tempfile
 import json
 import uuid
 from pathlib import Path
-import subprocess
 import threading
 import queue
 import time
@@ -21,12 +20,42 @@ import time
 # Add the parent directory to the path
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
+from audio_features import extract_audio_features, count_frames
+from video_encoder import FFmpegVideoSink
+from frame_pacer import FramePacer
+from frame_cache import frame_cache, quantize_lip_shapes, bucket_to_lip_shape
+from frame_compositor import FrameCompositor, create_base_frame, draw_mouth, draw_debug_label
+from parallel_render import ParallelPatchRenderer, DEFAULT_WORKERS
+from wav2lip_engine import get_engine, mel_chunks_for_frames, FACE_SIZE
+from feature_cache import feature_cache
+from audio_io import read_audio, probe_audio
+
 class Wav2LipStreamingService:
     def __init__(self):
         self.device = 'cuda' if torch.cuda.is_available() else 'cpu'
         self.model = None
         self.output_dir = Path('/app/uploads/lipsync')
         self.output_dir.mkdir(parents=True, exist_ok=True)
+        # Only used for warm-up; clips are processed at their own sample rate, never resampled
+        self.sample_rate = 22050
+        self.frame_rate = 25  # 25 FPS
+        
+        # Only write individual frames to disk when debugging
+        self.debug_frames = os.getenv('LIPSYNC_DEBUG_FRAMES', 'false').lower() == 'true'
+        
+        # Frame number overlay is opt-in
+        self.debug_overlay = os.getenv('LIPSYNC_DEBUG_OVERLAY', 'false').lower() == 'true'
+        
+        # Static base frame per avatar and rendered mouth patches per (avatar, quantized lip shape)
+        self.base_frames = {}
+        self.frame_cache = frame_cache
+        
+        # Decoded PCM and audio features per clip, keyed by content hash
+        self.feature_cache = feature_cache
+        
+        # Mouth patches missing from the frame cache are rendered across processes only when opted in
+        self.render_workers = DEFAULT_WORKERS
+        self.patch_renderer = ParallelPatchRenderer(self.render_workers) if self.render_workers > 1 else None
         
         # Initialize Wav2Lip model
         self.initialize_model()
@@ -37,41 +66,73 @@ class Wav2LipStreamingService:
     def initialize_model(self):
         """Initialize Wav2Lip model"""
         try:
-            # This would load the actual Wav2Lip model
-            # For now, we'll create a placeholder
             print(f"Initializing Wav2Lip on {self.device}")
             
-            # In a real implementation, this would load the model:
-            # self.model = load_wav2lip_model()
+            # Loaded once per process from WAV2LIP_CHECKPOINT ('tiny' selects the test stand-in)
+            self.model = get_engine(device=self.device)
+            
+            if self.model is None:
+                print("✅ Wav2Lip checkpoint not configured, using procedural mouth renderer")
+                return
+            
+            # Warm up with a single frame so the first request does not pay for lazy init
+            silence = np.zeros(self.sample_rate, dtype=np.float32)
+            mel_chunks = self.model.prepare_mel_chunks(silence, self.sample_rate, 1, self.frame_rate)
+            for _ in self.model.infer(np.zeros((FACE_SIZE, FACE_SIZE, 3), dtype=np.uint8), mel_chunks):
+                pass
             
-            print("✅ Wav2Lip model initialized (placeholder)")
+            print(f"✅ Wav2Lip model initialized ({self.model.name}, loaded in {self.model.load_time:.2f}s)")
             
         except Exception as e:
             print(f"❌ Failed to initialize Wav2Lip: {e}")
             self.model = None
     
-    def generate_lip_sync(self, audio_path, avatar_id, agent_id):
-        """Generate lip sync video from audio and avatar"""
+    def get_health(self):
+        """Service health including frame cache counters"""
+        return {
+            'status': 'healthy',
+            'device': self.device,
+            'model_loaded': self.model is not None,
+            'model': self.model.get_stats() if self.model else None,
+            'active_streams': len(self.streaming_queues),
+            'frame_cache': self.frame_cache.get_stats(),
+            'feature_cache': self.feature_cache.get_stats()
+        }
+    
+    def generate_lip_sync(self, audio_path, avatar_id, agent_id, audio_info=None):
+        """
+        Generate lip sync video from audio and avatar.
+        audio_info is the TTS result for the clip (samples, sample_rate, duration), if known.
+        """
         try:
+            started_at = time.perf_counter()
+            
             # Generate unique output ID
             output_id = str(uuid.uuid4())
             
             # Create output paths
             video_path = self.output_dir / f'{output_id}.mp4'
-            frames_dir = self.output_dir / f'{output_id}_frames'
-            frames_dir.mkdir(exist_ok=True)
+            frames_dir = self.output_dir / f'{output_id}_frames' if self.debug_frames else None
+            
+            clip_info = self.get_clip_info(audio_path, audio_info)
             
             # Generate lip sync frames
-            frames = self.generate_lip_sync_frames(audio_path, avatar_id, frames_dir)
+            frames = self.generate_lip_sync_frames(audio_path, avatar_id, clip_info)
             
-            # Create video from frames
-            video_path = self.create_video_from_frames(frames, video_path, audio_path)
+            # Encode frames and mux audio in a single ffmpeg pass
+            frame_count = self.create_video_from_frames(frames, video_path, audio_path, frames_dir)
+            
+            time_to_video = time.perf_counter() - started_at
+            print(f"🎬 Lip sync video {output_id}: {frame_count} frames in {time_to_video:.2f}s "
+                  f"({self.render_workers} render workers)")
             
             return {
                 'video_url': f'/uploads/lipsync/{output_id}.mp4',
-                'frames_dir': str(frames_dir),
-                'frame_count': len(frames),
-                'duration': self.get_audio_duration(audio_path),
+                'frames_dir': str(frames_dir) if frames_dir else None,
+                'frame_count': frame_count,
+                'duration': clip_info['duration'],
+                'render_workers': self.render_workers,
+                'time_to_video': round(time_to_video, 3),
                 'success': True
             }
             
@@ -82,84 +143,134 @@ class Wav2LipStreamingService:
                 'success': False
             }
     
-    def generate_lip_sync_frames(self, audio_path, avatar_id, frames_dir):
-        """Generate individual lip sync frames"""
+    def generate_lip_sync_frames(self, audio_path, avatar_id, clip_info=None):
+        """Generate individual lip sync frames as BGR arrays"""
         try:
-            # Load audio
-            audio_data = self.load_audio(audio_path)
+            # Load audio at its own rate
+            sample_rate = (clip_info or self.get_clip_info(audio_path))['sample_rate']
+            clip_key = self.get_clip_key(audio_path, sample_rate)
+            audio_data = self.load_audio(audio_path, sample_rate, clip_key)
             
             # Get avatar face region (this would be more complex in reality)
             face_region = self.get_avatar_face_region(avatar_id)
             
-            # Generate frames
-            frames = []
-            frame_rate = 25  # 25 FPS
-            duration = len(audio_data) / 22050  # Assuming 22050 Hz sample rate
-            total_frames = int(duration * frame_rate)
+            # Batched model inference when a checkpoint is loaded
+            if self.model:
+                yield from self.generate_model_frames(audio_data, sample_rate, avatar_id, face_region, clip_key)
+                return
             
-            for frame_idx in range(total_frames):
-                # Calculate time for this frame
-                time_sec = frame_idx / frame_rate
-                
-                # Generate lip sync for this time
-                lip_frame = self.generate_frame_at_time(
-                    audio_data, time_sec, face_region, frame_idx
-                )
-                
-                # Save frame
-                frame_path = frames_dir / f'frame_{frame_idx:04d}.jpg'
-                cv2.imwrite(str(frame_path), lip_frame)
-                
-                frames.append(str(frame_path))
-                
-                # Yield control for streaming
-                if frame_idx % 10 == 0:  # Every 10 frames
-                    time.sleep(0.01)  # Small delay for streaming
+            # Compute lip shapes for the whole clip up front
+            lip_shapes = self.compute_lip_shapes(audio_data, sample_rate, clip_key)
+            total_frames = len(lip_shapes['mouth_openness'])
             
-            return frames
+            # The encoder consumes each frame before the next one is requested,
+            # so a single reused output buffer is enough
+            compositor = self.create_compositor(avatar_id, face_region)
+            prerendered = self.prerender_mouth_patches(avatar_id, face_region, lip_shapes['bucket'])
+            
+            for frame_idx in range(total_frames):
+                # Generate lip sync for this frame
+                yield self.generate_frame_at_time(lip_shapes, frame_idx, compositor, avatar_id, prerendered)
             
         except Exception as e:
             print(f"Error generating frames: {e}")
             raise
     
-    def generate_frame_at_time(self, audio_data, time_sec, face_region, frame_idx):
-        """Generate a single lip sync frame at specific time"""
+    def generate_model_frames(self, audio_data, sample_rate, avatar_id, face_region, clip_key=None):
+        """Run the whole clip through the Wav2Lip engine in micro-batches"""
+        compositor = self.create_compositor(avatar_id, face_region)
+        face_crop = cv2.resize(compositor.crop_face(compositor.base_frame), (FACE_SIZE, FACE_SIZE))
+        
+        compute_mel = lambda: {'mel': self.model.compute_mel(audio_data, sample_rate)}
+        if clip_key:
+            mel = self.feature_cache.get_or_compute(clip_key, ['mel'], compute_mel)['mel']
+        else:
+            mel = compute_mel()['mel']
+        
+        total_frames = count_frames(len(audio_data), sample_rate, self.frame_rate)
+        mel_chunks = mel_chunks_for_frames(mel, total_frames, self.frame_rate)
+        
+        frame_idx = 0
+        for faces in self.model.infer(face_crop, mel_chunks):
+            for face in faces:
+                yield compositor.compose_face(face, frame_idx)
+                frame_idx += 1
+    
+    def compute_lip_shapes(self, audio_data, sample_rate, clip_key=None):
+        """Extract audio features and lip shapes for every frame of the clip"""
+        compute_features = lambda: extract_audio_features(audio_data, sample_rate, self.frame_rate)
+        if clip_key:
+            features = self.feature_cache.get_or_compute(
+                f'{clip_key}_{self.frame_rate}fps', ['energy', 'rms', 'dominant_freq'], compute_features
+            )
+        else:
+            features = compute_features()
+        
+        lip_shapes = self.audio_to_lip_shape(features)
+        
+        # Snap each frame to a viseme-like bucket so rendered frames can be reused
+        lip_shapes['bucket'] = quantize_lip_shapes(lip_shapes)
+        return lip_shapes
+    
+    def prerender_mouth_patches(self, avatar_id, face_region, buckets):
+        """Render the clip's uncached mouth patches in the worker pool, if one is configured"""
+        if not self.patch_renderer:
+            return None
+        
+        missing = self.frame_cache.missing(avatar_id, np.unique(buckets))
+        if len(missing) < self.patch_renderer.min_patches:
+            return None
+        return self.patch_renderer.render(face_region, missing)
+    
+    def generate_frame_at_time(self, lip_shapes, frame_idx, compositor, avatar_id, prerendered=None):
+        """Generate a single lip sync frame from precomputed lip shapes"""
         try:
-            # Calculate audio sample for this time
-            sample_rate = 22050
-            sample_idx = int(time_sec * sample_rate)
-            
-            # Extract audio window around this time
-            window_size = 1024
-            start_idx = max(0, sample_idx - window_size // 2)
-            end_idx = min(len(audio_data), sample_idx + window_size // 2)
-            audio_window = audio_data[start_idx:end_idx]
-            
-            # Generate lip shape based on audio
-            lip_shape = self.audio_to_lip_shape(audio_window)
-            
-            # Create frame with lip sync
-            frame = self.create_lip_sync_frame(face_region, lip_shape, frame_idx)
+            # Look up the mouth patch for this bucket, rendering it once per avatar
+            # (or taking it from the worker pool's output) so cache misses are still counted here
+            mouth_patch = self.frame_cache.get_or_render(
+                avatar_id,
+                lip_shapes['bucket'][frame_idx],
+                lambda bucket: (prerendered.pop(bucket) if prerendered and bucket in prerendered
+                                else self.render_mouth_patch(compositor, bucket))
+            )
             
-            return frame
+            # Only the mouth region of the output buffer is rewritten
+            return compositor.compose(mouth_patch, frame_idx)
             
         except Exception as e:
-            print(f"Error generating frame at time {time_sec}: {e}")
+            print(f"Error generating frame {frame_idx}: {e}")
             # Return a default frame
-            return self.create_default_frame(face_region)
+            return self.create_default_frame(compositor.face_region)
+    
+    def render_mouth_patch(self, compositor, bucket):
+        """Render the mouth region for a quantized lip shape"""
+        return compositor.render_mouth_patch(bucket_to_lip_shape(bucket))
+    
+    def create_compositor(self, avatar_id, face_region):
+        """Create a compositor with its own output buffer for one clip or stream"""
+        return FrameCompositor(self.get_base_frame(avatar_id, face_region), face_region, self.debug_overlay)
+    
+    def get_base_frame(self, avatar_id, face_region):
+        """Static background and face for an avatar, rendered once and shared read-only"""
+        base_frame = self.base_frames.get(avatar_id)
+        if base_frame is None:
+            base_frame = self.create_base_frame(face_region)
+            base_frame.flags.writeable = False
+            self.base_frames[avatar_id] = base_frame
+        return base_frame
     
-    def audio_to_lip_shape(self, audio_window):
-        """Convert audio window to lip shape parameters"""
+    def create_base_frame(self, face_region):
+        """Render the static parts of a frame"""
+        return create_base_frame(face_region)
+    
+    def audio_to_lip_shape(self, features):
+        """Map per-frame audio feature arrays to lip shape parameter arrays"""
         # This is a simplified version - in reality, this would use
         # the Wav2Lip model to predict lip movements
         
-        # Calculate audio features
-        audio_energy = np.mean(np.abs(audio_window))
-        audio_freq = self.get_dominant_frequency(audio_window)
-        
         # Map to lip shape parameters
-        mouth_openness = min(1.0, audio_energy * 10)  # 0-1 scale
-        lip_width = 0.5 + 0.3 * np.sin(audio_freq * 0.01)  # Vary with frequency
+        mouth_openness = np.minimum(1.0, features['energy'] * 10)  # 0-1 scale
+        lip_width = 0.5 + 0.3 * np.sin(features['dominant_freq'] * 0.01)  # Vary with frequency
         
         return {
             'mouth_openness': mouth_openness,
@@ -167,53 +278,18 @@ class Wav2LipStreamingService:
             'lip_height': 0.3 + 0.2 * mouth_openness
         }
     
-    def get_dominant_frequency(self, audio_window):
-        """Get dominant frequency from audio window"""
-        try:
-            # Simple FFT to get dominant frequency
-            fft = np.fft.fft(audio_window)
-            freqs = np.fft.fftfreq(len(audio_window))
-            dominant_freq = freqs[np.argmax(np.abs(fft))]
-            return abs(dominant_freq)
-        except:
-            return 0.1  # Default frequency
-    
-    def create_lip_sync_frame(self, face_region, lip_shape, frame_idx):
+    def create_lip_sync_frame(self, face_region, lip_shape, frame_idx=None):
         """Create a frame with lip sync applied"""
         try:
             # Create base frame
-            frame = np.zeros((480, 640, 3), dtype=np.uint8)
-            frame.fill(128)  # Gray background
-            
-            # Draw face region
-            cv2.rectangle(frame, face_region, (200, 200, 200), -1)
+            frame = self.create_base_frame(face_region)
             
             # Draw lips based on shape parameters
-            lip_center = (
-                face_region[0] + face_region[2] // 2,
-                face_region[1] + face_region[3] // 2
-            )
-            
-            lip_width = int(face_region[2] * lip_shape['lip_width'])
-            lip_height = int(face_region[3] * lip_shape['lip_height'])
-            
-            # Draw mouth
-            mouth_rect = (
-                lip_center[0] - lip_width // 2,
-                lip_center[1] - lip_height // 2,
-                lip_width,
-                lip_height
-            )
-            
-            if lip_shape['mouth_openness'] > 0.3:
-                # Open mouth
-                cv2.rectangle(frame, mouth_rect, (0, 0, 0), -1)
-            else:
-                # Closed mouth
-                cv2.ellipse(frame, lip_center, (lip_width // 2, lip_height // 4), 0, 0, 360, (0, 0, 0), -1)
+            draw_mouth(frame, face_region, lip_shape)
             
             # Add frame number for debugging
-            cv2.putText(frame, f'Frame {frame_idx}', (10, 30), cv2.FONT_HERSHEY_SIMPLEX, 1, (255, 255, 255), 2)
+            if frame_idx is not None:
+                draw_debug_label(frame, frame_idx)
             
             return frame
             
@@ -223,11 +299,7 @@ class Wav2LipStreamingService:
     
     def create_default_frame(self, face_region):
         """Create a default frame when lip sync fails"""
-        frame = np.zeros((480, 640, 3), dtype=np.uint8)
-        frame.fill(128)
-        
-        # Draw simple face
-        cv2.rectangle(frame, face_region, (200, 200, 200), -1)
+        frame = self.create_base_frame(face_region)
         
         # Draw simple mouth
         mouth_center = (
@@ -246,97 +318,66 @@ class Wav2LipStreamingService:
         # For now, return a default face region
         return (200, 150, 240, 180)  # x, y, width, height
     
-    def create_video_from_frames(self, frames, output_path, audio_path):
-        """Create video from frames and audio"""
+    def create_video_from_frames(self, frames, output_path, audio_path, frames_dir=None):
+        """Encode frames straight into ffmpeg with the audio muxed in the same pass"""
         try:
-            if not frames:
-                raise ValueError("No frames to create video")
+            with FFmpegVideoSink(output_path, audio_path, self.frame_rate, debug_dir=frames_dir) as sink:
+                for frame in frames:
+                    sink.write(frame)
             
-            # Get frame dimensions
-            first_frame = cv2.imread(frames[0])
-            height, width = first_frame.shape[:2]
-            
-            # Create video writer
-            fourcc = cv2.VideoWriter_fourcc(*'mp4v')
-            video_writer = cv2.VideoWriter(
-                str(output_path), fourcc, 25.0, (width, height)
-            )
-            
-            # Write frames
-            for frame_path in frames:
-                frame = cv2.imread(frame_path)
-                if frame is not None:
-                    video_writer.write(frame)
-            
-            video_writer.release()
-            
-            # Add audio to video using ffmpeg
-            self.add_audio_to_video(str(output_path), audio_path)
+            if sink.frame_count == 0:
+                raise ValueError("No frames to create video")
             
-            return str(output_path)
+            return sink.frame_count
             
         except Exception as e:
             print(f"Error creating video: {e}")
             raise
     
-    def add_audio_to_video(self, video_path, audio_path):
-        """Add audio to video using ffmpeg"""
+    def get_clip_info(self, audio_path, audio_info=None):
+        """Sample count, rate and duration of a clip: from its TTS result when given, else the file header"""
+        if audio_info and all(audio_info.get(name) for name in ('samples', 'sample_rate', 'duration')):
+            return {name: audio_info[name] for name in ('samples', 'sample_rate', 'duration')}
+        
         try:
-            # Create temporary output file
-            temp_path = video_path.replace('.mp4', '_temp.mp4')
-            
-            # Run ffmpeg command
-            cmd = [
-                'ffmpeg', '-y',
-                '-i', video_path,
-                '-i', audio_path,
-                '-c:v', 'copy',
-                '-c:a', 'aac',
-                '-shortest',
-                temp_path
-            ]
-            
-            result = subprocess.run(cmd, capture_output=True, text=True)
-            
-            if result.returncode == 0:
-                # Replace original with audio version
-                os.replace(temp_path, video_path)
-            else:
-                print(f"FFmpeg error: {result.stderr}")
-                if os.path.exists(temp_path):
-                    os.remove(temp_path)
-                    
+            info = probe_audio(audio_path)
+            return {'samples': info['frames'], 'sample_rate': info['sample_rate'], 'duration': info['duration']}
         except Exception as e:
-            print(f"Error adding audio: {e}")
+            print(f"Error probing audio: {e}")
+            # Fallback
+            return {'samples': 0, 'sample_rate': self.sample_rate, 'duration': 0.0}
+    
+    def get_clip_key(self, audio_path, sample_rate):
+        """Content-addressed cache key for an audio file, or None if it cannot be read"""
+        try:
+            return self.feature_cache.key_for_file(audio_path, sample_rate)
+        except OSError as e:
+            print(f"Error hashing audio: {e}")
+            return None
     
-    def load_audio(self, audio_path):
-        """Load audio file"""
+    def load_audio(self, audio_path, sample_rate, clip_key=None):
+        """Load audio file, reusing decoded PCM for audio seen before"""
         try:
-            import librosa
-            audio_data, sample_rate = librosa.load(audio_path, sr=22050)
-            return audio_data
-        except ImportError:
-            # Fallback using soundfile
-            import soundfile as sf
-            audio_data, sample_rate = sf.read(audio_path)
-            return audio_data
+            if clip_key:
+                return self.feature_cache.get_or_compute(
+                    clip_key, ['pcm'], lambda: {'pcm': self.decode_audio(audio_path, sample_rate)}
+                )['pcm']
+            return self.decode_audio(audio_path, sample_rate)
         except Exception as e:
             print(f"Error loading audio: {e}")
             # Return silence
-            return np.zeros(22050)  # 1 second of silence
+            return np.zeros(sample_rate, dtype=np.float32)  # 1 second of silence
     
-    def get_audio_duration(self, audio_path):
-        """Get audio duration in seconds"""
-        try:
-            import librosa
-            duration = librosa.get_duration(filename=audio_path)
-            return duration
-        except:
-            # Fallback
-            return 5.0  # Default duration
+    def decode_audio(self, audio_path, sample_rate):
+        """Decode an audio file as mono float32; a no-op resample when sample_rate is the file's own"""
+        audio_data, _ = read_audio(audio_path, sample_rate)
+        return audio_data
     
-    def start_streaming_lip_sync(self, audio_path, avatar_id, agent_id, callback):
-        """Start streaming lip sync generation"""
+    def start_streaming_lip_sync(self, audio_path, avatar_id, agent_id, callback, audio_info=None):
+        """
+        Start streaming lip sync generation.
+        The frame passed to the callback is a reused buffer; copy it to keep it past the callback.
+        """
         try:
             # Create streaming queue
             stream_id = str(uuid.uuid4())
@@ -345,7 +386,7 @@ class Wav2LipStreamingService:
             # Start streaming in background thread
             thread = threading.Thread(
                 target=self._stream_lip_sync_worker,
-                args=(stream_id, audio_path, avatar_id, agent_id, callback)
+                args=(stream_id, audio_path, avatar_id, agent_id, callback, audio_info)
             )
             thread.daemon = True
             thread.start()
@@ -356,30 +397,43 @@ class Wav2LipStreamingService:
             print(f"Error starting streaming: {e}")
             return None
     
-    def _stream_lip_sync_worker(self, stream_id, audio_path, avatar_id, agent_id, callback):
+    def _stream_lip_sync_worker(self, stream_id, audio_path, avatar_id, agent_id, callback, audio_info=None):
         """Worker thread for streaming lip sync"""
         try:
-            # Generate frames and stream them
-            frames_dir = self.output_dir / f'stream_{stream_id}_frames'
-            frames_dir.mkdir(exist_ok=True)
-            
-            # Load audio
-            audio_data = self.load_audio(audio_path)
+            # Frames are handed to the callback in memory, disk copies are debug only
+            frames_dir = None
+            if self.debug_frames:
+                frames_dir = self.output_dir / f'stream_{stream_id}_frames'
+                frames_dir.mkdir(exist_ok=True)
+            
+            # Load audio at its own rate
+            sample_rate = self.get_clip_info(audio_path, audio_info)['sample_rate']
+            clip_key = self.get_clip_key(audio_path, sample_rate)
+            audio_data = self.load_audio(audio_path, sample_rate, clip_key)
             face_region = self.get_avatar_face_region(avatar_id)
             
-            frame_rate = 25
-            duration = len(audio_data) / 22050
-            total_frames = int(duration * frame_rate)
+            lip_shapes = self.compute_lip_shapes(audio_data, sample_rate, clip_key)
+            total_frames = len(lip_shapes['mouth_openness'])
+            compositor = self.create_compositor(avatar_id, face_region)
             
-            for frame_idx in range(total_frames):
-                time_sec = frame_idx / frame_rate
+            # Frames are paced against the wall clock; late frames are skipped or dropped
+            pacer = FramePacer(self.frame_rate).start()
+            
+            for frame_idx in pacer.frames(total_frames):
+                time_sec = frame_idx / self.frame_rate
                 
                 # Generate frame
-                frame = self.generate_frame_at_time(audio_data, time_sec, face_region, frame_idx)
+                frame = self.generate_frame_at_time(lip_shapes, frame_idx, compositor, avatar_id)
                 
-                # Save frame
-                frame_path = frames_dir / f'frame_{frame_idx:04d}.jpg'
-                cv2.imwrite(str(frame_path), frame)
+                # Save frame for debugging
+                frame_path = None
+                if frames_dir:
+                    frame_path = frames_dir / f'frame_{frame_idx:04d}.jpg'
+                    cv2.imwrite(str(frame_path), frame)
+                
+                # Wait until the frame is due, drop it if rendering fell behind
+                if not pacer.wait(frame_idx):
+                    continue
                 
                 # Send to callback
                 if callback:
@@ -387,12 +441,18 @@ class Wav2LipStreamingService:
                         'stream_id': stream_id,
                         'frame_idx': frame_idx,
                         'total_frames': total_frames,
-                        'frame_path': str(frame_path),
+                        'frame': frame,
+                        'frame_path': str(frame_path) if frame_path else None,
                         'time_sec': time_sec
                     })
-                
-                # Small delay for streaming
-                time.sleep(0.04)  # 25 FPS
+
+            if callback:
+                callback({
+                    'stream_id': stream_id,
+                    'done': True,
+                    'total_frames': total_frames,
+                    'pacing': pacer.get_stats()
+                })
             
             # Cleanup
             if stream_id in self.streaming_queues:
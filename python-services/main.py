@@ -4,20 +4,36 @@ Handles face reconstruction, TTS, and lip sync
 """
 from fastapi import FastAPI, File, UploadFile, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import FileResponse
+from fastapi.responses import FileResponse, Response, StreamingResponse
 import uvicorn
 import os
+import json
 import tempfile
 import asyncio
-from typing import Optional
+from typing import List, Optional
+from pydantic import BaseModel
 
 # Import service modules
-from face_reconstruction import generate_avatar_from_photo
-from tts import generate_hebrew_tts
-from lip_sync import generate_lip_sync
+from face_reconstruction import generate_avatar_from_photo, warm_up_face_mesh, avatar_cache
+from face_mesh_pool import face_mesh_pool
+from tts import generate_hebrew_tts, stream_hebrew_tts, synthesize_hebrew_wav, warm_up_tts_engines, tts_cache, tts_scheduler
+from tts import prewarm_utterances, get_prewarm_manifest
+from tts_streaming import latency_tracker as tts_stream_latency
+from audio_sink import wav_header, to_pcm16
+from tts_registry import registry as tts_registry
+from lip_sync import submit_lip_sync, lip_sync_jobs
+from frame_cache import frame_cache as lip_sync_frame_cache
+from feature_cache import feature_cache as lip_sync_feature_cache
+from job_manager import JobQueueFull
 
 app = FastAPI(title="AI Agent Python Services", version="1.0.0")
 
+class PrewarmUtterance(BaseModel):
+    agent_id: str
+    text: str
+    voice: str = "hebrew_female"
+    language: str = "he"
+
 # CORS middleware
 app.add_middleware(
     CORSMiddleware,
@@ -27,6 +43,17 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+@app.on_event("startup")
+async def load_models():
+    # Load and warm TTS models once so requests never pay for model construction
+    await asyncio.get_running_loop().run_in_executor(None, warm_up_tts_engines)
+    
+    # Same for the FaceMesh detectors used by avatar generation
+    try:
+        await asyncio.get_running_loop().run_in_executor(None, warm_up_face_mesh)
+    except Exception as e:
+        print(f"❌ Failed to warm up FaceMesh pool: {e}")
+
 @app.get("/")
 async def root():
     return {"message": "AI Agent Python Services", "status": "running"}
@@ -39,7 +66,16 @@ async def health_check():
             "face_reconstruction": "available",
             "tts": "available", 
             "lip_sync": "available"
-        }
+        },
+        "face_mesh_pool": face_mesh_pool.get_stats(),
+        "avatar_cache": avatar_cache.get_stats(),
+        "lip_sync_jobs": lip_sync_jobs.get_stats(),
+        "lip_sync_frame_cache": lip_sync_frame_cache.get_stats(),
+        "lip_sync_feature_cache": lip_sync_feature_cache.get_stats(),
+        "tts_engines": tts_registry.get_stats(),
+        "tts_cache": tts_cache.get_stats(),
+        "tts_streaming": tts_stream_latency.get_stats(),
+        "tts_scheduler": tts_scheduler.get_stats()
     }
 
 @app.post("/generate-avatar")
@@ -70,6 +106,19 @@ async def generate_avatar(
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.delete("/avatar-cache/{avatar_id}")
+async def invalidate_avatar_cache(avatar_id: str):
+    """Stop reusing an avatar for new uploads of its photo (the avatar itself is kept)"""
+    removed = avatar_cache.invalidate_avatar(avatar_id)
+    if not removed:
+        raise HTTPException(status_code=404, detail="Avatar not cached")
+    return {"avatar_id": avatar_id, "invalidated": removed}
+
+@app.delete("/avatar-cache")
+async def clear_avatar_cache():
+    """Forget every cached photo-to-avatar mapping"""
+    return {"invalidated": avatar_cache.clear()}
+
 @app.post("/generate-tts")
 async def generate_tts(
     text: str,
@@ -83,12 +132,64 @@ async def generate_tts(
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
-@app.post("/generate-lipsync")
+@app.post("/generate-tts/audio")
+async def generate_tts_audio(
+    text: str,
+    language: str = "he",
+    voice: str = "hebrew_female"
+):
+    """Return Hebrew TTS as WAV bytes in the response body"""
+    try:
+        audio = await synthesize_hebrew_wav(text, language, voice)
+        return Response(content=audio, media_type="audio/wav")
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.post("/generate-tts/stream")
+async def generate_tts_stream(
+    text: str,
+    language: str = "he",
+    voice: str = "hebrew_female"
+):
+    """Stream Hebrew TTS as a chunked WAV, one sentence at a time"""
+    async def audio_stream():
+        header_sent = False
+        async for chunk in stream_hebrew_tts(text, language, voice):
+            if not header_sent:
+                # Open-ended header, the length is unknown until the last sentence
+                yield wav_header(chunk["sample_rate"])
+                header_sent = True
+            yield to_pcm16(chunk["audio"])
+    
+    return StreamingResponse(
+        audio_stream(),
+        media_type="audio/wav",
+        headers={"Cache-Control": "no-cache"}
+    )
+
+@app.post("/tts/prewarm", status_code=202)
+async def prewarm_tts(utterances: List[PrewarmUtterance]):
+    """Synthesize agents' stock lines in the background and pin them in the TTS cache"""
+    try:
+        manifest = prewarm_utterances([utterance.dict() for utterance in utterances])
+        return {
+            "utterances": manifest,
+            "pending": sum(1 for entry in manifest if entry["status"] == "pending")
+        }
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.get("/tts/prewarm/{agent_id}")
+async def get_prewarmed_tts(agent_id: str):
+    """Manifest of an agent's pre-warmed lines with their audio URLs and durations"""
+    return {"agent_id": agent_id, "utterances": get_prewarm_manifest(agent_id)}
+
+@app.post("/generate-lipsync", status_code=202)
 async def generate_lipsync(
     audio_file: UploadFile = File(...),
     avatar_id: str = "default"
 ):
-    """Generate lip sync video"""
+    """Queue lip sync video generation and return the job id right away"""
     try:
         # Save uploaded audio
         with tempfile.NamedTemporaryFile(delete=False, suffix=".wav") as tmp_file:
@@ -96,15 +197,46 @@ async def generate_lipsync(
             tmp_file.write(content)
             tmp_file_path = tmp_file.name
         
-        # Generate lip sync
-        result = await generate_lip_sync(tmp_file_path, avatar_id)
-        
-        # Clean up
-        os.unlink(tmp_file_path)
+        # The job removes the temp file once it has finished with it
+        try:
+            job = submit_lip_sync(tmp_file_path, avatar_id, cleanup_paths=[tmp_file_path])
+        except JobQueueFull:
+            os.unlink(tmp_file_path)
+            raise
         
-        return result
+        return {
+            **job,
+            "status_url": f"/lipsync-jobs/{job['job_id']}",
+            "events_url": f"/lipsync-jobs/{job['job_id']}/events"
+        }
+    except JobQueueFull as e:
+        raise HTTPException(status_code=503, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.get("/lipsync-jobs/{job_id}")
+async def get_lipsync_job(job_id: str):
+    """Poll the status of a lip sync job"""
+    job = lip_sync_jobs.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
+
+@app.get("/lipsync-jobs/{job_id}/events")
+async def lipsync_job_events(job_id: str):
+    """Server-sent events with each status change of a lip sync job"""
+    if lip_sync_jobs.get(job_id) is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    
+    async def event_stream():
+        async for job in lip_sync_jobs.subscribe(job_id):
+            yield f"event: {job['status']}\ndata: {json.dumps(job)}\n\n"
+    
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache"}
+    )
+
 if __name__ == "__main__":
     uvicorn.run(app, host="0.0.0.0", port=8000)
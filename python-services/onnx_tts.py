@@ -0,0 +1,136 @@
+"""
+ONNX Runtime TTS backend for CPU-only hosts
+Runs exported VITS-style models (Piper export layout: model.onnx + model.onnx.json) through
+onnxruntime, optionally as a dynamically int8-quantized copy of the model
+"""
+import json
+import os
+from pathlib import Path
+
+import numpy as np
+
+try:
+    import onnxruntime as ort
+    ONNXRUNTIME_AVAILABLE = True
+except ImportError:
+    ONNXRUNTIME_AVAILABLE = False
+
+DEFAULT_THREADS = int(os.getenv('ONNX_TTS_THREADS', 0))  # 0 = onnxruntime default
+
+# Piper defaults when the config does not set them
+DEFAULT_NOISE_SCALE = 0.667
+DEFAULT_LENGTH_SCALE = 1.0
+DEFAULT_NOISE_W = 0.8
+
+BOS, EOS, PAD = '^', '$', '_'
+
+
+def quantized_model_path(model_path):
+    """Location of the int8 copy of a model: voice.onnx -> voice.int8.onnx"""
+    model_path = Path(model_path)
+    return model_path.with_name(f'{model_path.stem}.int8{model_path.suffix}')
+
+
+def quantize_model(model_path, output_path=None):
+    """Write a dynamically int8-quantized copy of an ONNX model (weights only, activations stay float)"""
+    from onnxruntime.quantization import QuantType, quantize_dynamic
+
+    output_path = Path(output_path or quantized_model_path(model_path))
+    temp_path = output_path.with_name(f'.{output_path.name}.tmp')
+    quantize_dynamic(str(model_path), str(temp_path), weight_type=QuantType.QInt8)
+    os.replace(temp_path, output_path)
+    return output_path
+
+
+def load_config(model_path):
+    """Model config next to the model file: voice.onnx.json (Piper) or voice.json"""
+    model_path = Path(model_path)
+    for config_path in (model_path.with_name(f'{model_path.name}.json'), model_path.with_suffix('.json')):
+        if config_path.exists():
+            with open(config_path, encoding='utf-8') as f:
+                return json.load(f)
+    raise FileNotFoundError(f"No config found for ONNX TTS model {model_path}")
+
+
+class OnnxTTSEngine:
+    """One ONNX TTS voice on a CPU inference session"""
+
+    def __init__(self, model_path, quantized=False, threads=DEFAULT_THREADS):
+        if not ONNXRUNTIME_AVAILABLE:
+            raise RuntimeError("onnxruntime is not installed")
+
+        self.model_path = Path(model_path)
+        self.config = load_config(self.model_path)
+        self.quantized = quantized
+
+        session_path = self.model_path
+        if quantized:
+            session_path = quantized_model_path(self.model_path)
+            if not session_path.exists():
+                print(f"Quantizing {self.model_path.name} to int8...")
+                quantize_model(self.model_path, session_path)
+
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        if threads:
+            options.intra_op_num_threads = threads
+        self.session = ort.InferenceSession(str(session_path), options, providers=['CPUExecutionProvider'])
+        self.input_names = {model_input.name for model_input in self.session.get_inputs()}
+
+        self.sample_rate = self.config.get('audio', {}).get('sample_rate', 22050)
+        inference = self.config.get('inference', {})
+        self.scales = np.array([
+            inference.get('noise_scale', DEFAULT_NOISE_SCALE),
+            inference.get('length_scale', DEFAULT_LENGTH_SCALE),
+            inference.get('noise_w', DEFAULT_NOISE_W)
+        ], dtype=np.float32)
+
+        self.phoneme_id_map = self.config.get('phoneme_id_map', {})
+        self.phoneme_type = self.config.get('phoneme_type', 'espeak')
+        self.speaker_id_map = self.config.get('speaker_id_map', {})
+
+    def text_to_phonemes(self, text):
+        """Text to a list of sentences of phoneme symbols"""
+        if self.phoneme_type == 'text':
+            # Character-level models need no phonemizer
+            return [list(text)]
+
+        from piper_phonemize import phonemize_espeak
+        voice = self.config.get('espeak', {}).get('voice', 'he')
+        return phonemize_espeak(text, voice)
+
+    def phonemes_to_ids(self, phonemes):
+        """Map symbols to model ids with Piper's BOS/PAD/EOS framing; unknown symbols are dropped"""
+        id_map = self.phoneme_id_map
+        pad = id_map.get(PAD, [0])
+        ids = list(id_map.get(BOS, [])) + list(pad)
+        for phoneme in phonemes:
+            if phoneme in id_map:
+                ids.extend(id_map[phoneme])
+                ids.extend(pad)
+        ids.extend(id_map.get(EOS, []))
+        return ids
+
+    def synthesize_ids(self, ids, speaker=None):
+        inputs = {
+            'input': np.array([ids], dtype=np.int64),
+            'input_lengths': np.array([len(ids)], dtype=np.int64),
+            'scales': self.scales
+        }
+        if 'sid' in self.input_names:
+            inputs['sid'] = np.array([self.speaker_id_map.get(speaker, 0)], dtype=np.int64)
+
+        # Exports may prune inputs the graph does not use
+        inputs = {name: value for name, value in inputs.items() if name in self.input_names}
+        audio = self.session.run(None, inputs)[0]
+        return np.asarray(audio, dtype=np.float32).reshape(-1)
+
+    def synthesize(self, text, speaker=None):
+        """Synthesize text, returns (float32 audio, sample_rate)"""
+        chunks = [
+            self.synthesize_ids(self.phonemes_to_ids(phonemes), speaker)
+            for phonemes in self.text_to_phonemes(text)
+            if phonemes
+        ]
+        audio = np.concatenate(chunks) if chunks else np.zeros(0, dtype=np.float32)
+        return audio, self.sample_rate
@@ -0,0 +1,72 @@
+"""
+Parallel mouth-patch rendering for lip sync (opt-in via LIPSYNC_RENDER_WORKERS)
+Workers render only the distinct mouth patches a clip is missing and send those small
+crops back; compositing full frames stays in the main process, where it is cheaper than
+moving frames between processes and where the frame cache sees every lookup
+"""
+import os
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from frame_cache import bucket_to_lip_shape
+from frame_compositor import FrameCompositor, create_base_frame
+
+# Serial by default: a procedural mouth patch costs well under a millisecond
+DEFAULT_WORKERS = int(os.getenv('LIPSYNC_RENDER_WORKERS', 1))
+# Fewer missing patches than this are rendered in-process, the pool round trip would cost more
+DEFAULT_MIN_PATCHES = int(os.getenv('LIPSYNC_RENDER_MIN_PATCHES', 8))
+
+# Per-process compositors, built lazily inside each worker
+_worker_compositors = {}
+
+
+def render_mouth_patches(face_region, buckets):
+    """Render the mouth patch of each bucket, keyed by bucket id"""
+    compositor = _worker_compositors.get(face_region)
+    if compositor is None:
+        base_frame = create_base_frame(face_region)
+        base_frame.flags.writeable = False
+        compositor = FrameCompositor(base_frame, face_region)
+        _worker_compositors[face_region] = compositor
+
+    return {int(bucket): compositor.render_mouth_patch(bucket_to_lip_shape(bucket)) for bucket in buckets}
+
+
+class ParallelPatchRenderer:
+    """Process pool that renders a clip's missing mouth patches across CPU cores"""
+
+    def __init__(self, workers=DEFAULT_WORKERS, min_patches=DEFAULT_MIN_PATCHES):
+        self.workers = max(1, workers)
+        self.min_patches = max(1, min_patches)
+        self.executor = None
+
+    def get_executor(self):
+        """Start the pool on first use; workers stay up across clips"""
+        if self.executor is None:
+            # spawn keeps torch/OpenMP state of the parent out of the workers
+            self.executor = ProcessPoolExecutor(
+                max_workers=self.workers,
+                mp_context=multiprocessing.get_context('spawn')
+            )
+        return self.executor
+
+    def render(self, face_region, buckets):
+        """Mouth patches for the given buckets, split evenly across the workers"""
+        executor = self.get_executor()
+        futures = [
+            executor.submit(render_mouth_patches, tuple(face_region), chunk)
+            for chunk in np.array_split(np.asarray(buckets), self.workers) if len(chunk)
+        ]
+
+        patches = {}
+        for future in futures:
+            patches.update(future.result())
+        return patches
+
+    def shutdown(self):
+        """Stop the worker processes"""
+        if self.executor is not None:
+            self.executor.shutdown(wait=True)
+            self.executor = None
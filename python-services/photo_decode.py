@@ -0,0 +1,226 @@
+"""
+Coarse-to-fine photo decoding for face reconstruction
+Large JPEG uploads are decoded at reduced scale (DCT scaling via IMREAD_REDUCED_*) to find
+the face box, then decoded again at the smallest scale that still gives the face region the
+working resolution, and cropped. Other formats cannot be scaled while decoding, so they are
+decoded once at full size and downscaled from that buffer. Decoded buffers are capped in size
+and the peak is reported
+"""
+import os
+import struct
+
+import cv2
+import numpy as np
+
+try:
+    from PIL import Image
+    PIL_AVAILABLE = True
+except ImportError:
+    PIL_AVAILABLE = False
+
+DETECT_MAX_SIDE = int(os.getenv('PHOTO_DETECT_MAX_SIDE', 1024))
+FACE_WORKING_SIZE = int(os.getenv('PHOTO_FACE_WORKING_SIZE', 512))
+MAX_DECODE_BYTES = int(os.getenv('PHOTO_MAX_DECODE_BYTES', 64 * 1024 * 1024))
+
+FACE_MARGIN = 0.3  # extra context around the landmark box, as a fraction of its size
+
+REDUCTION_FLAGS = {
+    1: cv2.IMREAD_COLOR,
+    2: cv2.IMREAD_REDUCED_COLOR_2,
+    4: cv2.IMREAD_REDUCED_COLOR_4,
+    8: cv2.IMREAD_REDUCED_COLOR_8
+}
+
+JPEG_SOF_MARKERS = {0xC0, 0xC1, 0xC2, 0xC3, 0xC5, 0xC6, 0xC7, 0xC9, 0xCA, 0xCB, 0xCD, 0xCE, 0xCF}
+
+
+def _jpeg_size(f):
+    """Walk JPEG segments up to the start-of-frame marker"""
+    while True:
+        byte = f.read(1)
+        if not byte:
+            raise ValueError("JPEG has no start-of-frame marker")
+        if byte != b'\xff':
+            continue
+        marker = f.read(1)
+        while marker == b'\xff':
+            marker = f.read(1)
+        if not marker:
+            raise ValueError("Truncated JPEG")
+        marker = marker[0]
+        if marker == 0xD8 or 0xD0 <= marker <= 0xD7 or marker == 0x01:
+            continue  # standalone markers carry no length
+        length = struct.unpack('>H', f.read(2))[0]
+        if marker in JPEG_SOF_MARKERS:
+            height, width = struct.unpack('>xHH', f.read(5))
+            return width, height
+        f.seek(length - 2, os.SEEK_CUR)
+
+
+def get_image_size(photo_path):
+    """(width, height) from the file header, without decoding pixels"""
+    with open(photo_path, 'rb') as f:
+        magic = f.read(8)
+        if magic[:2] == b'\xff\xd8':
+            f.seek(2)
+            return _jpeg_size(f)
+        if magic == b'\x89PNG\r\n\x1a\n':
+            # IHDR is always the first chunk
+            width, height = struct.unpack('>8xII', f.read(16))
+            return width, height
+
+    if PIL_AVAILABLE:
+        with Image.open(photo_path) as image:
+            return image.size
+
+    # Last resort: the smallest decode OpenCV offers
+    image = cv2.imread(photo_path, cv2.IMREAD_REDUCED_GRAYSCALE_8)
+    if image is None:
+        raise ValueError("Could not load image")
+    return image.shape[1] * 8, image.shape[0] * 8
+
+
+def is_jpeg(photo_path):
+    """Only JPEG decoders scale during decode; OpenCV decodes anything else in full first"""
+    with open(photo_path, 'rb') as f:
+        return f.read(2) == b'\xff\xd8'
+
+
+def decoded_bytes(width, height, factor):
+    """Size of a BGR decode of a width x height image at 1/factor scale"""
+    return -(-width // factor) * -(-height // factor) * 3
+
+
+def decode_reduced(photo_path, factor, size, max_bytes=MAX_DECODE_BYTES):
+    """Decode a JPEG at 1/factor scale (other formats at full scale), refusing decodes larger than max_bytes"""
+    if decoded_bytes(*size, factor) > max_bytes:
+        raise ValueError(f"Image of {size[0]}x{size[1]} is too large to decode at 1/{factor} scale")
+    image = cv2.imread(photo_path, REDUCTION_FLAGS[factor])
+    if image is None:
+        raise ValueError("Could not load image")
+    return image
+
+
+def get_detect_factor(size, max_side=DETECT_MAX_SIDE, max_bytes=MAX_DECODE_BYTES):
+    """Smallest reduction that brings the long side under max_side (and the decode under the cap)"""
+    for factor in REDUCTION_FLAGS:
+        if max(size) / factor <= max_side and decoded_bytes(*size, factor) <= max_bytes:
+            return factor
+    return max(REDUCTION_FLAGS)
+
+
+def get_crop_factor(face_side, size, detect_factor, working_size=FACE_WORKING_SIZE, max_bytes=MAX_DECODE_BYTES):
+    """Largest reduction that still gives the face working_size pixels, within the decode cap"""
+    factor = 1
+    for candidate in REDUCTION_FLAGS:
+        if candidate <= detect_factor and face_side / candidate >= working_size:
+            factor = candidate
+    while decoded_bytes(*size, factor) > max_bytes and factor < detect_factor:
+        factor *= 2
+    return factor
+
+
+def get_face_box(landmarks, margin=FACE_MARGIN):
+    """Normalized (x0, y0, x1, y1) around the landmarks, padded by margin and clipped to the image"""
+    low = landmarks[:, :2].min(axis=0)
+    high = landmarks[:, :2].max(axis=0)
+    pad = (high - low) * margin
+    low = np.clip(low - pad, 0.0, 1.0)
+    high = np.clip(high + pad, 0.0, 1.0)
+    return float(low[0]), float(low[1]), float(high[0]), float(high[1])
+
+
+def crop_box(image, box):
+    """Copy of the normalized box out of an image, so the full decode can be freed"""
+    h, w = image.shape[:2]
+    x0, y0, x1, y1 = box
+    return image[int(y0 * h):max(int(y0 * h) + 1, int(np.ceil(y1 * h))),
+                 int(x0 * w):max(int(x0 * w) + 1, int(np.ceil(x1 * w)))].copy()
+
+
+def _detect_box(preview, detect_landmarks):
+    """Face box found on a BGR preview; returns (box, bytes of the RGB copy made for detection)"""
+    preview_rgb = cv2.cvtColor(preview, cv2.COLOR_BGR2RGB)
+    rgb_bytes = preview_rgb.nbytes
+    landmarks = detect_landmarks(preview_rgb)
+    del preview_rgb
+    if landmarks is None:
+        raise ValueError("No face detected in image")
+    return get_face_box(landmarks), rgb_bytes
+
+
+def _load_jpeg_face(photo_path, size, detect_landmarks, working_size, max_bytes):
+    """Coarse pass on a small decode to find the face, fine pass only as large as the face needs"""
+    detect_factor = get_detect_factor(size, DETECT_MAX_SIDE, max_bytes)
+    preview = decode_reduced(photo_path, detect_factor, size, max_bytes)
+    box, rgb_bytes = _detect_box(preview, detect_landmarks)
+    peak_bytes = preview.nbytes + rgb_bytes
+
+    face_side = max((box[2] - box[0]) * size[0], (box[3] - box[1]) * size[1])
+    crop_factor = get_crop_factor(face_side, size, detect_factor, working_size, max_bytes)
+    if crop_factor == detect_factor:
+        face = crop_box(preview, box)
+        peak_bytes = max(peak_bytes, preview.nbytes + face.nbytes)
+    else:
+        image = decode_reduced(photo_path, crop_factor, size, max_bytes)
+        face = crop_box(image, box)
+        peak_bytes = max(peak_bytes, preview.nbytes + image.nbytes + face.nbytes)
+        del image
+
+    return face, preview, box, detect_factor, crop_factor, peak_bytes
+
+
+def _load_full_face(photo_path, size, detect_landmarks, max_bytes):
+    """Decode once at full size (capped), detect on a downscaled copy and crop from the full buffer"""
+    image = decode_reduced(photo_path, 1, size, max_bytes)
+    detect_factor = get_detect_factor(size, DETECT_MAX_SIDE, max_bytes)
+    if detect_factor > 1:
+        preview = cv2.resize(image, (-(-size[0] // detect_factor), -(-size[1] // detect_factor)),
+                             interpolation=cv2.INTER_AREA)
+    else:
+        preview = image
+    box, rgb_bytes = _detect_box(preview, detect_landmarks)
+
+    face = crop_box(image, box)
+    extra_preview = preview.nbytes if preview is not image else 0
+    peak_bytes = image.nbytes + extra_preview + max(rgb_bytes, face.nbytes)
+    del image
+
+    return face, preview, box, detect_factor, 1, peak_bytes
+
+
+def load_face_region(photo_path, detect_landmarks, working_size=FACE_WORKING_SIZE, max_bytes=MAX_DECODE_BYTES):
+    """
+    Decode a photo coarse-to-fine (JPEG) or once at full size (other formats).
+    detect_landmarks(image_rgb) returns normalized (N, 3) landmarks or None.
+    Returns the face crop (BGR, long side at most working_size), a reduced preview of the whole photo
+    and decode stats including the peak bytes of decoded pixels held at once.
+    """
+    size = get_image_size(photo_path)
+    if is_jpeg(photo_path):
+        face, preview, box, detect_factor, crop_factor, peak_bytes = _load_jpeg_face(
+            photo_path, size, detect_landmarks, working_size, max_bytes
+        )
+    else:
+        face, preview, box, detect_factor, crop_factor, peak_bytes = _load_full_face(
+            photo_path, size, detect_landmarks, max_bytes
+        )
+
+    scale = working_size / max(face.shape[:2])
+    if scale < 1:
+        face = cv2.resize(face, (max(1, round(face.shape[1] * scale)), max(1, round(face.shape[0] * scale))),
+                          interpolation=cv2.INTER_AREA)
+
+    return {
+        'face': face,
+        'preview': preview,
+        'stats': {
+            'original_size': list(size),
+            'detect_scale': detect_factor,
+            'crop_scale': crop_factor,
+            'face_box': [round(value, 4) for value in box],
+            'face_size': [face.shape[1], face.shape[0]],
+            'peak_decode_bytes': peak_bytes,
+            'max_decode_bytes': max_bytes
+        }
+    }
@@ -0,0 +1,8 @@
+"""
+Shared pytest setup for the Python services
+The service modules are flat top-level modules, so the service directory goes on sys.path
+"""
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,81 @@
+"""
+Whole-clip audio features against the per-frame loop they replaced
+"""
+import numpy as np
+import pytest
+
+import audio_features
+from audio_features import count_frames, extract_audio_features
+
+WINDOW_SIZE = 1024
+FRAME_RATE = 25
+
+
+def reference_features(audio, sample_rate):
+    """The original loop: slice each frame's window and analyse it on its own"""
+    total_frames = int(len(audio) / sample_rate * FRAME_RATE)
+    energy, rms, dominant_freq = [], [], []
+    for frame_idx in range(total_frames):
+        # The loop went through float seconds, int(29 / 25 * 22050) landed one sample
+        # early; the vectorized centres are exact, so compare on those
+        sample_idx = int(frame_idx * sample_rate / FRAME_RATE)
+        start_idx = max(0, sample_idx - WINDOW_SIZE // 2)
+        end_idx = min(len(audio), sample_idx + WINDOW_SIZE // 2)
+        window = audio[start_idx:end_idx]
+
+        energy.append(np.mean(np.abs(window)))
+        rms.append(np.sqrt(np.mean(np.square(window))))
+        fft = np.fft.fft(window)
+        dominant_freq.append(abs(np.fft.fftfreq(len(window))[np.argmax(np.abs(fft))]))
+    return np.array(energy), np.array(rms), np.array(dominant_freq)
+
+
+def speech_like(sample_rate, seconds=2.0, seed=0):
+    """Noise under a loud tone that changes pitch every 0.2 s"""
+    rng = np.random.default_rng(seed)
+    t = np.arange(int(seconds * sample_rate)) / sample_rate
+    pitch = 200 + 150 * np.floor(t / 0.2)
+    audio = 0.6 * np.sin(2 * np.pi * pitch * t) + 0.05 * rng.standard_normal(len(t))
+    return audio.astype(np.float32)
+
+
+@pytest.mark.parametrize('sample_rate', [16000, 22050, 24000])
+def test_matches_per_frame_loop(sample_rate, monkeypatch):
+    # Small blocks so the blocked FFT crosses several block boundaries
+    monkeypatch.setattr(audio_features, 'BLOCK_FRAMES', 7)
+    audio = speech_like(sample_rate)
+
+    features = extract_audio_features(audio, sample_rate, FRAME_RATE, WINDOW_SIZE)
+    energy, rms, dominant_freq = reference_features(audio, sample_rate)
+
+    num_frames = count_frames(len(audio), sample_rate, FRAME_RATE)
+    assert num_frames == len(energy) == int(len(audio) / sample_rate * FRAME_RATE)
+    assert features['spectrum'].shape == (num_frames, WINDOW_SIZE // 2 + 1)
+    np.testing.assert_allclose(features['times'], np.arange(num_frames) / FRAME_RATE, rtol=1e-6)
+    np.testing.assert_allclose(features['energy'], energy, rtol=1e-5)
+    np.testing.assert_allclose(features['rms'], rms, rtol=1e-5)
+
+    # Edge windows are zero padded to full length instead of shortened, so only whole
+    # windows resolve frequency on the same bins
+    half = WINDOW_SIZE // 2
+    centers = (np.arange(num_frames) * sample_rate / FRAME_RATE).astype(int)
+    whole = (centers >= half) & (centers + half <= len(audio))
+    np.testing.assert_allclose(features['dominant_freq'][whole], dominant_freq[whole], rtol=1e-6)
+
+
+def test_stereo_is_mixed_down():
+    left = speech_like(22050, seed=1)
+    right = speech_like(22050, seed=2)
+
+    stereo = extract_audio_features(np.column_stack([left, right]))
+    mono = extract_audio_features((left + right) / 2)
+
+    np.testing.assert_allclose(stereo['energy'], mono['energy'], rtol=1e-5)
+    np.testing.assert_array_equal(stereo['dominant_freq'], mono['dominant_freq'])
+
+
+def test_clip_shorter_than_a_frame():
+    features = extract_audio_features(np.zeros(100, dtype=np.float32))
+
+    for name in ('times', 'energy', 'rms', 'dominant_freq'):
+        assert features[name].shape == (0,)
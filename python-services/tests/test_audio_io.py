@@ -0,0 +1,125 @@
+"""
+Header probing and PCM reads of the WAV files the TTS stage writes
+"""
+import struct
+
+import numpy as np
+import pytest
+
+from audio_io import get_audio_duration, probe_audio, read_audio
+from audio_sink import to_pcm16, wav_header, write_wav
+
+PCM16_STEP = 1 / 32767
+
+
+def tone(sample_rate, seconds, channels=1):
+    t = np.arange(int(seconds * sample_rate)) / sample_rate
+    audio = 0.5 * np.sin(2 * np.pi * 440 * t)
+    if channels > 1:
+        audio = np.column_stack([audio * (c + 1) / channels for c in range(channels)])
+    return audio.astype(np.float32)
+
+
+@pytest.mark.parametrize('sample_rate', [16000, 22050, 24000])
+def test_probe_matches_written_wav(tmp_path, sample_rate):
+    path = tmp_path / 'speech.wav'
+    audio = tone(sample_rate, 1.3)
+    written = write_wav(path, audio, sample_rate)
+
+    info = probe_audio(path)
+
+    assert info['format'] == 'WAV'
+    assert info['sample_rate'] == written['sample_rate'] == sample_rate
+    assert info['frames'] == written['samples'] == len(audio)
+    assert info['channels'] == 1
+    assert info['duration'] == pytest.approx(written['duration'])
+    assert get_audio_duration(path) == pytest.approx(len(audio) / sample_rate)
+
+
+def test_read_round_trips_pcm16(tmp_path):
+    path = tmp_path / 'speech.wav'
+    audio = tone(22050, 0.5)
+    write_wav(path, audio, 22050)
+
+    read, sample_rate = read_audio(path)
+
+    assert sample_rate == 22050
+    assert read.dtype == np.float32
+    assert read.shape == audio.shape
+    np.testing.assert_allclose(read, audio, atol=2 * PCM16_STEP)
+
+
+def test_stereo_is_mixed_down_or_kept(tmp_path):
+    path = tmp_path / 'stereo.wav'
+    audio = tone(16000, 0.25, channels=2)
+    write_wav(path, audio, 16000)
+
+    assert probe_audio(path)['channels'] == 2
+    mono, _ = read_audio(path)
+    both, _ = read_audio(path, mono=False)
+
+    assert both.shape == audio.shape
+    np.testing.assert_allclose(mono, audio.mean(axis=1), atol=2 * PCM16_STEP)
+
+
+def test_streamed_wav_without_sizes_uses_file_length(tmp_path):
+    path = tmp_path / 'streamed.wav'
+    audio = tone(22050, 0.4)
+    # Same bytes as /generate-tts/stream: open-ended header then raw PCM
+    path.write_bytes(wav_header(22050) + to_pcm16(audio))
+
+    info = probe_audio(path)
+    read, _ = read_audio(path)
+
+    assert info['frames'] == len(audio)
+    assert len(read) == len(audio)
+
+
+def test_skips_chunks_before_data(tmp_path):
+    path = tmp_path / 'tagged.wav'
+    audio = tone(16000, 0.2)
+    pcm = to_pcm16(audio)
+    header = wav_header(16000, num_frames=len(audio))
+    # Odd-sized LIST chunk between fmt and data, padded to an even length
+    extra = struct.pack('<4sI', b'LIST', 3) + b'abc\0'
+    path.write_bytes(header[:36] + extra + header[36:] + pcm)
+
+    read, sample_rate = read_audio(path)
+
+    assert sample_rate == 16000
+    np.testing.assert_allclose(read, audio, atol=2 * PCM16_STEP)
+
+
+def test_resamples_only_when_asked(tmp_path):
+    path = tmp_path / 'speech.wav'
+    audio = tone(22050, 1.0)
+    write_wav(path, audio, 22050)
+
+    same, same_rate = read_audio(path, target_rate=22050)
+    resampled, rate = read_audio(path, target_rate=16000)
+
+    assert same_rate == 22050 and len(same) == len(audio)
+    assert rate == 16000 and len(resampled) == 16000
+
+
+def test_rejects_non_audio(tmp_path):
+    path = tmp_path / 'notes.txt'
+    path.write_bytes(b'RIFF\0\0\0\0TEXT')
+
+    with pytest.raises(ValueError):
+        probe_audio(path)
+
+
+def test_probe_flac_header(tmp_path):
+    sf = pytest.importorskip('soundfile')
+    path = tmp_path / 'speech.flac'
+    audio = tone(24000, 0.75)
+    sf.write(path, audio, 24000, subtype='PCM_16')
+
+    info = probe_audio(path)
+    read, sample_rate = read_audio(path)
+
+    assert info['format'] == 'FLAC'
+    assert info['frames'] == len(audio)
+    assert info['duration'] == pytest.approx(0.75)
+    assert sample_rate == 24000 and len(read) == len(audio)
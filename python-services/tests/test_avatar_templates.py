@@ -0,0 +1,101 @@
+"""
+Versioned, memory-mapped base avatar templates
+"""
+import numpy as np
+import pytest
+
+import avatar_templates
+from avatar_templates import (
+    TEMPLATE_ARRAYS,
+    TEMPLATE_VERSION,
+    build_template,
+    load_base_avatars,
+    map_template,
+    save_template,
+    scale_vertices,
+    template_path,
+)
+
+TEMPLATE_ID = 'female_adult'
+
+
+def reference_template():
+    """The original per-vertex loops the vectorized builders replaced"""
+    vertices, faces, uvs = [], [], []
+    for y in np.linspace(-1, 1, 20):
+        for x in np.linspace(-0.7, 0.7, 15):
+            vertices.append([x, y, 0.1 * np.sin(np.pi * x) * np.cos(np.pi * y)])
+    for i in range(19):
+        for j in range(14):
+            v1, v2 = i * 15 + j, i * 15 + j + 1
+            v3, v4 = (i + 1) * 15 + j, (i + 1) * 15 + j + 1
+            faces.append([v1, v2, v3])
+            faces.append([v2, v4, v3])
+    for y in np.linspace(0, 1, 20):
+        for x in np.linspace(0, 1, 15):
+            uvs.append([x, y])
+    return {'vertices': np.array(vertices), 'faces': np.array(faces), 'texture_coords': np.array(uvs)}
+
+
+def test_build_matches_original_loops():
+    built = build_template(TEMPLATE_ID)
+    reference = reference_template()
+
+    for name in TEMPLATE_ARRAYS:
+        np.testing.assert_allclose(built[name], reference[name], rtol=0, atol=1e-12)
+    np.testing.assert_array_equal(built['faces'], reference['faces'])
+
+
+def test_saved_template_maps_back_read_only(tmp_path):
+    save_template(tmp_path, TEMPLATE_ID, build_template(TEMPLATE_ID))
+
+    path = template_path(tmp_path, TEMPLATE_ID)
+    assert path == tmp_path / f'v{TEMPLATE_VERSION}' / TEMPLATE_ID
+    assert sorted(p.name for p in path.iterdir()) == sorted(f'{name}.npy' for name in TEMPLATE_ARRAYS)
+    # No temp directories are left next to it
+    assert [p.name for p in path.parent.iterdir()] == [TEMPLATE_ID]
+
+    mapped = map_template(tmp_path, TEMPLATE_ID)
+    built = build_template(TEMPLATE_ID)
+    for name in TEMPLATE_ARRAYS:
+        assert isinstance(mapped[name], np.memmap)
+        assert not mapped[name].flags.writeable
+        np.testing.assert_array_equal(mapped[name], built[name])
+
+
+def test_load_builds_once_and_rebuilds_on_version_bump(tmp_path, monkeypatch):
+    load_base_avatars(tmp_path, (TEMPLATE_ID,))
+
+    # The stored copy is mapped as is, nothing is rebuilt
+    monkeypatch.setattr(avatar_templates, 'build_template', lambda template_id: pytest.fail('rebuilt'))
+    templates = load_base_avatars(tmp_path, (TEMPLATE_ID,))
+    assert isinstance(templates[TEMPLATE_ID]['vertices'], np.memmap)
+    monkeypatch.undo()
+
+    monkeypatch.setattr(avatar_templates, 'TEMPLATE_VERSION', TEMPLATE_VERSION + 1)
+    load_base_avatars(tmp_path, (TEMPLATE_ID,))
+    assert (tmp_path / f'v{TEMPLATE_VERSION + 1}' / TEMPLATE_ID / 'vertices.npy').exists()
+
+
+def test_unwritable_dir_serves_read_only_templates_from_memory(tmp_path):
+    not_a_dir = tmp_path / 'file'
+    not_a_dir.write_text('')
+
+    templates = load_base_avatars(not_a_dir, (TEMPLATE_ID,))
+
+    vertices = templates[TEMPLATE_ID]['vertices']
+    assert not isinstance(vertices, np.memmap)
+    assert not vertices.flags.writeable
+    np.testing.assert_array_equal(vertices, build_template(TEMPLATE_ID)['vertices'])
+
+
+def test_scale_vertices_leaves_template_untouched(tmp_path):
+    save_template(tmp_path, TEMPLATE_ID, build_template(TEMPLATE_ID))
+    vertices = map_template(tmp_path, TEMPLATE_ID)['vertices']
+    original = np.array(vertices)
+
+    scaled = scale_vertices(vertices, 2.0, 0.5)
+
+    assert scaled.flags.writeable and not np.shares_memory(scaled, vertices)
+    np.testing.assert_array_equal(vertices, original)
+    np.testing.assert_allclose(scaled, original * [2.0, 0.5, 1.0])
@@ -0,0 +1,85 @@
+"""
+FaceMesh pool warm-up and checkout, with a fake detector in place of MediaPipe
+"""
+import pytest
+
+from face_mesh_pool import FaceMeshPool
+
+
+class FakeFaceMesh:
+    def __init__(self):
+        self.closed = False
+
+    def process(self, image):
+        return None
+
+    def close(self):
+        self.closed = True
+
+
+class FlakyFactory:
+    """Builds fake detectors, failing the calls listed in fail_on (1-based)"""
+
+    def __init__(self, fail_on=()):
+        self.fail_on = set(fail_on)
+        self.calls = 0
+
+    def __call__(self):
+        self.calls += 1
+        if self.calls in self.fail_on:
+            raise RuntimeError('graph init failed')
+        return FakeFaceMesh()
+
+
+def test_warm_up_builds_every_instance():
+    pool = FaceMeshPool(size=3, factory=FlakyFactory(), name='test')
+    pool.warm_up()
+
+    stats = pool.get_stats()
+    assert stats['created'] == 3
+    assert stats['idle'] == 3
+
+
+def test_failed_warm_up_releases_unbuilt_slots():
+    factory = FlakyFactory(fail_on={2})
+    pool = FaceMeshPool(size=3, factory=factory, timeout=0.1, name='test')
+
+    with pytest.raises(RuntimeError, match='graph init failed'):
+        pool.warm_up()
+
+    # Only the instance built before the failure holds a slot
+    assert pool.get_stats()['created'] == 1
+
+    # Checkouts grow the pool back to its full size instead of waiting on phantom slots
+    with pool.checkout() as first, pool.checkout() as second, pool.checkout() as third:
+        assert len({id(first), id(second), id(third)}) == 3
+    assert pool.get_stats()['created'] == 3
+    assert pool.get_stats()['timeouts'] == 0
+
+    # And a later warm-up has nothing left to build
+    pool.warm_up()
+    assert factory.calls == 4
+
+
+def test_failed_growth_releases_its_slot():
+    pool = FaceMeshPool(size=1, factory=FlakyFactory(fail_on={1}), timeout=0.1, name='test')
+
+    with pytest.raises(RuntimeError):
+        with pool.checkout():
+            pass
+
+    with pool.checkout() as instance:
+        assert isinstance(instance, FakeFaceMesh)
+    assert pool.get_stats()['created'] == 1
+
+
+def test_close_releases_idle_instances():
+    pool = FaceMeshPool(size=2, factory=FlakyFactory(), name='test')
+    pool.warm_up()
+    with pool.checkout() as instance:
+        pass
+
+    pool.close()
+
+    assert instance.closed
+    assert pool.get_stats()['created'] == 0
@@ -0,0 +1,97 @@
+"""
+Content-addressed lip sync feature cache
+"""
+import numpy as np
+
+import feature_cache
+from feature_cache import FeatureCache
+
+
+def write_clip(path, payload=b'pcm'):
+    path.write_bytes(payload)
+    return path
+
+
+def test_key_follows_content_and_rate(tmp_path):
+    cache = FeatureCache()
+    first = write_clip(tmp_path / 'upload-1.wav')
+    second = write_clip(tmp_path / 'upload-2.wav')
+    other = write_clip(tmp_path / 'other.wav', b'different')
+
+    assert cache.key_for_file(first, 22050) == cache.key_for_file(second, 22050)
+    assert cache.key_for_file(first, 22050) != cache.key_for_file(first, 16000)
+    assert cache.key_for_file(first, 22050) != cache.key_for_file(other, 22050)
+
+
+def test_file_hash_memo_is_bounded(tmp_path, monkeypatch):
+    monkeypatch.setattr(feature_cache, 'FILE_KEY_CACHE_SIZE', 2)
+    cache = FeatureCache()
+    paths = [write_clip(tmp_path / f'upload-{i}.wav', bytes([i])) for i in range(5)]
+
+    for path in paths:
+        cache.key_for_file(path, 22050)
+
+    assert len(cache.file_keys) == 2
+    assert [file_id[0] for file_id in cache.file_keys] == [str(p.resolve()) for p in paths[-2:]]
+
+
+def test_put_freezes_only_the_cached_view():
+    cache = FeatureCache()
+    energy = np.arange(10, dtype=np.float32)
+
+    cached = cache.put('clip', 'energy', energy)
+    energy[0] = 42
+
+    assert energy.flags.writeable
+    assert not cached.flags.writeable
+    assert cache.get('clip', 'energy') is cached
+
+
+def test_views_are_copied_so_the_budget_counts_them():
+    cache = FeatureCache()
+    spectrum = np.zeros((100, 513), dtype=np.float32)
+
+    cached = cache.put('clip', 'row', spectrum[0])
+
+    assert not np.shares_memory(cached, spectrum)
+    assert cache.get_stats()['bytes'] == 513 * 4
+
+
+def test_get_or_compute_computes_once():
+    cache = FeatureCache()
+    calls = []
+
+    def compute():
+        calls.append(1)
+        return {'energy': np.ones(4), 'rms': np.zeros(4)}
+
+    first = cache.get_or_compute('clip', ('energy', 'rms'), compute)
+    again = cache.get_or_compute('clip', ('energy', 'rms'), compute)
+
+    assert len(calls) == 1
+    assert all(again[name] is first[name] for name in ('energy', 'rms'))
+
+
+def test_evicts_least_recently_used_over_budget():
+    cache = FeatureCache(max_bytes=2 * 80)
+    for key in ('a', 'b'):
+        cache.put(key, 'energy', np.zeros(10))
+    cache.get('a', 'energy')
+    cache.put('c', 'energy', np.zeros(10))
+
+    assert cache.get('b', 'energy') is None
+    assert cache.get('a', 'energy') is not None
+    assert cache.get_stats()['evictions'] == 1
+
+
+def test_disk_tier_is_shared_across_instances(tmp_path):
+    FeatureCache(cache_dir=tmp_path).put('clip', 'mel', np.arange(6.0).reshape(2, 3))
+
+    cache = FeatureCache(cache_dir=tmp_path)
+    mel = cache.get('clip', 'mel')
+
+    assert isinstance(mel, np.memmap) and not mel.flags.writeable
+    np.testing.assert_array_equal(mel, np.arange(6.0).reshape(2, 3))
+    assert cache.get_stats()['disk_hits'] == 1
+    # No temp files are left next to the stored array
+    assert [p.name for p in cache.disk_path('clip', 'mel').parent.iterdir()] == ['mel.npy']
@@ -0,0 +1,75 @@
+"""
+TTS cache byte budget, pinning and temp-file cleanup
+"""
+import os
+import time
+
+from tts_cache import STALE_TEMP_SECONDS, TTSCache
+
+ENTRY_BYTES = 100
+
+
+def store(cache, key, pinned=False):
+    temp_path = cache.temp_path(key)
+    temp_path.write_bytes(b'\0' * ENTRY_BYTES)
+    return cache.put(key, temp_path, {'provider': 'test'}, pinned=pinned)
+
+
+def make_key(name):
+    # Real keys are hex digests, sharded on their first four characters
+    return name * 64
+
+
+def test_evicts_least_recently_used_over_budget(tmp_path):
+    cache = TTSCache(tmp_path, '/audio', max_bytes=3 * ENTRY_BYTES)
+    a, b, c, d = (make_key(name) for name in 'abcd')
+    for key in (a, b, c):
+        store(cache, key)
+
+    # Reading a makes b the least recently used entry
+    assert cache.get(a)['audio_url'] == cache.audio_url(a)
+    store(cache, d)
+
+    assert cache.get(b) is None
+    assert not cache.audio_path(b).exists()
+    assert all(cache.get(key) is not None for key in (a, c, d))
+    stats = cache.get_stats()
+    assert stats['bytes'] == 3 * ENTRY_BYTES
+    assert stats['evictions'] == 1
+
+
+def test_pinned_entries_are_never_evicted(tmp_path):
+    cache = TTSCache(tmp_path, '/audio', max_bytes=2 * ENTRY_BYTES)
+    pinned, b, c = (make_key(name) for name in 'abc')
+    store(cache, pinned, pinned=True)
+    store(cache, b)
+    store(cache, c)
+
+    assert cache.get(pinned) is not None
+    assert cache.get(b) is None
+
+    # The pin is kept on disk and honoured after a restart
+    restarted = TTSCache(tmp_path, '/audio', max_bytes=ENTRY_BYTES)
+    store(restarted, make_key('d'))
+    assert restarted.get(pinned) is not None
+
+
+def test_index_drops_stale_temp_files_and_keeps_fresh_ones(tmp_path):
+    cache = TTSCache(tmp_path, '/audio')
+    key = make_key('a')
+    store(cache, key)
+
+    stale = cache.temp_path(make_key('b'))
+    stale.write_bytes(b'\0' * ENTRY_BYTES)
+    old = time.time() - STALE_TEMP_SECONDS - 60
+    os.utime(stale, (old, old))
+    # Another worker still writing into this one
+    fresh = cache.temp_path(make_key('c'))
+    fresh.write_bytes(b'\0' * ENTRY_BYTES)
+
+    restarted = TTSCache(tmp_path, '/audio')
+
+    assert not stale.exists()
+    assert fresh.exists()
+    assert list(restarted.entries) == [key]
+    assert restarted.get_stats()['bytes'] == ENTRY_BYTES
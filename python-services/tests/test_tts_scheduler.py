@@ -0,0 +1,122 @@
+"""Tests for the micro-batching TTS scheduler"""
+import threading
+import time
+
+import numpy as np
+import pytest
+
+from tts_registry import registry
+from tts_scheduler import TTSScheduler
+
+
+@pytest.fixture
+def scheduler():
+    # Long window so every request submitted in a test lands in the same batch
+    return TTSScheduler(max_wait=0.2, workers=1, name='test-tts')
+
+
+def test_failing_request_leaves_batchmates_intact(scheduler):
+    batches = []
+
+    def handler(model, requests):
+        batches.append([request['text'] for request in requests])
+        return [ValueError('bad input') if request['text'] == 'bad' else request['text'].upper()
+                for request in requests]
+
+    scheduler.register('engine', handler)
+    good = scheduler.submit('engine', 'model', 'hello', 'he')
+    bad = scheduler.submit('engine', 'model', 'bad', 'he')
+    other = scheduler.submit('engine', 'model', 'world', 'he')
+
+    assert good.result(timeout=5) == 'HELLO'
+    assert other.result(timeout=5) == 'WORLD'
+    with pytest.raises(ValueError, match='bad input'):
+        bad.result(timeout=5)
+    assert batches == [['hello', 'bad', 'world']]
+
+
+def test_batch_handler_returns_errors_per_request(scheduler):
+    import tts
+
+    def synthesize(instance, text, language, voice, split_sentences=True):
+        if text == 'bad':
+            raise RuntimeError('model error')
+        return np.ones(10, dtype=np.float32), 16000
+
+    registry.register('test-batch', lambda model, voice: object(), None, synthesize)
+    scheduler.register('test-batch', tts.batch_handler('test-batch'))
+
+    good = scheduler.submit('test-batch', 'model', 'fine', 'he')
+    bad = scheduler.submit('test-batch', 'model', 'bad', 'he')
+
+    audio, sample_rate = good.result(timeout=5)
+    assert sample_rate == 16000 and len(audio) == 10
+    with pytest.raises(RuntimeError, match='model error'):
+        bad.result(timeout=5)
+
+
+def test_short_handler_fails_instead_of_hanging(scheduler):
+    scheduler.register('engine', lambda model, requests: requests[:1])
+    first = scheduler.submit('engine', 'model', 'a', 'he')
+    second = scheduler.submit('engine', 'model', 'b', 'he')
+
+    for future in (first, second):
+        with pytest.raises(RuntimeError, match='1 results for 2 requests'):
+            future.result(timeout=5)
+
+
+def settled_stats(scheduler, name, expected, timeout=5):
+    """Counters are updated after the futures resolve, so poll briefly"""
+    deadline = time.monotonic() + timeout
+    while scheduler.get_stats()[name] != expected and time.monotonic() < deadline:
+        time.sleep(0.01)
+    return scheduler.get_stats()
+
+
+def test_identical_requests_are_synthesized_once(scheduler):
+    batches = []
+
+    def handler(model, requests):
+        batches.append([request['text'] for request in requests])
+        return [request['text'].upper() for request in requests]
+
+    scheduler.register('engine', handler)
+    duplicates = [scheduler.submit('engine', 'model', 'hello', 'he') for _ in range(3)]
+    other = scheduler.submit('engine', 'model', 'world', 'he')
+
+    assert [future.result(timeout=5) for future in duplicates] == ['HELLO'] * 3
+    assert other.result(timeout=5) == 'WORLD'
+    assert batches == [['hello', 'world']]
+    assert settled_stats(scheduler, 'deduplicated', 2)['deduplicated'] == 2
+
+
+def test_cancelled_request_is_skipped(scheduler):
+    batches = []
+
+    def handler(model, requests):
+        batches.append([request['text'] for request in requests])
+        return [request['text'].upper() for request in requests]
+
+    scheduler.register('engine', handler)
+    cancelled = scheduler.submit('engine', 'model', 'gone', 'he')
+    kept = scheduler.submit('engine', 'model', 'kept', 'he')
+
+    # Still inside the batching window, so the caller can take it back
+    assert cancelled.cancel()
+    assert kept.result(timeout=5) == 'KEPT'
+    assert batches == [['kept']]
+    assert settled_stats(scheduler, 'cancelled', 1)['cancelled'] == 1
+
+
+def test_cancelled_batch_never_reaches_handler(scheduler):
+    ran = threading.Event()
+
+    def handler(model, requests):
+        ran.set()
+        return [None for _ in requests]
+
+    scheduler.register('engine', handler)
+    assert scheduler.submit('engine', 'model', 'gone', 'he').cancel()
+
+    assert settled_stats(scheduler, 'cancelled', 1)['cancelled'] == 1
+    assert not ran.is_set()
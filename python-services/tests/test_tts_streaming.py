@@ -0,0 +1,72 @@
+"""Tests for the cached sentence-level streaming TTS path"""
+import asyncio
+
+import numpy as np
+import pytest
+
+import tts
+from tts_cache import TTSCache
+
+
+@pytest.fixture
+def synth_calls(tmp_path, monkeypatch):
+    """Private TTS cache and a deterministic fake synthesizer that records its inputs"""
+    monkeypatch.setattr(tts, 'tts_cache', TTSCache(tmp_path / 'cache', '/uploads/audio/cache'))
+    calls = []
+
+    async def fake_synthesize_audio(engine, model, text, language, voice, background=False):
+        calls.append(text)
+        t = np.arange(1600, dtype=np.float32) / 16000
+        return (0.5 * np.sin(2 * np.pi * 440 * t) * (len(text) % 5 + 1) / 5).astype(np.float32), 16000
+
+    monkeypatch.setattr(tts, 'synthesize_audio', fake_synthesize_audio)
+    return calls
+
+
+async def collect(text):
+    return [chunk async for chunk in tts.stream_hebrew_tts(text, 'he', 'hebrew_female')]
+
+
+def test_repeated_sentences_are_served_from_cache(synth_calls):
+    first = asyncio.run(collect('שלום לך. מה שלומך?'))
+    second = asyncio.run(collect('שלום לך. מה שלומך?'))
+
+    assert synth_calls == ['שלום לך.', 'מה שלומך?']
+    assert [chunk['text'] for chunk in second] == [chunk['text'] for chunk in first]
+    for cached, fresh in zip(second, first):
+        assert cached['sample_rate'] == fresh['sample_rate'] == 16000
+        assert cached['samples'] == fresh['samples']
+        # Cached audio went through 16-bit PCM
+        np.testing.assert_allclose(cached['audio'], fresh['audio'], atol=1 / 16384)
+
+    assert tts.tts_cache.get_stats()['hits'] >= 2
+
+
+def test_prewarmed_line_is_streamed_from_cache(synth_calls):
+    engine, model, synthesize = tts.select_engine('hebrew_female')
+    asyncio.run(tts.generate_cached(engine, model, synthesize, 'ברוכים הבאים.', 'he', 'hebrew_female', pin=True))
+    synth_calls.clear()
+
+    chunks = asyncio.run(collect('ברוכים הבאים.'))
+
+    assert synth_calls == []
+    assert len(chunks) == 1 and chunks[0]['samples'] > 0
+
+
+def test_wav_response_is_cached(synth_calls):
+    first = asyncio.run(tts.synthesize_hebrew_wav('תודה רבה', 'he', 'hebrew_female'))
+    second = asyncio.run(tts.synthesize_hebrew_wav('תודה רבה', 'he', 'hebrew_female'))
+
+    assert synth_calls == ['תודה רבה']
+    assert first[:4] == b'RIFF' and second == first
+
+
+def test_wav_response_reuses_audio_from_generate_tts(synth_calls):
+    engine, model, synthesize = tts.select_engine('hebrew_female')
+    result = asyncio.run(tts.generate_cached(engine, model, synthesize, 'להתראות', 'he', 'hebrew_female'))
+
+    wav = asyncio.run(tts.synthesize_hebrew_wav('להתראות', 'he', 'hebrew_female'))
+
+    assert synth_calls == []
+    assert wav == tts.tts_cache.audio_path(tts.get_cache_key(engine, model, 'להתראות', 'he', 'hebrew_female')).read_bytes()
+    assert len(wav) == 44 + result['samples'] * 2
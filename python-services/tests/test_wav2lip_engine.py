@@ -0,0 +1,70 @@
+"""
+Batched Wav2Lip engine on the tiny stand-in model
+"""
+import numpy as np
+import pytest
+
+torch = pytest.importorskip('torch')
+
+from wav2lip_engine import (
+    FACE_SIZE,
+    MEL_STEP_SIZE,
+    NUM_MELS,
+    TINY_MODEL,
+    TinyLipSyncModel,
+    Wav2LipEngine,
+    get_engine,
+)
+
+SAMPLE_RATE = 22050
+FRAME_RATE = 25
+
+
+@pytest.fixture
+def clip():
+    # 1.5 s of a tone, 37 video frames: two full micro-batches of 16 and a partial one
+    rng = np.random.default_rng(0)
+    t = np.arange(int(1.5 * SAMPLE_RATE)) / SAMPLE_RATE
+    audio = (0.5 * np.sin(2 * np.pi * 220 * t)).astype(np.float32)
+    face = rng.integers(0, 256, (FACE_SIZE, FACE_SIZE, 3), dtype=np.uint8)
+    num_frames = int(len(audio) / SAMPLE_RATE * FRAME_RATE)
+    return audio, face, num_frames
+
+
+def run(engine, audio, face, num_frames):
+    mel_chunks = engine.prepare_mel_chunks(audio, SAMPLE_RATE, num_frames, FRAME_RATE)
+    return mel_chunks, np.concatenate(list(engine.infer(face, mel_chunks)))
+
+
+def test_one_frame_per_video_frame(clip):
+    audio, face, num_frames = clip
+    engine = get_engine(TINY_MODEL)
+
+    mel_chunks, frames = run(engine, audio, face, num_frames)
+
+    assert mel_chunks.shape == (num_frames, 1, NUM_MELS, MEL_STEP_SIZE)
+    assert frames.shape == (num_frames, FACE_SIZE, FACE_SIZE, 3)
+    assert frames.dtype == np.uint8
+
+
+def test_output_is_deterministic(clip):
+    audio, face, num_frames = clip
+
+    _, first = run(get_engine(TINY_MODEL), audio, face, num_frames)
+    _, again = run(get_engine(TINY_MODEL), audio, face, num_frames)
+    # A separately built engine starts from the same seeded weights
+    _, fresh = run(Wav2LipEngine(TinyLipSyncModel()), audio, face, num_frames)
+
+    np.testing.assert_array_equal(first, again)
+    np.testing.assert_array_equal(first, fresh)
+
+
+def test_engine_is_loaded_once_per_process(clip):
+    audio, face, num_frames = clip
+    engine = get_engine(TINY_MODEL)
+    processed = engine.get_stats()['frames_processed']
+
+    run(get_engine(TINY_MODEL), audio, face, num_frames)
+
+    assert get_engine(TINY_MODEL) is engine
+    assert engine.get_stats()['frames_processed'] == processed + num_frames
@@ -6,6 +6,9 @@ import tempfile
 import asyncio
 from typing import Optional
 import time
+from functools import partial
+
+import numpy as np
 
 # Try to import TTS libraries
 try:
@@ -22,6 +25,52 @@ except ImportError:
     PIPER_AVAILABLE = False
     print("Piper TTS not available")
 
+from tts_registry import registry
+from tts_cache import TTSCache
+from tts_streaming import split_sentences, latency_tracker
+from audio_sink import write_wav, encode_wav, audio_info
+from audio_io import read_audio
+from tts_scheduler import TTSScheduler
+from tts_voices import VOICES, get_voice_backend
+
+COQUI_MODEL = "tts_models/he/fairseq/vits"
+
+AUDIO_DIR = "uploads/audio"
+
+PLACEHOLDER_SAMPLE_RATE = 22050
+
+# Synthesized audio is content-addressed, identical requests reuse the same file
+tts_cache = TTSCache(os.path.join(AUDIO_DIR, "cache"), "/uploads/audio/cache")
+
+# agent_id -> {cache key: manifest entry} for pre-warmed stock lines
+prewarm_manifests = {}
+prewarm_tasks = set()
+
+def warm_up_tts_engines():
+    """Load the default engines once and run a dummy synthesis (called at startup)"""
+    if COQUI_AVAILABLE:
+        try:
+            registry.warm_up("coqui", COQUI_MODEL)
+        except Exception as e:
+            print(f"Failed to warm up Coqui TTS: {e}")
+    
+    # Voices configured with their own backend (e.g. ONNX Runtime models)
+    for voice_id, backend in VOICES.items():
+        try:
+            registry.warm_up(backend["engine"], backend["model"])
+        except Exception as e:
+            print(f"Failed to warm up voice {voice_id}: {e}")
+
+def get_model_version(engine: str, model: str) -> str:
+    """Model identifier used in cache keys, including the engine library version"""
+    if engine == "coqui":
+        try:
+            from TTS import __version__ as coqui_version
+            return f"{model}@{coqui_version}"
+        except ImportError:
+            pass
+    return model
+
 async def generate_hebrew_tts(
     text: str, 
     language: str = "he", 
@@ -31,8 +80,13 @@ async def generate_hebrew_tts(
     Generate Hebrew TTS audio using available TTS engines
     """
     try:
+        # Voices configured with their own backend (e.g. ONNX) use it
+        backend = get_voice_backend(voice)
+        if backend:
+            return await generate_with_voice_backend(backend, text, language, voice)
+        
         # Try Coqui TTS first
-        if COQUI_AVAILABLE:
+        elif COQUI_AVAILABLE:
             return await generate_with_coqui(text, language, voice)
         
         # Fallback to Piper TTS
@@ -41,113 +95,331 @@ async def generate_hebrew_tts(
         
         # Final fallback - return placeholder
         else:
-            return await generate_fallback_tts(text)
+            return await generate_fallback_tts(text, language, voice)
             
     except Exception as e:
         print(f"Error in TTS generation: {e}")
         # Return fallback
-        return await generate_fallback_tts(text)
+        return await generate_fallback_tts(text, language, voice)
+
+def select_engine(voice: Optional[str] = None):
+    """Engine used for new synthesis: (engine, model, synthesize to file)"""
+    backend = get_voice_backend(voice)
+    if backend:
+        return backend["engine"], backend["model"], partial(synthesize_with_engine, backend["engine"], backend["model"])
+    if COQUI_AVAILABLE:
+        return "coqui", COQUI_MODEL, synthesize_with_coqui
+    if PIPER_AVAILABLE:
+        return "piper", "placeholder", synthesize_with_piper
+    return "fallback", "silence", synthesize_fallback
+
+def batch_handler(engine: str):
+    """Scheduler handler that runs one batch on the resident model of an engine"""
+    def synthesize_batch(model: str, requests):
+        # Coqui and ONNX voices have no batched API, the batch runs back to back on a hot model.
+        # Errors are returned per request so one bad input does not fail the whole batch
+        results = []
+        for request in requests:
+            try:
+                results.append(
+                    registry.synthesize(engine, model, request["text"], request["language"], request["voice"])
+                )
+            except Exception as e:
+                print(f"❌ {engine} synthesis failed for one batched request: {e}")
+                results.append(e)
+        return results
+    return synthesize_batch
+
+# Inference runs on scheduler threads, never on the event loop
+tts_scheduler = TTSScheduler()
+for scheduled_engine in ("coqui", "onnx", "onnx-int8"):
+    tts_scheduler.register(scheduled_engine, batch_handler(scheduled_engine))
+
+async def synthesize_audio(
+    engine: str,
+    model: str,
+    text: str,
+    language: str,
+    voice: Optional[str],
+    background: bool = False
+):
+    """Synthesize text to mono float32 samples in memory, returns (audio, sample_rate)"""
+    if engine in tts_scheduler.handlers:
+        return await tts_scheduler.synthesize(engine, model, text, language, voice, background)
+    
+    # Piper and fallback are still placeholders and stream silence
+    num_samples = int(PLACEHOLDER_SAMPLE_RATE * placeholder_duration(text))
+    return np.zeros(num_samples, dtype=np.float32), PLACEHOLDER_SAMPLE_RATE
+
+def store_audio(engine: str, cache_key: str, audio, sample_rate: int, wav: Optional[bytes] = None):
+    """Write synthesized samples (or their already encoded WAV bytes) into the TTS cache under cache_key"""
+    temp_path = tts_cache.temp_path(cache_key)
+    try:
+        if wav is None:
+            info = write_wav(temp_path, audio, sample_rate)
+        else:
+            temp_path.write_bytes(wav)
+            info = audio_info(audio, sample_rate)
+        return tts_cache.put(cache_key, temp_path, {**info, "provider": engine})
+    except Exception:
+        if temp_path.exists():
+            temp_path.unlink()
+        raise
+
+async def synthesize_cached_audio(
+    engine: str,
+    model: str,
+    text: str,
+    language: str,
+    voice: Optional[str]
+):
+    """(audio, sample_rate) for one text, read from the TTS cache or synthesized and stored on a miss"""
+    loop = asyncio.get_running_loop()
+    cache_key = get_cache_key(engine, model, text, language, voice)
+    
+    if tts_cache.get(cache_key):
+        try:
+            return await loop.run_in_executor(None, read_audio, str(tts_cache.audio_path(cache_key)))
+        except (OSError, ValueError) as e:
+            # Evicted between the lookup and the read
+            print(f"TTS cache read failed, synthesizing again: {e}")
+    
+    audio, sample_rate = await synthesize_audio(engine, model, text, language, voice)
+    await loop.run_in_executor(None, store_audio, engine, cache_key, audio, sample_rate)
+    return audio, sample_rate
+
+async def stream_hebrew_tts(
+    text: str,
+    language: str = "he",
+    voice: str = "hebrew_female"
+):
+    """
+    Synthesize sentence by sentence and yield each chunk as soon as it is ready.
+    Sentences already in the TTS cache (e.g. pre-warmed stock lines) are read back instead
+    """
+    engine, model, _ = select_engine(voice)
+    timer = latency_tracker.start()
+    
+    try:
+        for index, sentence in enumerate(split_sentences(text)):
+            # Synthesis runs off the event loop so earlier chunks can be flushed meanwhile
+            audio, sample_rate = await synthesize_cached_audio(engine, model, sentence, language, voice)
+            yield {
+                "index": index,
+                "text": sentence,
+                "audio": audio,
+                **audio_info(audio, sample_rate),
+                "latency": timer.chunk_ready(),
+                "provider": engine
+            }
+    finally:
+        timer.finish()
+
+async def synthesize_hebrew_wav(
+    text: str,
+    language: str = "he",
+    voice: str = "hebrew_female"
+) -> bytes:
+    """WAV bytes for a direct HTTP response: the cached file on a hit, encoded in memory and stored on a miss"""
+    loop = asyncio.get_running_loop()
+    engine, model, _ = select_engine(voice)
+    cache_key = get_cache_key(engine, model, text, language, voice)
+    
+    if tts_cache.get(cache_key):
+        try:
+            return await loop.run_in_executor(None, tts_cache.audio_path(cache_key).read_bytes)
+        except OSError as e:
+            # Evicted between the lookup and the read
+            print(f"TTS cache read failed, synthesizing again: {e}")
+    
+    audio, sample_rate = await synthesize_audio(engine, model, text, language, voice)
+    wav = encode_wav(audio, sample_rate)
+    await loop.run_in_executor(None, partial(store_audio, engine, cache_key, audio, sample_rate, wav))
+    return wav
+
+def get_cache_key(engine: str, model: str, text: str, language: str, voice: Optional[str]) -> str:
+    return tts_cache.make_key(text, language, voice, engine, get_model_version(engine, model))
+
+async def generate_cached(
+    engine: str,
+    model: str,
+    synthesize,
+    text: str,
+    language: str,
+    voice: Optional[str],
+    pin: bool = False,
+    background: bool = False
+):
+    """Return cached audio for this request, synthesizing it only on a miss"""
+    cache_key = get_cache_key(engine, model, text, language, voice)
+
+    cached = tts_cache.get(cache_key)
+    if cached:
+        if pin:
+            tts_cache.pin(cache_key)
+        return cached
+
+    audio_path = tts_cache.temp_path(cache_key)
+    try:
+        result = await synthesize(text, language, voice, str(audio_path), background=background)
+    except Exception:
+        if audio_path.exists():
+            audio_path.unlink()
+        raise
+
+    return tts_cache.put(cache_key, audio_path, result, pinned=pin)
 
 async def generate_with_coqui(text: str, language: str, voice: str):
     """Generate TTS using Coqui TTS"""
     try:
-        # Initialize TTS
-        tts = TTS("tts_models/he/fairseq/vits")
-        
-        # Generate audio
-        audio_id = f"audio_{int(time.time())}"
-        audio_path = f"uploads/audio/{audio_id}.wav"
-        
-        # Ensure directory exists
-        os.makedirs("uploads/audio", exist_ok=True)
-        
-        # Generate audio
-        tts.tts_to_file(text=text, file_path=audio_path)
-        
-        # Get duration (simplified)
-        duration = estimate_duration(text)
-        
-        return {
-            "audio_url": f"/uploads/audio/{audio_id}.wav",
-            "duration": duration,
-            "provider": "coqui"
-        }
-        
+        return await generate_cached("coqui", COQUI_MODEL, synthesize_with_coqui, text, language, voice)
     except Exception as e:
         print(f"Coqui TTS error: {e}")
         raise e
 
+async def synthesize_with_coqui(text: str, language: str, voice: str, audio_path: str, background: bool = False):
+    return await synthesize_with_engine("coqui", COQUI_MODEL, text, language, voice, audio_path, background)
+
+async def generate_with_voice_backend(backend, text: str, language: str, voice: str):
+    """Generate TTS with the engine configured for this voice"""
+    engine, model = backend["engine"], backend["model"]
+    try:
+        synthesize = partial(synthesize_with_engine, engine, model)
+        return await generate_cached(engine, model, synthesize, text, language, voice)
+    except Exception as e:
+        print(f"{engine} TTS error: {e}")
+        raise e
+
+async def synthesize_with_engine(
+    engine: str,
+    model: str,
+    text: str,
+    language: str,
+    voice: str,
+    audio_path: str,
+    background: bool = False
+):
+    # Resident model, loaded once per process
+    audio, sample_rate = await synthesize_audio(engine, model, text, language, voice, background)
+    
+    # Write the whole buffer in one go; the info is the exact length of what was written
+    info = write_wav(audio_path, audio, sample_rate)
+    
+    return {
+        **info,
+        "provider": engine
+    }
+
 async def generate_with_piper(text: str, language: str, voice: str):
     """Generate TTS using Piper TTS"""
     try:
-        # This is a placeholder - implement actual Piper TTS integration
-        audio_id = f"audio_{int(time.time())}"
-        audio_path = f"uploads/audio/{audio_id}.wav"
-        
-        # Ensure directory exists
-        os.makedirs("uploads/audio", exist_ok=True)
-        
-        # Generate placeholder audio
-        await generate_placeholder_audio(text, audio_path)
-        
-        duration = estimate_duration(text)
-        
-        return {
-            "audio_url": f"/uploads/audio/{audio_id}.wav",
-            "duration": duration,
-            "provider": "piper"
-        }
-        
+        return await generate_cached("piper", "placeholder", synthesize_with_piper, text, language, voice)
     except Exception as e:
         print(f"Piper TTS error: {e}")
         raise e
 
-async def generate_fallback_tts(text: str):
+async def synthesize_with_piper(text: str, language: str, voice: str, audio_path: str, background: bool = False):
+    # This is a placeholder - implement actual Piper TTS integration
+    info = await generate_placeholder_audio(text, audio_path)
+    
+    return {
+        **info,
+        "provider": "piper"
+    }
+
+async def generate_fallback_tts(text: str, language: str = "he", voice: Optional[str] = None):
     """Generate fallback TTS (placeholder audio)"""
     try:
-        audio_id = f"audio_{int(time.time())}"
-        audio_path = f"uploads/audio/{audio_id}.wav"
-        
-        # Ensure directory exists
-        os.makedirs("uploads/audio", exist_ok=True)
-        
-        # Generate placeholder audio
-        await generate_placeholder_audio(text, audio_path)
-        
-        duration = estimate_duration(text)
-        
-        return {
-            "audio_url": f"/uploads/audio/{audio_id}.wav",
-            "duration": duration,
-            "provider": "fallback"
-        }
-        
+        return await generate_cached("fallback", "silence", synthesize_fallback, text, language, voice)
     except Exception as e:
         print(f"Fallback TTS error: {e}")
         raise e
 
-async def generate_placeholder_audio(text: str, output_path: str):
-    """Generate placeholder audio file"""
-    import wave
-    import struct
+async def synthesize_fallback(text: str, language: str, voice: Optional[str], audio_path: str, background: bool = False):
+    # Generate placeholder audio
+    info = await generate_placeholder_audio(text, audio_path)
     
-    # Create a simple WAV file with silence
-    sample_rate = 22050
-    duration = estimate_duration(text)
-    num_samples = int(sample_rate * duration)
+    return {
+        **info,
+        "provider": "fallback"
+    }
+
+def get_manifest_entry(utterance, cache_key: str, status: str, result=None):
+    entry = {
+        "agent_id": utterance["agent_id"],
+        "text": utterance["text"],
+        "voice": utterance.get("voice"),
+        "language": utterance.get("language", "he"),
+        "audio_url": tts_cache.audio_url(cache_key),
+        "status": status,
+        "samples": None,
+        "sample_rate": None,
+        "duration": None
+    }
+    if result:
+        # Exact length recorded when the audio was written
+        entry.update({name: result.get(name) for name in ("samples", "sample_rate", "duration")})
+    return entry
+
+def prewarm_utterances(utterances):
+    """
+    Pin each agent's stock lines in the TTS cache.
+    Lines already cached are pinned right away; the rest are synthesized in the background
+    at low priority. Returns the manifest, whose URLs are final even while still pending.
+    """
+    manifest = []
+    missing = []
     
-    # Create WAV file
-    with wave.open(output_path, 'w') as wav_file:
-        wav_file.setnchannels(1)  # Mono
-        wav_file.setsampwidth(2)  # 16-bit
-        wav_file.setframerate(sample_rate)
+    for utterance in utterances:
+        language = utterance.get("language", "he")
+        engine, model, synthesize = select_engine(utterance.get("voice"))
+        cache_key = get_cache_key(engine, model, utterance["text"], language, utterance.get("voice"))
         
-        # Write silence
-        for _ in range(num_samples):
-            wav_file.writeframes(struct.pack('<h', 0))
+        cached = tts_cache.get(cache_key)
+        if cached:
+            tts_cache.pin(cache_key)
+            entry = get_manifest_entry(utterance, cache_key, "ready", cached)
+        else:
+            entry = get_manifest_entry(utterance, cache_key, "pending")
+            missing.append((utterance, entry, engine, model, synthesize, cache_key))
+        
+        prewarm_manifests.setdefault(utterance["agent_id"], {})[cache_key] = entry
+        manifest.append(dict(entry))
+    
+    if missing:
+        task = asyncio.get_running_loop().create_task(prewarm_missing(missing))
+        # Keep a reference so the task is not garbage collected mid-run
+        prewarm_tasks.add(task)
+        task.add_done_callback(prewarm_tasks.discard)
+    
+    return manifest
+
+async def prewarm_missing(missing):
+    """Synthesize uncached stock lines one by one behind interactive requests"""
+    for utterance, entry, engine, model, synthesize, cache_key in missing:
+        try:
+            result = await generate_cached(
+                engine, model, synthesize,
+                utterance["text"], entry["language"], entry["voice"],
+                pin=True, background=True
+            )
+            entry.update(get_manifest_entry(utterance, cache_key, "ready", result), audio_url=result["audio_url"])
+        except Exception as e:
+            print(f"❌ Pre-warming '{utterance['text']}' for agent {utterance['agent_id']} failed: {e}")
+            entry.update(status="failed", error=str(e))
+
+def get_prewarm_manifest(agent_id: str):
+    """Current state of an agent's pre-warmed lines"""
+    return [dict(entry) for entry in prewarm_manifests.get(agent_id, {}).values()]
+
+async def generate_placeholder_audio(text: str, output_path: str):
+    """Generate placeholder audio file, returns its sample count, rate and duration"""
+    # Create a simple WAV file with silence, written as one buffer
+    num_samples = int(PLACEHOLDER_SAMPLE_RATE * placeholder_duration(text))
+    return write_wav(output_path, np.zeros(num_samples, dtype=np.int16), PLACEHOLDER_SAMPLE_RATE)
 
-def estimate_duration(text: str) -> float:
-    """Estimate audio duration based on text length"""
+def placeholder_duration(text: str) -> float:
+    """Length of placeholder audio for a text; results report the written length, not this"""
     # Rough estimation: ~150 words per minute for Hebrew
     words_per_minute = 150
     word_count = len(text.split())
@@ -7,11 +7,9 @@ Generates high-quality Hebrew speech using Coqui TTS and Piper TTS
 import os
 import sys
 import json
-import uuid
-import tempfile
+from functools import partial
 from pathlib import Path
 import numpy as np
-import soundfile as sf
 
 # Add the parent directory to the path
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -30,6 +28,16 @@ except ImportError:
     PIPER_AVAILABLE = False
     print("Warning: Piper TTS not available")
 
+from tts_registry import registry
+from tts_cache import TTSCache
+from tts_streaming import split_sentences, latency_tracker
+from audio_sink import write_wav, encode_wav, audio_info, to_float32_mono
+from tts_sharding import ShardedSynthesizer
+from tts_voices import VOICES, get_voice_backend, list_voices
+
+COQUI_MODEL = "tts_models/multilingual/multi-dataset/xtts_v2"
+PIPER_MODEL = os.getenv('PIPER_HEBREW_MODEL', 'hebrew_model.onnx')
+
 class HebrewTTSService:
     def __init__(self):
         self.coqui_tts = None
@@ -37,6 +45,12 @@ class HebrewTTSService:
         self.output_dir = Path('/app/uploads/audio')
         self.output_dir.mkdir(parents=True, exist_ok=True)
         
+        # Content-addressed cache of synthesized audio
+        self.cache = TTSCache(self.output_dir / 'cache', '/uploads/audio/cache')
+        
+        # Process pools for long texts, created on first use per engine
+        self.sharded_synthesizers = {}
+        
         # Initialize TTS engines
         self.initialize_tts_engines()
     
@@ -45,8 +59,8 @@ class HebrewTTSService:
         # Initialize Coqui TTS
         if COQUI_AVAILABLE:
             try:
-                # Try to load Hebrew model
-                self.coqui_tts = TTS("tts_models/multilingual/multi-dataset/xtts_v2")
+                # Resident model shared with every other service instance in the process
+                self.coqui_tts = registry.warm_up('coqui', COQUI_MODEL)
                 print("✅ Coqui TTS initialized")
             except Exception as e:
                 print(f"❌ Failed to initialize Coqui TTS: {e}")
@@ -55,30 +69,52 @@ class HebrewTTSService:
         # Initialize Piper TTS
         if PIPER_AVAILABLE:
             try:
-                # Try to load Hebrew model
-                self.piper_tts = piper.PiperVoice.load("hebrew_model.onnx")
+                # Resident voice shared with every other service instance in the process
+                self.piper_tts = registry.warm_up('piper', PIPER_MODEL)
                 print("✅ Piper TTS initialized")
             except Exception as e:
                 print(f"❌ Failed to initialize Piper TTS: {e}")
                 self.piper_tts = None
+        
+        # Initialize per-voice backends (e.g. ONNX Runtime models)
+        for voice_id, backend in VOICES.items():
+            try:
+                registry.warm_up(backend['engine'], backend['model'])
+                print(f"✅ {backend['engine']} voice {voice_id} initialized")
+            except Exception as e:
+                print(f"❌ Failed to initialize voice {voice_id}: {e}")
     
-    def generate_speech(self, text, language='he', voice=None, agent_id=None):
-        """Generate speech from text"""
+    def generate_speech(self, text, language='he', voice=None, agent_id=None, parallel=None):
+        """
+        Generate speech from text.
+        parallel=True shards the text across worker processes; None does so for long texts only
+        when TTS_SHARD_AUTO is enabled.
+        """
         try:
             # Clean and preprocess text
             cleaned_text = self.preprocess_text(text, language)
             
+            # Voices configured with their own backend (e.g. ONNX) use it
+            backend = get_voice_backend(voice)
+            if backend:
+                engine, model = backend['engine'], backend['model']
+                synthesize = partial(self.generate_with_backend, engine, model)
+                synthesize = self.select_synthesis(engine, model, synthesize, cleaned_text, parallel)
+                return self.generate_cached(engine, model, synthesize, cleaned_text, language, voice)
+            
             # Try Coqui TTS first
-            if self.coqui_tts and language == 'he':
-                return self.generate_with_coqui(cleaned_text, voice, agent_id)
+            elif self.coqui_tts and language == 'he':
+                synthesize = self.select_synthesis('coqui', COQUI_MODEL, self.generate_with_coqui, cleaned_text, parallel)
+                return self.generate_cached('coqui', COQUI_MODEL, synthesize, cleaned_text, language, voice)
             
             # Try Piper TTS as fallback
             elif self.piper_tts:
-                return self.generate_with_piper(cleaned_text, language, voice, agent_id)
+                synthesize = self.select_synthesis('piper', PIPER_MODEL, self.generate_with_piper, cleaned_text, parallel)
+                return self.generate_cached('piper', PIPER_MODEL, synthesize, cleaned_text, language, voice)
             
             # Fallback to simple synthesis
             else:
-                return self.generate_fallback(cleaned_text, language, agent_id)
+                return self.generate_cached('fallback', 'sine', self.generate_fallback, cleaned_text, language, voice)
                 
         except Exception as e:
             print(f"Error generating speech: {e}")
@@ -87,13 +123,136 @@ class HebrewTTSService:
                 'success': False
             }
     
-    def generate_with_coqui(self, text, voice, agent_id):
-        """Generate speech using Coqui TTS"""
+    def get_sharded_synthesizer(self, engine, model):
+        if engine not in self.sharded_synthesizers:
+            self.sharded_synthesizers[engine] = ShardedSynthesizer(engine, model)
+        return self.sharded_synthesizers[engine]
+    
+    def select_synthesis(self, engine, model, synthesize, text, parallel):
+        """Use sharded synthesis when asked (or for long texts with TTS_SHARD_AUTO), the single-process path otherwise"""
+        sharded = self.get_sharded_synthesizer(engine, model)
+        if parallel is None:
+            parallel = sharded.should_shard(text)
+        return partial(self.generate_sharded, sharded) if parallel else synthesize
+    
+    def generate_sharded(self, sharded, text, language, voice, output_path):
+        """Synthesize sentence/clause shards in parallel and join them into one file"""
         try:
-            # Generate unique filename
-            audio_id = str(uuid.uuid4())
-            output_path = self.output_dir / f'{audio_id}.wav'
+            audio, sample_rate, shard_count = sharded.synthesize(text, language, voice)
+            info = write_wav(output_path, audio, sample_rate)
+            
+            return {
+                **info,
+                'provider': sharded.engine,
+                'shards': shard_count,
+                'success': True
+            }
             
+        except Exception as e:
+            print(f"Sharded TTS error: {e}")
+            raise
+    
+    def stream_speech(self, text, language='he', voice=None):
+        """Yield audio sentence by sentence, each chunk as soon as it is synthesized"""
+        timer = latency_tracker.start()
+        try:
+            cleaned_text = self.preprocess_text(text, language)
+            for index, sentence in enumerate(split_sentences(cleaned_text)):
+                audio, sample_rate, provider = self.synthesize_sentence(sentence, language, voice)
+                yield {
+                    'index': index,
+                    'text': sentence,
+                    'audio': audio,
+                    **audio_info(audio, sample_rate),
+                    'latency': timer.chunk_ready(),
+                    'provider': provider
+                }
+        finally:
+            timer.finish()
+    
+    def synthesize_sentence(self, text, language, voice):
+        """Synthesize one sentence to mono float32 samples, returns (audio, sample_rate, provider)"""
+        backend = get_voice_backend(voice)
+        if backend:
+            audio, sample_rate = registry.synthesize(backend['engine'], backend['model'], text, language, voice)
+            return audio, sample_rate, backend['engine']
+        
+        if self.coqui_tts and language == 'he':
+            wav = self.coqui_tts.tts(
+                text=text,
+                language='he',
+                speaker_wav=None,
+                split_sentences=False  # Already a single sentence
+            )
+            sample_rate = self.coqui_tts.synthesizer.output_sample_rate
+            return to_float32_mono(wav), sample_rate, 'coqui'
+        
+        if self.piper_tts:
+            audio, sample_rate = self.synthesize_with_piper(text)
+            return audio, sample_rate, 'piper'
+        
+        audio, sample_rate = self.synthesize_tone(self.placeholder_duration(text))
+        return audio, sample_rate, 'fallback'
+    
+    def synthesize_wav(self, text, language='he', voice=None):
+        """Synthesize to WAV bytes in memory, for returning directly in an HTTP response"""
+        audio, sample_rate, _ = self.synthesize_sentence(self.preprocess_text(text, language), language, voice)
+        return encode_wav(audio, sample_rate)
+    
+    def synthesize_with_piper(self, text):
+        """Run Piper into memory and return (audio, sample_rate)"""
+        return registry.synthesize('piper', PIPER_MODEL, text)
+    
+    def synthesize_tone(self, duration, sample_rate=22050):
+        """Placeholder tone used when no TTS engine is available"""
+        t = np.linspace(0, duration, int(sample_rate * duration))
+        
+        # Generate a simple tone
+        frequency = 440  # A4 note
+        audio_data = 0.1 * np.sin(2 * np.pi * frequency * t)
+        
+        # Add some variation to make it more interesting
+        audio_data += 0.05 * np.sin(2 * np.pi * frequency * 1.5 * t)
+        
+        return audio_data.astype(np.float32), sample_rate
+    
+    def generate_cached(self, engine, model, synthesize, text, language, voice):
+        """Serve repeated requests from the cache without touching the model"""
+        cache_key = self.cache.make_key(text, language, voice, engine, model)
+        
+        cached = self.cache.get(cache_key)
+        if cached:
+            return cached
+        
+        output_path = self.cache.temp_path(cache_key)
+        try:
+            result = synthesize(text, language, voice, output_path)
+        except Exception:
+            if output_path.exists():
+                output_path.unlink()
+            raise
+        
+        return self.cache.put(cache_key, output_path, result)
+    
+    def generate_with_backend(self, engine, model, text, language, voice, output_path):
+        """Generate speech with a registry engine configured for this voice"""
+        try:
+            audio, sample_rate = registry.synthesize(engine, model, text, language, voice)
+            info = write_wav(output_path, audio, sample_rate)
+            
+            return {
+                **info,
+                'provider': engine,
+                'success': True
+            }
+            
+        except Exception as e:
+            print(f"{engine} TTS error: {e}")
+            raise
+    
+    def generate_with_coqui(self, text, language, voice, output_path):
+        """Generate speech using Coqui TTS"""
+        try:
             # Generate speech
             wav = self.coqui_tts.tts(
                 text=text,
@@ -102,15 +261,12 @@ class HebrewTTSService:
                 split_sentences=True
             )
             
-            # Save audio file
-            sf.write(str(output_path), wav, 22050)
-            
-            # Calculate duration
-            duration = len(wav) / 22050
+            # Save audio file at the model's own output rate
+            sample_rate = self.coqui_tts.synthesizer.output_sample_rate
+            info = write_wav(output_path, to_float32_mono(wav), sample_rate)
             
             return {
-                'audio_url': f'/uploads/audio/{audio_id}.wav',
-                'duration': duration,
+                **info,
                 'provider': 'coqui',
                 'success': True
             }
@@ -119,28 +275,15 @@ class HebrewTTSService:
             print(f"Coqui TTS error: {e}")
             raise
     
-    def generate_with_piper(self, text, language, voice, agent_id):
+    def generate_with_piper(self, text, language, voice, output_path):
         """Generate speech using Piper TTS"""
         try:
-            # Generate unique filename
-            audio_id = str(uuid.uuid4())
-            output_path = self.output_dir / f'{audio_id}.wav'
-            
-            # Generate speech
-            with tempfile.NamedTemporaryFile(suffix='.wav', delete=False) as tmp_file:
-                self.piper_tts.synthesize(text, tmp_file.name)
-                
-                # Copy to final location
-                import shutil
-                shutil.copy2(tmp_file.name, str(output_path))
-                os.unlink(tmp_file.name)
-            
-            # Calculate duration (simplified)
-            duration = self.estimate_duration(text)
+            # Generate speech in memory and write it straight to its final location
+            audio, sample_rate = self.synthesize_with_piper(text)
+            info = write_wav(output_path, audio, sample_rate)
             
             return {
-                'audio_url': f'/uploads/audio/{audio_id}.wav',
-                'duration': duration,
+                **info,
                 'provider': 'piper',
                 'success': True
             }
@@ -149,31 +292,17 @@ class HebrewTTSService:
             print(f"Piper TTS error: {e}")
             raise
     
-    def generate_fallback(self, text, language, agent_id):
+    def generate_fallback(self, text, language, voice, output_path):
         """Generate fallback speech (placeholder)"""
         try:
-            # Generate unique filename
-            audio_id = str(uuid.uuid4())
-            output_path = self.output_dir / f'{audio_id}.wav'
-            
             # Create a simple sine wave as placeholder
-            duration = self.estimate_duration(text)
-            sample_rate = 22050
-            t = np.linspace(0, duration, int(sample_rate * duration))
-            
-            # Generate a simple tone
-            frequency = 440  # A4 note
-            audio_data = 0.1 * np.sin(2 * np.pi * frequency * t)
-            
-            # Add some variation to make it more interesting
-            audio_data += 0.05 * np.sin(2 * np.pi * frequency * 1.5 * t)
+            audio_data, sample_rate = self.synthesize_tone(self.placeholder_duration(text))
             
             # Save as WAV file
-            sf.write(str(output_path), audio_data, sample_rate)
+            info = write_wav(output_path, audio_data, sample_rate)
             
             return {
-                'audio_url': f'/uploads/audio/{audio_id}.wav',
-                'duration': duration,
+                **info,
                 'provider': 'fallback',
                 'success': True
             }
@@ -207,8 +336,8 @@ class HebrewTTSService:
         import re
         return re.sub(f'[{diacritics}]', '', text)
     
-    def estimate_duration(self, text):
-        """Estimate speech duration based on text length"""
+    def placeholder_duration(self, text):
+        """Length of the placeholder tone for a text; results report the written length, not this"""
         # Rough estimation: ~150 words per minute for Hebrew
         words_per_minute = 150
         word_count = len(text.split())
@@ -237,6 +366,9 @@ class HebrewTTSService:
                 'provider': 'piper'
             })
         
+        # Voices with their own backend (ONNX, int8, ...)
+        voices.extend(list_voices(language))
+        
         # Add fallback voice
         voices.append({
             'id': 'fallback',
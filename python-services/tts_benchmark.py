@@ -0,0 +1,272 @@
+#!/usr/bin/env python3
+"""
+TTS benchmark harness
+Runs a fixed corpus of short/medium/long Hebrew texts through the service entry points of each
+engine (tts.generate_with_coqui, generate_with_piper, generate_fallback_tts, voice backends) and
+through stream_hebrew_tts, each engine in a fresh process so cold-load time and peak RSS are real.
+Reports cold-load time, cold and warm latency, real-time factor, first-chunk latency and peak RSS as JSON.
+With --baseline it fails when any metric regresses by more than --threshold.
+
+    python tts_benchmark.py --output results.json
+    python tts_benchmark.py --baseline results.json --threshold 0.2
+"""
+import argparse
+import asyncio
+import json
+import os
+import resource
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+CORPUS = {
+    'short': "שלום, איך אפשר לעזור?",
+    'medium': (
+        "תודה שפנית אלינו. בדקתי את הזמנתך והיא אושרה בהצלחה. "
+        "התור שלך נקבע ליום שלישי בשעה עשר בבוקר."
+    ),
+    'long': (
+        "ברוכים הבאים למרפאה שלנו. לפני הביקור הראשון, חשוב להגיע עשר דקות מוקדם יותר כדי להשלים את הרישום. "
+        "יש להביא תעודה מזהה, כרטיס קופת חולים ורשימה של התרופות שאתם נוטלים כרגע. "
+        "אם אינכם יכולים להגיע, אנא הודיעו לנו לפחות עשרים וארבע שעות מראש, כדי שנוכל לתת את התור למטופל אחר. "
+        "החניה במקום חינם למבקרים, והכניסה נגישה לכיסאות גלגלים. "
+        "לכל שאלה נוספת, הצוות שלנו זמין בטלפון ובצ'אט בין השעות שמונה בבוקר לשש בערב."
+    )
+}
+
+DEFAULT_REPEATS = int(os.getenv('TTS_BENCH_REPEATS', 3))
+DEFAULT_THRESHOLD = float(os.getenv('TTS_BENCH_THRESHOLD', 0.2))
+# Latency changes smaller than this are timer noise, whatever the relative change
+DEFAULT_MIN_DELTA_MS = float(os.getenv('TTS_BENCH_MIN_DELTA_MS', 5))
+
+# Plain voice id, so the default engine of the worker is used
+DEFAULT_VOICE = 'hebrew_female'
+
+# Engine -> tts.py entry point; voices with their own backend go through generate_with_voice_backend
+ENTRY_POINTS = {
+    'coqui': 'generate_with_coqui',
+    'piper': 'generate_with_piper',
+    'fallback': 'generate_fallback_tts'
+}
+
+# Lower is better for every compared metric
+ENGINE_METRICS = ('cold_load_s', 'peak_rss_bytes')
+TEXT_METRICS = ('cold_latency_ms', 'warm_latency_ms', 'rtf', 'first_chunk_ms')
+
+
+def get_targets():
+    """Benchmark name -> (engine, voice to request)"""
+    from tts_voices import VOICES
+
+    targets = {'fallback': ('fallback', DEFAULT_VOICE)}
+    try:
+        import TTS  # noqa: F401
+        targets['coqui'] = ('coqui', DEFAULT_VOICE)
+    except ImportError:
+        pass
+    try:
+        import piper  # noqa: F401
+        targets['piper'] = ('piper', DEFAULT_VOICE)
+    except ImportError:
+        pass
+    for voice_id, backend in VOICES.items():
+        targets[voice_id] = (backend['engine'], voice_id)
+    return targets
+
+
+def get_peak_rss():
+    # ru_maxrss is in KiB on Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+async def measure_engine(tts, generate, voice, repeats, cache_root):
+    """Time the entry point and the streaming generator on every corpus text"""
+    from tts_cache import TTSCache
+
+    async def timed_generate(text):
+        # Fresh, empty cache per call: the run measures synthesis, not a cache read
+        tts.tts_cache = TTSCache(tempfile.mkdtemp(dir=cache_root), '/benchmark')
+        started_at = time.perf_counter()
+        result = await generate(text, 'he', voice)
+        return result, time.perf_counter() - started_at
+
+    async def first_chunk(text):
+        # What a streaming client waits for before hearing anything
+        started_at = time.perf_counter()
+        latency = None
+        async for _ in tts.stream_hebrew_tts(text, 'he', voice):
+            if latency is None:
+                latency = time.perf_counter() - started_at
+        return latency
+
+    texts = {}
+    for category, text in CORPUS.items():
+        # First synthesis after load pays for lazy initialisation
+        result, cold_latency = await timed_generate(text)
+        audio_seconds = result['duration']
+
+        latencies = []
+        first_chunk_latencies = []
+        for _ in range(repeats):
+            latencies.append((await timed_generate(text))[1])
+            first_chunk_latencies.append(await first_chunk(text))
+
+        warm_latency = statistics.median(latencies)
+        texts[category] = {
+            'chars': len(text),
+            'audio_seconds': round(audio_seconds, 3),
+            'cold_latency_ms': round(cold_latency * 1000, 2),
+            'warm_latency_ms': round(warm_latency * 1000, 2),
+            'rtf': round(warm_latency / audio_seconds, 4) if audio_seconds else None,
+            'first_chunk_ms': round(statistics.median(first_chunk_latencies) * 1000, 2)
+        }
+    return texts
+
+
+def run_engine(name, repeats):
+    """Measure one engine in this (fresh) process"""
+    from functools import partial
+
+    import tts
+    from tts_registry import registry
+    from tts_voices import get_voice_backend
+
+    engine, voice = get_targets()[name]
+
+    # Only this engine counts as installed in the worker, so generate_hebrew_tts's
+    # selection and stream_hebrew_tts pick it like a deployment with just this engine would
+    tts.COQUI_AVAILABLE = engine == 'coqui'
+    tts.PIPER_AVAILABLE = engine == 'piper'
+
+    backend = get_voice_backend(voice)
+    if backend:
+        model = backend['model']
+        generate = partial(tts.generate_with_voice_backend, backend)
+    else:
+        # Piper and the fallback are placeholders in tts.py, with no model to load
+        model = tts.COQUI_MODEL if engine == 'coqui' else None
+        generate = getattr(tts, ENTRY_POINTS[engine])
+
+    started_at = time.perf_counter()
+    if model:
+        registry.get(engine, model)
+    cold_load = time.perf_counter() - started_at
+
+    cache_root = tempfile.mkdtemp(prefix='tts_benchmark_')
+    try:
+        texts = asyncio.run(measure_engine(tts, generate, voice, repeats, cache_root))
+    finally:
+        shutil.rmtree(cache_root, ignore_errors=True)
+
+    return {
+        'engine': engine,
+        'model': model,
+        'cold_load_s': round(cold_load, 3),
+        'peak_rss_bytes': get_peak_rss(),
+        'texts': texts
+    }
+
+
+def run_benchmark(names, repeats):
+    """Run every engine in its own subprocess and collect the results"""
+    results = {}
+    for name in names:
+        print(f"⏱️ Benchmarking {name}...", file=sys.stderr)
+        process = subprocess.run(
+            [sys.executable, os.path.abspath(__file__), '--worker', name, '--repeats', str(repeats)],
+            capture_output=True, text=True, cwd=os.path.dirname(os.path.abspath(__file__))
+        )
+        if process.returncode != 0:
+            print(f"❌ {name} failed:\n{process.stderr}", file=sys.stderr)
+            results[name] = {'error': process.stderr.strip().splitlines()[-1] if process.stderr.strip() else 'failed'}
+            continue
+        # Engines may print while loading, the result is the last line
+        results[name] = json.loads(process.stdout.strip().splitlines()[-1])
+
+    return {
+        'created_at': time.time(),
+        'repeats': repeats,
+        'cpu_count': os.cpu_count(),
+        'engines': results
+    }
+
+
+def find_regressions(current, baseline, threshold, min_delta_ms=DEFAULT_MIN_DELTA_MS):
+    """Metrics that got worse than the baseline by more than threshold (as a fraction)"""
+    regressions = []
+
+    def compare(label, now, before, delta_ms=None):
+        if now is None or not before:
+            return
+        if delta_ms is not None and delta_ms < min_delta_ms:
+            return
+        change = (now - before) / before
+        if change > threshold:
+            regressions.append({'metric': label, 'baseline': before, 'current': now, 'change': round(change, 4)})
+
+    for name, result in current['engines'].items():
+        previous = baseline.get('engines', {}).get(name)
+        if not previous or 'error' in result or 'error' in previous:
+            continue
+        for metric in ENGINE_METRICS:
+            compare(f'{name}.{metric}', result.get(metric), previous.get(metric))
+        for category, metrics in result['texts'].items():
+            previous_metrics = previous.get('texts', {}).get(category, {})
+            for metric in TEXT_METRICS:
+                now, before = metrics.get(metric), previous_metrics.get(metric)
+                if now is None or before is None:
+                    continue
+                # RTF is latency per audio second, so the noise floor scales with the clip length
+                delta_ms = (now - before) * (metrics['audio_seconds'] * 1000 if metric == 'rtf' else 1)
+                compare(f'{name}.{category}.{metric}', now, before, delta_ms)
+
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--engines', help='Comma-separated engines (default: every available one)')
+    parser.add_argument('--repeats', type=int, default=DEFAULT_REPEATS, help='Warm runs per text')
+    parser.add_argument('--output', help='Write results JSON here (default: stdout)')
+    parser.add_argument('--baseline', help='Previous results JSON to compare against')
+    parser.add_argument('--threshold', type=float, default=DEFAULT_THRESHOLD,
+                        help='Allowed regression as a fraction, e.g. 0.2 = 20%% slower')
+    parser.add_argument('--min-delta-ms', type=float, default=DEFAULT_MIN_DELTA_MS,
+                        help='Ignore latency changes smaller than this many milliseconds')
+    parser.add_argument('--worker', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        print(json.dumps(run_engine(args.worker, args.repeats)))
+        return 0
+
+    names = args.engines.split(',') if args.engines else list(get_targets())
+    results = run_benchmark(names, args.repeats)
+
+    if args.baseline:
+        with open(args.baseline, encoding='utf-8') as f:
+            baseline = json.load(f)
+        results['baseline'] = args.baseline
+        results['threshold'] = args.threshold
+        results['regressions'] = find_regressions(results, baseline, args.threshold, args.min_delta_ms)
+
+    output = json.dumps(results, indent=2, ensure_ascii=False)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.write(output)
+    else:
+        print(output)
+
+    failed = [name for name, result in results['engines'].items() if 'error' in result]
+    for regression in results.get('regressions', []):
+        print(f"❌ Regression in {regression['metric']}: {regression['baseline']} -> {regression['current']} "
+              f"(+{regression['change'] * 100:.1f}%)", file=sys.stderr)
+
+    return 1 if results.get('regressions') or failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
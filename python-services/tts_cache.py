@@ -0,0 +1,207 @@
+"""
+Content-addressed TTS output cache
+Audio is keyed by hash(normalized text, language, voice, engine, model version),
+stored in sharded directories and kept under a total byte budget with LRU eviction;
+pinned entries are never evicted
+"""
+import hashlib
+import json
+import os
+import threading
+import time
+import unicodedata
+import uuid
+from collections import OrderedDict
+from pathlib import Path
+
+DEFAULT_MAX_BYTES = int(os.getenv('TTS_CACHE_MAX_BYTES', 1024 * 1024 * 1024))
+
+# Bump when the stored audio format changes so old entries are not reused
+CACHE_FORMAT_VERSION = 2
+
+# Temp files older than this were left by a crashed synthesis; younger ones may belong to
+# another worker process that is still writing
+STALE_TEMP_SECONDS = 600
+
+
+def normalize_text(text):
+    """Canonical form of the text used for cache keys"""
+    return ' '.join(unicodedata.normalize('NFC', text).split())
+
+
+class TTSCache:
+    """Disk cache of synthesized audio with byte-budget LRU eviction"""
+
+    def __init__(self, root_dir, url_prefix, max_bytes=DEFAULT_MAX_BYTES, extension='wav'):
+        self.root_dir = Path(root_dir)
+        self.url_prefix = url_prefix.rstrip('/')
+        self.max_bytes = max_bytes
+        self.extension = extension
+        self.lock = threading.Lock()
+
+        self.entries = OrderedDict()  # key -> size in bytes, least recently used first
+        self.pinned = set()
+        self.total_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+        self.root_dir.mkdir(parents=True, exist_ok=True)
+        self._load_index()
+
+    def _load_index(self):
+        """Rebuild the LRU order from the files already on disk"""
+        found = []
+        now = time.time()
+        for audio_path in self.root_dir.glob(f'*/*/*.{self.extension}'):
+            try:
+                stat = audio_path.stat()
+            except OSError:
+                continue
+            if audio_path.name.startswith('.'):
+                continue
+            found.append((stat.st_mtime, audio_path.stem, stat.st_size))
+
+        # Hidden .key.uuid temp files (audio and metadata) are never cache entries
+        for temp_path in self.root_dir.glob('*/*/.*'):
+            try:
+                if now - temp_path.stat().st_mtime > STALE_TEMP_SECONDS:
+                    temp_path.unlink()
+            except OSError:
+                continue
+
+        for _, key, size in sorted(found):
+            self.entries[key] = size
+            self.total_bytes += size
+
+        for pin_path in self.root_dir.glob('*/*/*.pin'):
+            self.pinned.add(pin_path.stem)
+
+    def make_key(self, text, language, voice, engine, model):
+        """Cache key for one synthesis request"""
+        payload = json.dumps(
+            [CACHE_FORMAT_VERSION, normalize_text(text), language, voice, engine, model],
+            ensure_ascii=False
+        )
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+    def relative_path(self, key):
+        """Two-level sharding keeps directories small"""
+        return f'{key[:2]}/{key[2:4]}/{key}.{self.extension}'
+
+    def audio_path(self, key):
+        return self.root_dir / self.relative_path(key)
+
+    def metadata_path(self, key):
+        return self.audio_path(key).with_suffix('.json')
+
+    def pin_path(self, key):
+        return self.audio_path(key).with_suffix('.pin')
+
+    def audio_url(self, key):
+        return f'{self.url_prefix}/{self.relative_path(key)}'
+
+    def get(self, key):
+        """Return the cached result for a key, or None"""
+        audio_path = self.audio_path(key)
+        try:
+            with open(self.metadata_path(key), encoding='utf-8') as f:
+                result = json.load(f)
+            # Touch so LRU order survives restarts
+            os.utime(audio_path)
+        except (OSError, ValueError):
+            with self.lock:
+                self.misses += 1
+            return None
+
+        with self.lock:
+            self.hits += 1
+            if key in self.entries:
+                self.entries.move_to_end(key)
+            else:
+                # Written by another worker process
+                self.entries[key] = audio_path.stat().st_size
+                self.total_bytes += self.entries[key]
+
+        return {**result, 'audio_url': self.audio_url(key), 'cached': True}
+
+    def temp_path(self, key):
+        """Unique path to synthesize into before the result is committed with put()"""
+        audio_path = self.audio_path(key)
+        audio_path.parent.mkdir(parents=True, exist_ok=True)
+        return audio_path.with_name(f'.{key}.{uuid.uuid4().hex}.{self.extension}')
+
+    def put(self, key, temp_path, result, pinned=False):
+        """Atomically move synthesized audio into the cache and record its metadata"""
+        audio_path = self.audio_path(key)
+        metadata_path = self.metadata_path(key)
+        result = {name: value for name, value in result.items() if name not in ('audio_url', 'cached')}
+
+        metadata_temp = metadata_path.with_name(f'.{key}.{uuid.uuid4().hex}.json')
+        with open(metadata_temp, 'w', encoding='utf-8') as f:
+            json.dump({**result, 'created_at': time.time()}, f, ensure_ascii=False)
+
+        os.replace(temp_path, audio_path)
+        os.replace(metadata_temp, metadata_path)
+        if pinned:
+            self.pin(key)
+
+        size = audio_path.stat().st_size
+        with self.lock:
+            self.total_bytes += size - self.entries.pop(key, 0)
+            self.entries[key] = size
+        self._evict(keep=key)
+
+        return {**result, 'audio_url': self.audio_url(key), 'cached': False}
+
+    def pin(self, key):
+        """Exclude an entry from eviction; the pin survives restarts"""
+        pin_path = self.pin_path(key)
+        pin_path.parent.mkdir(parents=True, exist_ok=True)
+        pin_path.touch()
+        with self.lock:
+            self.pinned.add(key)
+
+    def unpin(self, key):
+        try:
+            self.pin_path(key).unlink()
+        except OSError:
+            pass
+        with self.lock:
+            self.pinned.discard(key)
+        self._evict()
+
+    def _evict(self, keep=None):
+        """Delete least recently used entries until the cache fits its budget"""
+        while True:
+            with self.lock:
+                if self.total_bytes <= self.max_bytes:
+                    return
+                victim = next(
+                    (key for key in self.entries if key != keep and key not in self.pinned), None
+                )
+                if victim is None:
+                    return
+                self.total_bytes -= self.entries.pop(victim)
+                self.evictions += 1
+
+            for path in (self.audio_path(victim), self.metadata_path(victim)):
+                try:
+                    path.unlink()
+                except OSError:
+                    pass
+
+    def get_stats(self):
+        """Counters for health reporting"""
+        with self.lock:
+            lookups = self.hits + self.misses
+            return {
+                'entries': len(self.entries),
+                'pinned': len(self.pinned),
+                'bytes': self.total_bytes,
+                'max_bytes': self.max_bytes,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'hit_rate': round(self.hits / lookups, 4) if lookups else 0.0
+            }
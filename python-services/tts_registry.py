@@ -0,0 +1,221 @@
+"""
+Process-wide registry of resident TTS engines
+Each (engine, model, voice) is loaded once, optionally warmed with a dummy synthesis,
+and shared across requests; load time, memory, latency and real-time factor per model are recorded
+"""
+import io
+import os
+import threading
+import time
+import wave
+
+import numpy as np
+
+from audio_sink import to_float32_mono
+
+WARMUP_TEXT = "שלום"
+
+
+def get_rss_bytes():
+    """Resident set size of this process"""
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, IndexError):
+        import resource
+        # ru_maxrss is in KiB on Linux; peak rather than current elsewhere
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+class TTSEngineRegistry:
+    """Loads TTS engines on first use and keeps them resident for the life of the process"""
+
+    def __init__(self):
+        self.loaders = {}  # engine -> load(model, voice)
+        self.warmers = {}  # engine -> warm(instance, voice)
+        self.synthesizers = {}  # engine -> synthesize(instance, text, language, voice) -> (audio, sample_rate)
+        self.engines = {}  # (engine, model, voice) -> instance
+        self.stats = {}
+        self.synthesis_stats = {}  # (engine, model) -> {'calls', 'latency', 'audio_seconds'}
+        self.lock = threading.Lock()
+        # Loads are serialised so the RSS delta is attributable to one model
+        self.load_lock = threading.Lock()
+
+    def register(self, engine, loader, warmer=None, synthesizer=None):
+        """Register how to load, warm up and run an engine type"""
+        self.loaders[engine] = loader
+        if warmer:
+            self.warmers[engine] = warmer
+        if synthesizer:
+            self.synthesizers[engine] = synthesizer
+
+    def get(self, engine, model, voice=None):
+        """Return the resident instance, loading it on first use"""
+        key = (engine, model, voice)
+
+        with self.lock:
+            instance = self.engines.get(key)
+        if instance is not None:
+            return instance
+
+        with self.load_lock:
+            # Another request may have loaded it while we waited
+            with self.lock:
+                instance = self.engines.get(key)
+            if instance is not None:
+                return instance
+
+            if engine not in self.loaders:
+                raise ValueError(f"Unknown TTS engine: {engine}")
+
+            rss_before = get_rss_bytes()
+            started_at = time.perf_counter()
+            instance = self.loaders[engine](model, voice)
+            load_time = time.perf_counter() - started_at
+
+            with self.lock:
+                self.engines[key] = instance
+                self.stats[key] = {
+                    'engine': engine,
+                    'model': model,
+                    'voice': voice,
+                    'load_time': round(load_time, 3),
+                    'memory_bytes': max(0, get_rss_bytes() - rss_before),
+                    'warmup_time': None,
+                    'loaded_at': time.time()
+                }
+
+            print(f"✅ Loaded TTS engine {engine}:{model} in {load_time:.2f}s")
+            return instance
+
+    def warm_up(self, engine, model, voice=None):
+        """Load an engine and run a dummy synthesis so the first request is fast"""
+        instance = self.get(engine, model, voice)
+
+        warmer = self.warmers.get(engine)
+        if warmer is None:
+            return instance
+
+        started_at = time.perf_counter()
+        try:
+            warmer(instance, voice)
+        except Exception as e:
+            print(f"⚠️ Warm-up of TTS engine {engine}:{model} failed: {e}")
+            return instance
+        warmup_time = time.perf_counter() - started_at
+
+        with self.lock:
+            self.stats[(engine, model, voice)]['warmup_time'] = round(warmup_time, 3)
+
+        return instance
+
+    def synthesize(self, engine, model, text, language='he', voice=None, split_sentences=True):
+        """
+        Synthesize with a resident engine, returns (float32 audio, sample_rate).
+        split_sentences=False skips the engine's own sentence splitter for text that is already one shard.
+        """
+        if engine not in self.synthesizers:
+            raise ValueError(f"TTS engine {engine} has no synthesizer registered")
+        # One instance per model; the voice is passed at synthesis time (e.g. as the speaker)
+        instance = self.get(engine, model)
+
+        started_at = time.perf_counter()
+        audio, sample_rate = self.synthesizers[engine](instance, text, language, voice, split_sentences)
+        # Every engine hands back the same internal format
+        audio = to_float32_mono(audio)
+        latency = time.perf_counter() - started_at
+
+        with self.lock:
+            stats = self.synthesis_stats.setdefault(
+                (engine, model), {'calls': 0, 'latency': 0.0, 'audio_seconds': 0.0}
+            )
+            stats['calls'] += 1
+            stats['latency'] += latency
+            stats['audio_seconds'] += len(audio) / sample_rate
+
+        return audio, sample_rate
+
+    def is_loaded(self, engine, model, voice=None):
+        with self.lock:
+            return (engine, model, voice) in self.engines
+
+    def get_stats(self):
+        """Load time, memory, synthesis latency and real-time factor for every resident model"""
+        with self.lock:
+            result = []
+            for (engine, model, voice), stats in self.stats.items():
+                stats = dict(stats)
+                synthesis = self.synthesis_stats.get((engine, model))
+                if synthesis and synthesis['calls']:
+                    stats['synthesis_calls'] = synthesis['calls']
+                    stats['avg_latency_ms'] = round(synthesis['latency'] / synthesis['calls'] * 1000, 1)
+                    # Seconds of compute per second of audio, below 1 is faster than real time
+                    stats['rtf'] = (
+                        round(synthesis['latency'] / synthesis['audio_seconds'], 3)
+                        if synthesis['audio_seconds'] else None
+                    )
+                result.append(stats)
+            return result
+
+
+def _load_coqui(model, voice):
+    from TTS.api import TTS
+    return TTS(model)
+
+
+def _warm_coqui(tts, voice):
+    kwargs = {'language': 'he'} if getattr(tts, 'is_multi_lingual', False) else {}
+    tts.tts(text=WARMUP_TEXT, **kwargs)
+
+
+def _synthesize_coqui(tts, text, language, voice, split_sentences=True):
+    kwargs = {'language': language} if getattr(tts, 'is_multi_lingual', False) else {}
+    audio = tts.tts(text=text, split_sentences=split_sentences, **kwargs)
+    return np.asarray(audio, dtype=np.float32), tts.synthesizer.output_sample_rate
+
+
+def _load_piper(model, voice):
+    import piper
+    return piper.PiperVoice.load(model)
+
+
+def _warm_piper(piper_voice, voice):
+    with wave.open(io.BytesIO(), 'wb') as wav_file:
+        piper_voice.synthesize(WARMUP_TEXT, wav_file)
+
+
+def _synthesize_piper(piper_voice, text, language, voice, split_sentences=True):
+    buffer = io.BytesIO()
+    with wave.open(buffer, 'wb') as wav_file:
+        piper_voice.synthesize(text, wav_file)
+    buffer.seek(0)
+    with wave.open(buffer, 'rb') as wav_file:
+        sample_rate = wav_file.getframerate()
+        pcm = np.frombuffer(wav_file.readframes(wav_file.getnframes()), dtype='<i2')
+    return pcm.astype(np.float32) / 32768, sample_rate
+
+
+def _load_onnx(model, voice):
+    from onnx_tts import OnnxTTSEngine
+    return OnnxTTSEngine(model)
+
+
+def _load_onnx_int8(model, voice):
+    from onnx_tts import OnnxTTSEngine
+    return OnnxTTSEngine(model, quantized=True)
+
+
+def _warm_onnx(engine, voice):
+    engine.synthesize(WARMUP_TEXT, voice)
+
+
+def _synthesize_onnx(engine, text, language, voice, split_sentences=True):
+    return engine.synthesize(text, voice)
+
+
+# Shared by every TTS code path in the process
+registry = TTSEngineRegistry()
+registry.register('coqui', _load_coqui, _warm_coqui, _synthesize_coqui)
+registry.register('piper', _load_piper, _warm_piper, _synthesize_piper)
+registry.register('onnx', _load_onnx, _warm_onnx, _synthesize_onnx)
+registry.register('onnx-int8', _load_onnx_int8, _warm_onnx, _synthesize_onnx)
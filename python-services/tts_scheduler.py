@@ -0,0 +1,173 @@
+"""
+Micro-batching scheduler for TTS inference
+Requests for the same (engine, model) that arrive within a short window are gathered into
+one batch and run on a dedicated worker thread; every request gets a future back.
+Background requests only run one at a time, when no interactive request is waiting.
+None of the registered engines has a batched forward pass, so a batch runs back to back on one
+hot model: the window buys deduplication of identical requests and one-batch-per-model
+serialization, at the cost of up to max_wait extra latency (TTS_BATCH_MAX_WAIT_MS=0 disables it)
+"""
+import asyncio
+import os
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+
+DEFAULT_MAX_BATCH_SIZE = int(os.getenv('TTS_BATCH_MAX_SIZE', 8))
+DEFAULT_MAX_WAIT = float(os.getenv('TTS_BATCH_MAX_WAIT_MS', 10)) / 1000
+DEFAULT_WORKERS = int(os.getenv('TTS_SCHEDULER_WORKERS', 2))
+
+
+class TTSScheduler:
+    """Gathers concurrent synthesis requests into short batching windows per model"""
+
+    def __init__(self, max_batch_size=DEFAULT_MAX_BATCH_SIZE, max_wait=DEFAULT_MAX_WAIT,
+                 workers=DEFAULT_WORKERS, name='tts'):
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait
+        self.workers = workers
+        self.name = name
+
+        # engine -> synthesize_batch(model, requests) -> [result or Exception], one per request
+        self.handlers = {}
+        self.pending = {}  # (engine, model) -> [(request, future, queued_at)]
+        self.background = {}  # same, for low-priority work such as pre-warming
+        self.running = set()  # batch keys with a batch on a worker, one at a time per model
+        self.background_running = False
+        self.condition = threading.Condition()
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix=name)
+        self.dispatcher = None
+
+        self.requests = 0
+        self.batches = 0
+        self.deduplicated = 0
+        self.cancelled = 0
+        self.total_queue_wait = 0.0
+
+    def register(self, engine, handler):
+        """Register the batch handler for an engine"""
+        self.handlers[engine] = handler
+
+    def submit(self, engine, model, text, language, voice=None, background=False):
+        """Queue one synthesis and return a concurrent.futures.Future for its result"""
+        if engine not in self.handlers:
+            raise ValueError(f"No TTS batch handler registered for {engine}")
+
+        future = Future()
+        request = {'text': text, 'language': language, 'voice': voice}
+
+        with self.condition:
+            self._ensure_dispatcher()
+            queues = self.background if background else self.pending
+            queues.setdefault((engine, model), []).append((request, future, time.perf_counter()))
+            self.requests += 1
+            self.condition.notify()
+
+        return future
+
+    async def synthesize(self, engine, model, text, language, voice=None, background=False):
+        """Await a synthesis without blocking the event loop"""
+        return await asyncio.wrap_future(self.submit(engine, model, text, language, voice, background))
+
+    def _ensure_dispatcher(self):
+        """Start the dispatcher thread on first use (caller holds the condition)"""
+        if self.dispatcher is None:
+            self.dispatcher = threading.Thread(target=self._dispatch, name=f'{self.name}-dispatch', daemon=True)
+            self.dispatcher.start()
+
+    def _dispatch(self):
+        while True:
+            with self.condition:
+                batch_key, batch, background = self._next_batch()
+                self.running.add(batch_key)
+                self.background_running = self.background_running or background
+                self.batches += 1
+            self.executor.submit(self._run_batch, batch_key, batch, background)
+
+    def _next_batch(self):
+        """Block until a batch is full or its oldest request has waited max_wait (caller holds the condition)"""
+        while True:
+            now = time.perf_counter()
+            timeout = None
+
+            for batch_key, queued in self.pending.items():
+                if not queued or batch_key in self.running:
+                    continue
+                remaining = queued[0][2] + self.max_wait - now
+                if len(queued) >= self.max_batch_size or remaining <= 0:
+                    batch = queued[:self.max_batch_size]
+                    del queued[:self.max_batch_size]
+                    return batch_key, batch, False
+                timeout = remaining if timeout is None else min(timeout, remaining)
+
+            # Background work goes one request at a time so it never holds a model for long
+            interactive_waiting = any(self.pending.values())
+            if not interactive_waiting and not self.background_running:
+                for batch_key, queued in self.background.items():
+                    if queued and batch_key not in self.running:
+                        return batch_key, [queued.pop(0)], True
+
+            self.condition.wait(timeout)
+
+    def _run_batch(self, batch_key, batch, background=False):
+        engine, model = batch_key
+        started_at = time.perf_counter()
+
+        # Identical requests in one window are synthesized once; requests whose callers
+        # already cancelled are skipped, and the rest can no longer be cancelled under us
+        unique = {}
+        cancelled = 0
+        for request, future, queued_at in batch:
+            if not future.set_running_or_notify_cancel():
+                cancelled += 1
+            else:
+                unique.setdefault((request['text'], request['language'], request['voice']), []).append(future)
+
+        requests = [
+            {'text': text, 'language': language, 'voice': voice}
+            for text, language, voice in unique
+        ]
+
+        try:
+            results = self.handlers[engine](model, requests) if requests else []
+            if len(results) != len(requests):
+                raise RuntimeError(f"Batch handler returned {len(results)} results for {len(requests)} requests")
+            # A failed request only fails itself (and its duplicates), never its batchmates
+            for futures, result in zip(unique.values(), results):
+                for future in futures:
+                    if isinstance(result, Exception):
+                        future.set_exception(result)
+                    else:
+                        future.set_result(result)
+        except Exception as e:
+            print(f"❌ TTS batch on {engine}:{model} failed: {e}")
+            for futures in unique.values():
+                for future in futures:
+                    if not future.done():
+                        future.set_exception(e)
+        finally:
+            with self.condition:
+                self.running.discard(batch_key)
+                if background:
+                    self.background_running = False
+                self.cancelled += cancelled
+                self.deduplicated += len(batch) - cancelled - len(requests)
+                self.total_queue_wait += sum(started_at - queued_at for _, _, queued_at in batch)
+                self.condition.notify()
+
+    def get_stats(self):
+        """Batching counters for health reporting"""
+        with self.condition:
+            return {
+                'workers': self.workers,
+                'max_batch_size': self.max_batch_size,
+                'max_wait_ms': self.max_wait * 1000,
+                'requests': self.requests,
+                'batches': self.batches,
+                'avg_batch_size': round(self.requests / self.batches, 2) if self.batches else 0.0,
+                'deduplicated': self.deduplicated,
+                'cancelled': self.cancelled,
+                'avg_queue_wait_ms': round(self.total_queue_wait / self.requests * 1000, 2) if self.requests else 0.0,
+                'pending': sum(len(queued) for queued in self.pending.values()),
+                'background_pending': sum(len(queued) for queued in self.background.values())
+            }
@@ -0,0 +1,184 @@
+"""
+Parallel sentence-sharded TTS synthesis
+Long text is sharded at sentence and clause boundaries, shards are synthesized in a
+process pool (one resident model per worker) and joined with short crossfades at a
+consistent loudness. Opt-in: every worker holds a full copy of the model
+"""
+import multiprocessing
+import os
+import re
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from tts_streaming import split_sentences
+
+DEFAULT_WORKERS = int(os.getenv('TTS_SHARD_WORKERS', min(4, os.cpu_count() or 1)))
+DEFAULT_SHARD_CHARS = int(os.getenv('TTS_SHARD_CHARS', 120))
+DEFAULT_MIN_PARALLEL_CHARS = int(os.getenv('TTS_SHARD_MIN_TEXT_CHARS', 200))
+# Shard long texts without being asked (parallel=None); off by default because of the extra model copies
+AUTO_SHARD = os.getenv('TTS_SHARD_AUTO', 'false').lower() == 'true'
+
+CROSSFADE_SECONDS = 0.02
+LOUDNESS_FRAME_SECONDS = 0.02
+SILENCE_GATE = 0.01  # frames quieter than this RMS do not count towards loudness
+MAX_GAIN = 2.0
+PEAK_LIMIT = 0.99
+
+CLAUSE_PATTERN = re.compile(r'[^,;:–—]+[,;:–—]*')
+
+
+def split_clauses(sentence, max_chars):
+    """Split an over-long sentence at clause punctuation, then at word boundaries"""
+    pieces = []
+    for match in CLAUSE_PATTERN.finditer(sentence):
+        clause = match.group().strip()
+        while len(clause) > max_chars:
+            cut = clause.rfind(' ', 0, max_chars)
+            cut = cut if cut > 0 else max_chars
+            pieces.append(clause[:cut].strip())
+            clause = clause[cut:].strip()
+        if clause:
+            pieces.append(clause)
+    return pieces
+
+
+def split_shards(text, max_chars=DEFAULT_SHARD_CHARS):
+    """Pack sentences (or clauses of long sentences) into shards of at most max_chars"""
+    shards = []
+    current = ''
+    for sentence in split_sentences(text):
+        pieces = [sentence] if len(sentence) <= max_chars else split_clauses(sentence, max_chars)
+        for piece in pieces:
+            if current and len(current) + 1 + len(piece) > max_chars:
+                shards.append(current)
+                current = piece
+            else:
+                current = f'{current} {piece}' if current else piece
+    if current:
+        shards.append(current)
+    return shards
+
+
+def speech_rms(audio, sample_rate):
+    """RMS over frames that contain speech, ignoring pauses"""
+    frame = max(1, int(sample_rate * LOUDNESS_FRAME_SECONDS))
+    usable = len(audio) - len(audio) % frame
+    if usable == 0:
+        return float(np.sqrt(np.mean(np.square(audio)))) if len(audio) else 0.0
+
+    frame_rms = np.sqrt(np.mean(np.square(audio[:usable].reshape(-1, frame)), axis=1))
+    voiced = frame_rms[frame_rms > SILENCE_GATE]
+    if len(voiced) == 0:
+        return 0.0
+    return float(np.sqrt(np.mean(np.square(voiced))))
+
+
+def match_loudness(shards, sample_rate):
+    """Scale every shard to the median speech loudness so joins are not audible"""
+    levels = np.array([speech_rms(audio, sample_rate) for audio in shards])
+    voiced = levels[levels > 0]
+    if len(voiced) == 0:
+        return shards
+
+    target = float(np.median(voiced))
+    gains = np.where(levels > 0, target / np.maximum(levels, 1e-9), 1.0)
+    gains = np.clip(gains, 1.0 / MAX_GAIN, MAX_GAIN)
+    return [audio * np.float32(gain) for audio, gain in zip(shards, gains)]
+
+
+def crossfade_concat(shards, sample_rate, crossfade_seconds=CROSSFADE_SECONDS):
+    """Join shards with short equal-power crossfades into one preallocated buffer"""
+    shards = [np.asarray(audio, dtype=np.float32) for audio in shards if len(audio)]
+    if not shards:
+        return np.zeros(0, dtype=np.float32)
+
+    fade = int(sample_rate * crossfade_seconds)
+    overlaps = [min(fade, len(previous), len(audio)) for previous, audio in zip(shards, shards[1:])]
+    output = np.empty(sum(len(audio) for audio in shards) - sum(overlaps), dtype=np.float32)
+
+    output[:len(shards[0])] = shards[0]
+    position = len(shards[0])
+    for audio, overlap in zip(shards[1:], overlaps):
+        start = position - overlap
+        if overlap:
+            ramp = np.linspace(0, np.pi / 2, overlap, dtype=np.float32)
+            output[start:position] = output[start:position] * np.cos(ramp) + audio[:overlap] * np.sin(ramp)
+        output[position:start + len(audio)] = audio[overlap:]
+        position = start + len(audio)
+
+    peak = float(np.max(np.abs(output))) if len(output) else 0.0
+    if peak > PEAK_LIMIT:
+        output *= np.float32(PEAK_LIMIT / peak)
+    return output
+
+
+def _init_worker(engine, model, torch_threads):
+    """Load the engine once per worker process, with a fair share of the cores"""
+    if torch_threads:
+        try:
+            import torch
+            torch.set_num_threads(torch_threads)
+        except ImportError:
+            pass
+
+    from tts_registry import registry
+    registry.warm_up(engine, model)
+
+
+def _synthesize_shard(engine, model, text, language, voice):
+    from tts_registry import registry
+    # Shards are already cut at sentence and clause boundaries
+    return registry.synthesize(engine, model, text, language, voice, split_sentences=False)
+
+
+class ShardedSynthesizer:
+    """Synthesizes long text as parallel shards in a pool of worker processes"""
+
+    def __init__(self, engine, model, workers=DEFAULT_WORKERS, shard_chars=DEFAULT_SHARD_CHARS,
+                 min_parallel_chars=DEFAULT_MIN_PARALLEL_CHARS, auto=AUTO_SHARD):
+        self.engine = engine
+        self.model = model
+        self.workers = workers
+        self.shard_chars = shard_chars
+        self.min_parallel_chars = min_parallel_chars
+        self.auto = auto
+        self.executor = None
+
+    def should_shard(self, text):
+        """Whether a request that did not choose a mode gets sharded"""
+        return self.auto and self.workers > 1 and len(text) >= self.min_parallel_chars
+
+    def get_executor(self):
+        if self.executor is None:
+            torch_threads = max(1, (os.cpu_count() or 1) // self.workers)
+            # Spawn, not fork: the parent may already hold torch threads and a loaded model
+            self.executor = ProcessPoolExecutor(
+                max_workers=self.workers,
+                mp_context=multiprocessing.get_context('spawn'),
+                initializer=_init_worker,
+                initargs=(self.engine, self.model, torch_threads)
+            )
+        return self.executor
+
+    def synthesize(self, text, language='he', voice=None):
+        """Returns (audio, sample_rate, shard_count) for the whole text"""
+        shards = split_shards(text, self.shard_chars)
+        if not shards:
+            return np.zeros(0, dtype=np.float32), 22050, 0
+
+        executor = self.get_executor()
+        futures = [
+            executor.submit(_synthesize_shard, self.engine, self.model, shard, language, voice)
+            for shard in shards
+        ]
+        results = [future.result() for future in futures]
+
+        sample_rate = results[0][1]
+        audio = crossfade_concat(match_loudness([audio for audio, _ in results], sample_rate), sample_rate)
+        return audio, sample_rate, len(shards)
+
+    def shutdown(self):
+        if self.executor is not None:
+            self.executor.shutdown(wait=False, cancel_futures=True)
+            self.executor = None
@@ -0,0 +1,107 @@
+"""
+Sentence-level streaming helpers for TTS
+Text is split into sentences that are synthesized one by one, each chunk is sent as soon as
+it is ready, and the latency to the first chunk is tracked per stream
+"""
+import os
+import re
+import threading
+import time
+from collections import deque
+
+import numpy as np
+
+# Sentence ends on terminal punctuation (including Hebrew sof pasuq) or a line break
+SENTENCE_PATTERN = re.compile(r'[^.!?…׃\n]+(?:[.!?…׃]+|\n|$)')
+
+# Fragments shorter than this are merged into the following sentence
+MIN_SENTENCE_CHARS = int(os.getenv('TTS_STREAM_MIN_SENTENCE_CHARS', 8))
+
+LATENCY_HISTORY = 200
+
+
+def split_sentences(text, min_chars=MIN_SENTENCE_CHARS):
+    """Split text into sentences for incremental synthesis"""
+    sentences = []
+    pending = ''
+    for match in SENTENCE_PATTERN.finditer(text):
+        sentence = ' '.join(match.group().split())
+        if not sentence:
+            continue
+        pending = f'{pending} {sentence}' if pending else sentence
+        if len(pending) >= min_chars:
+            sentences.append(pending)
+            pending = ''
+
+    if pending:
+        if sentences:
+            sentences[-1] = f'{sentences[-1]} {pending}'
+        else:
+            sentences.append(pending)
+    return sentences
+
+
+class StreamLatencyTracker:
+    """Records time-to-first-chunk and total time of recent streams"""
+
+    def __init__(self, history=LATENCY_HISTORY):
+        self.first_chunk_latencies = deque(maxlen=history)
+        self.total_times = deque(maxlen=history)
+        self.streams = 0
+        self.lock = threading.Lock()
+
+    def start(self):
+        return StreamTimer(self)
+
+    def record(self, first_chunk_latency, total_time):
+        with self.lock:
+            self.streams += 1
+            if first_chunk_latency is not None:
+                self.first_chunk_latencies.append(first_chunk_latency)
+            self.total_times.append(total_time)
+
+    def get_stats(self):
+        """Latency percentiles over recent streams, in milliseconds"""
+        with self.lock:
+            latencies = np.array(self.first_chunk_latencies, dtype=np.float64) * 1000
+            totals = np.array(self.total_times, dtype=np.float64) * 1000
+            streams = self.streams
+
+        if len(latencies) == 0:
+            return {'streams': streams}
+        return {
+            'streams': streams,
+            'first_chunk_ms_p50': round(float(np.percentile(latencies, 50)), 1),
+            'first_chunk_ms_p95': round(float(np.percentile(latencies, 95)), 1),
+            'first_chunk_ms_last': round(float(latencies[-1]), 1),
+            'total_ms_p50': round(float(np.percentile(totals, 50)), 1)
+        }
+
+
+class StreamTimer:
+    """Times one stream from request to first chunk and to completion"""
+
+    def __init__(self, tracker):
+        self.tracker = tracker
+        self.started_at = time.perf_counter()
+        self.first_chunk_latency = None
+
+    def chunk_ready(self):
+        """Mark a chunk as ready; returns seconds since the stream started"""
+        elapsed = time.perf_counter() - self.started_at
+        if self.first_chunk_latency is None:
+            self.first_chunk_latency = elapsed
+            print(f"⏱️ First TTS chunk ready in {elapsed * 1000:.0f}ms")
+        return elapsed
+
+    def finish(self):
+        total_time = time.perf_counter() - self.started_at
+        self.tracker.record(self.first_chunk_latency, total_time)
+        return {
+            'first_chunk_latency': self.first_chunk_latency,
+            'total_time': total_time
+        }
+
+
+# Shared by every streaming TTS path in the process
+latency_tracker = StreamLatencyTracker()
@@ -0,0 +1,62 @@
+"""
+Per-voice TTS backend selection
+Maps voice ids to a registered engine and model, from a JSON file (TTS_VOICES_FILE) of the form
+{"voice_id": {"engine": "onnx", "model": "/models/he.onnx", "quantized": true, "name": "..."}}
+plus built-in ONNX voices when ONNX_HEBREW_MODEL is set
+"""
+import json
+import os
+
+VOICES_FILE = os.getenv('TTS_VOICES_FILE')
+ONNX_HEBREW_MODEL = os.getenv('ONNX_HEBREW_MODEL')
+
+
+def get_engine_name(config):
+    """Registry engine for a voice config; int8 ONNX models run as their own engine"""
+    engine = config.get('engine', 'onnx')
+    if engine == 'onnx' and config.get('quantized'):
+        return 'onnx-int8'
+    return engine
+
+
+def load_voices():
+    voices = {}
+
+    if ONNX_HEBREW_MODEL:
+        voices['onnx_hebrew'] = {'engine': 'onnx', 'model': ONNX_HEBREW_MODEL, 'name': 'Hebrew (ONNX)'}
+        voices['onnx_hebrew_int8'] = {
+            'engine': 'onnx', 'model': ONNX_HEBREW_MODEL, 'quantized': True, 'name': 'Hebrew (ONNX int8)'
+        }
+
+    if VOICES_FILE:
+        try:
+            with open(VOICES_FILE, encoding='utf-8') as f:
+                voices.update(json.load(f))
+        except (OSError, ValueError) as e:
+            print(f"❌ Failed to load TTS voices from {VOICES_FILE}: {e}")
+
+    return {
+        voice_id: {**config, 'engine': get_engine_name(config), 'language': config.get('language', 'he')}
+        for voice_id, config in voices.items()
+    }
+
+
+VOICES = load_voices()
+
+
+def get_voice_backend(voice):
+    """Engine/model config for a configured voice, or None to use the default engines"""
+    return VOICES.get(voice) if voice else None
+
+
+def list_voices(language=None):
+    return [
+        {
+            'id': voice_id,
+            'name': config.get('name', voice_id),
+            'language': config['language'],
+            'provider': config['engine']
+        }
+        for voice_id, config in VOICES.items()
+        if language is None or config['language'] == language
+    ]
@@ -0,0 +1,135 @@
+"""
+Streaming video encoder for lip sync
+Pipes raw BGR frames into a single ffmpeg process that also muxes the audio track
+"""
+import subprocess
+from pathlib import Path
+from typing import Optional
+
+import cv2
+
+
+class FFmpegVideoSink:
+    """
+    Encode frames in memory by writing raw BGR bytes to ffmpeg's stdin.
+    ffmpeg is started lazily on the first frame so the frame size comes from the data.
+    """
+
+    def __init__(self, output_path, audio_path: Optional[str] = None, frame_rate: float = 25.0,
+                 debug_dir: Optional[Path] = None, crf: int = 23, preset: str = 'veryfast'):
+        self.output_path = str(output_path)
+        self.audio_path = audio_path
+        self.frame_rate = frame_rate
+        self.debug_dir = Path(debug_dir) if debug_dir else None
+        self.crf = crf
+        self.preset = preset
+        self.process = None
+        self.frame_size = None
+        self.frame_count = 0
+
+        if self.debug_dir:
+            self.debug_dir.mkdir(parents=True, exist_ok=True)
+
+    def build_command(self, width, height):
+        """Build the ffmpeg command line for raw BGR input"""
+        cmd = [
+            'ffmpeg', '-y', '-loglevel', 'error',
+            '-f', 'rawvideo',
+            '-pix_fmt', 'bgr24',
+            '-s', f'{width}x{height}',
+            '-r', str(self.frame_rate),
+            '-i', '-',
+        ]
+
+        if self.audio_path:
+            cmd += ['-i', str(self.audio_path)]
+
+        cmd += [
+            '-c:v', 'libx264',
+            '-preset', self.preset,
+            '-crf', str(self.crf),
+            '-pix_fmt', 'yuv420p',
+        ]
+
+        if self.audio_path:
+            cmd += ['-c:a', 'aac', '-shortest']
+
+        cmd += ['-movflags', '+faststart', self.output_path]
+        return cmd
+
+    def start(self, width, height):
+        """Start the ffmpeg process"""
+        self.frame_size = (width, height)
+        self.process = subprocess.Popen(
+            self.build_command(width, height),
+            stdin=subprocess.PIPE,
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.PIPE
+        )
+
+    def write(self, frame):
+        """Write a single BGR frame"""
+        height, width = frame.shape[:2]
+
+        if self.process is None:
+            self.start(width, height)
+        elif (width, height) != self.frame_size:
+            raise ValueError(f"Frame size {width}x{height} does not match {self.frame_size[0]}x{self.frame_size[1]}")
+
+        if self.debug_dir:
+            cv2.imwrite(str(self.debug_dir / f'frame_{self.frame_count:04d}.jpg'), frame)
+
+        try:
+            self.process.stdin.write(memoryview(frame).cast('B') if frame.flags['C_CONTIGUOUS'] else frame.tobytes())
+        except BrokenPipeError:
+            self.close()
+            raise
+
+        self.frame_count += 1
+
+    def close(self):
+        """Flush stdin and wait for ffmpeg to finish writing the file"""
+        if self.process is None:
+            return
+
+        process, self.process = self.process, None
+        try:
+            process.stdin.close()
+        except BrokenPipeError:
+            pass
+
+        stderr = process.stderr.read()
+        process.stderr.close()
+        if process.wait() != 0:
+            raise RuntimeError(f"FFmpeg error: {stderr.decode(errors='replace')}")
+
+    def abort(self):
+        """Kill ffmpeg, release its pipes and remove the partial output file"""
+        if self.process is not None:
+            process, self.process = self.process, None
+            process.kill()
+            for pipe in (process.stdin, process.stderr):
+                try:
+                    pipe.close()
+                except OSError:
+                    pass
+            process.wait()
+
+        try:
+            Path(self.output_path).unlink()
+        except OSError:
+            pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            try:
+                self.close()
+            except Exception:
+                self.abort()
+                raise
+        else:
+            # Abort the encode without masking the original error
+            self.abort()
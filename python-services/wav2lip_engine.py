@@ -0,0 +1,244 @@
+"""
+Batched Wav2Lip inference engine for CPU
+Loads the model once per process, precomputes mel chunks for the whole clip
+and runs frames through the model in micro-batches under torch.inference_mode
+"""
+import os
+import threading
+import time
+
+import numpy as np
+import torch
+from torch import nn
+
+from audio_io import resample_linear
+
+# Wav2Lip audio hyperparameters
+MEL_SAMPLE_RATE = 16000
+N_FFT = 800
+HOP_SIZE = 200
+WIN_SIZE = 800
+NUM_MELS = 80
+FMIN = 55
+FMAX = 7600
+PREEMPHASIS = 0.97
+MIN_LEVEL_DB = -100
+REF_LEVEL_DB = 20
+MAX_ABS_VALUE = 4.0
+MEL_STEP_SIZE = 16
+
+FACE_SIZE = 96
+
+DEFAULT_BATCH_SIZE = int(os.getenv('WAV2LIP_BATCH_SIZE', 16))
+DEFAULT_THREADS = int(os.getenv('WAV2LIP_THREADS', 0))  # 0 keeps torch's default
+
+TINY_MODEL = 'tiny'
+
+_engines = {}
+_engines_lock = threading.Lock()
+_mel_basis = None
+
+
+# Slaney mel scale (librosa default): linear below 1 kHz, logarithmic above
+_F_SP = 200.0 / 3
+_MIN_LOG_HZ = 1000.0
+_MIN_LOG_MEL = _MIN_LOG_HZ / _F_SP
+_LOGSTEP = np.log(6.4) / 27.0
+
+
+def _hz_to_mel(freqs):
+    freqs = np.asarray(freqs, dtype=np.float64)
+    log_mels = _MIN_LOG_MEL + np.log(np.maximum(freqs, _MIN_LOG_HZ) / _MIN_LOG_HZ) / _LOGSTEP
+    return np.where(freqs >= _MIN_LOG_HZ, log_mels, freqs / _F_SP)
+
+
+def _mel_to_hz(mels):
+    mels = np.asarray(mels, dtype=np.float64)
+    log_freqs = _MIN_LOG_HZ * np.exp(_LOGSTEP * (mels - _MIN_LOG_MEL))
+    return np.where(mels >= _MIN_LOG_MEL, log_freqs, _F_SP * mels)
+
+
+def get_mel_basis():
+    """Slaney-normalised mel filterbank matching librosa.filters.mel for Wav2Lip's settings"""
+    global _mel_basis
+
+    if _mel_basis is None:
+        fft_freqs = np.linspace(0, MEL_SAMPLE_RATE / 2, 1 + N_FFT // 2)
+        mel_freqs = _mel_to_hz(np.linspace(_hz_to_mel(FMIN), _hz_to_mel(FMAX), NUM_MELS + 2))
+
+        fdiff = np.diff(mel_freqs)
+        ramps = mel_freqs[:, None] - fft_freqs[None, :]
+        lower = -ramps[:-2] / fdiff[:-1, None]
+        upper = ramps[2:] / fdiff[1:, None]
+        weights = np.maximum(0, np.minimum(lower, upper))
+
+        enorm = 2.0 / (mel_freqs[2:NUM_MELS + 2] - mel_freqs[:NUM_MELS])
+        _mel_basis = (weights * enorm[:, None]).astype(np.float32)
+
+    return _mel_basis
+
+
+def melspectrogram(audio):
+    """Normalised log-mel spectrogram (NUM_MELS, T) of 16 kHz audio, as in Wav2Lip's audio.py"""
+    audio = np.asarray(audio, dtype=np.float32)
+    emphasized = np.append(audio[0:1], audio[1:] - PREEMPHASIS * audio[:-1]) if len(audio) else audio
+
+    # Centred STFT with a periodic Hann window
+    padded = np.pad(emphasized, (N_FFT // 2, N_FFT // 2), mode='reflect' if len(emphasized) > N_FFT // 2 else 'constant')
+    frames = np.lib.stride_tricks.sliding_window_view(padded, WIN_SIZE)[::HOP_SIZE]
+    window = (0.5 - 0.5 * np.cos(2 * np.pi * np.arange(WIN_SIZE) / WIN_SIZE)).astype(np.float32)
+    magnitudes = np.abs(np.fft.rfft(frames * window, n=N_FFT, axis=1)).astype(np.float32)
+
+    mel = get_mel_basis() @ magnitudes.T
+    mel_db = 20 * np.log10(np.maximum(1e-5, mel)) - REF_LEVEL_DB
+
+    normalized = (2 * MAX_ABS_VALUE) * ((mel_db - MIN_LEVEL_DB) / -MIN_LEVEL_DB) - MAX_ABS_VALUE
+    return np.clip(normalized, -MAX_ABS_VALUE, MAX_ABS_VALUE).astype(np.float32)
+
+
+def mel_chunks_for_frames(mel, num_frames, frame_rate):
+    """Slice one (1, NUM_MELS, MEL_STEP_SIZE) mel window per video frame"""
+    if mel.shape[1] < MEL_STEP_SIZE:
+        mel = np.pad(mel, ((0, 0), (0, MEL_STEP_SIZE - mel.shape[1])), constant_values=-MAX_ABS_VALUE)
+
+    windows = np.lib.stride_tricks.sliding_window_view(mel, MEL_STEP_SIZE, axis=1)
+    mel_idx_multiplier = 80.0 / frame_rate
+    starts = np.minimum((np.arange(num_frames) * mel_idx_multiplier).astype(np.int64), windows.shape[1] - 1)
+
+    # (frames, mels, steps) -> (frames, 1, mels, steps)
+    return np.ascontiguousarray(windows[:, starts].transpose(1, 0, 2))[:, None]
+
+
+class TinyLipSyncModel(nn.Module):
+    """
+    Deterministic stand-in with Wav2Lip's input/output shapes.
+    Used for tests and benchmarks on CPU-only machines without the real checkpoint.
+    """
+
+    def __init__(self, seed=0):
+        super().__init__()
+        self.audio_encoder = nn.Sequential(
+            nn.Conv2d(1, 8, 3, stride=2, padding=1),
+            nn.ReLU(),
+            nn.AdaptiveAvgPool2d(1),
+            nn.Flatten(),
+            nn.Linear(8, 16)
+        )
+        self.face_encoder = nn.Sequential(
+            nn.Conv2d(6, 16, 3, stride=2, padding=1),
+            nn.ReLU()
+        )
+        self.decoder = nn.ConvTranspose2d(16, 3, 4, stride=2, padding=1)
+
+        generator = torch.Generator().manual_seed(seed)
+        with torch.no_grad():
+            for param in self.parameters():
+                param.copy_(torch.randn(param.shape, generator=generator) * 0.1)
+
+    def forward(self, audio_sequences, face_sequences):
+        audio_embedding = self.audio_encoder(audio_sequences)[:, :, None, None]
+        face_embedding = self.face_encoder(face_sequences)
+        return torch.sigmoid(self.decoder(face_embedding + audio_embedding))
+
+
+def load_wav2lip_model(checkpoint_path, device):
+    """Load a Wav2Lip checkpoint, falling back to TorchScript when the model code is unavailable"""
+    if checkpoint_path == TINY_MODEL:
+        return TinyLipSyncModel()
+
+    try:
+        # Model definition from the Wav2Lip repository
+        from models import Wav2Lip
+    except ImportError:
+        return torch.jit.load(checkpoint_path, map_location=device)
+
+    checkpoint = torch.load(checkpoint_path, map_location=device)
+    state_dict = checkpoint.get('state_dict', checkpoint)
+    model = Wav2Lip()
+    model.load_state_dict({key.replace('module.', '', 1): value for key, value in state_dict.items()})
+    return model
+
+
+class Wav2LipEngine:
+    """Runs a loaded model over whole clips in micro-batches"""
+
+    def __init__(self, model, device='cpu', batch_size=DEFAULT_BATCH_SIZE, name='wav2lip'):
+        self.model = model.to(device).eval()
+        self.device = device
+        self.batch_size = max(1, batch_size)
+        self.name = name
+        self.load_time = 0.0
+
+        self.frames_processed = 0
+        self.inference_time = 0.0
+        self.lock = threading.Lock()
+
+    def compute_mel(self, audio_data, sample_rate):
+        """Mel spectrogram of the whole clip at Wav2Lip's sample rate"""
+        return melspectrogram(resample_linear(audio_data, sample_rate, MEL_SAMPLE_RATE))
+
+    def prepare_mel_chunks(self, audio_data, sample_rate, num_frames, frame_rate):
+        """Precompute the mel windows for every frame of the clip"""
+        return mel_chunks_for_frames(self.compute_mel(audio_data, sample_rate), num_frames, frame_rate)
+
+    def prepare_face(self, face_image):
+        """Build the 6-channel (masked + reference) input for a 96x96 BGR face crop"""
+        face = torch.from_numpy(np.ascontiguousarray(face_image)).float().div_(255.0).permute(2, 0, 1)
+        masked = face.clone()
+        masked[:, FACE_SIZE // 2:] = 0
+        return torch.cat([masked, face], dim=0).to(self.device)
+
+    def infer(self, face_image, mel_chunks):
+        """
+        Yield (B, 96, 96, 3) uint8 BGR batches for each micro-batch of mel chunks.
+        The same reference face is broadcast across the batch without copying.
+        """
+        face_input = self.prepare_face(face_image)
+
+        for start in range(0, len(mel_chunks), self.batch_size):
+            mel_batch = torch.from_numpy(mel_chunks[start:start + self.batch_size]).to(self.device)
+            face_batch = face_input.unsqueeze(0).expand(len(mel_batch), -1, -1, -1)
+
+            started_at = time.perf_counter()
+            with self.lock, torch.inference_mode():
+                prediction = self.model(mel_batch, face_batch)
+                faces = prediction.permute(0, 2, 3, 1).clamp_(0, 1).mul_(255).to(torch.uint8).cpu().numpy()
+                self.frames_processed += len(mel_batch)
+                self.inference_time += time.perf_counter() - started_at
+
+            yield faces
+
+    def get_stats(self):
+        """Throughput counters"""
+        fps = self.frames_processed / self.inference_time if self.inference_time else 0.0
+        return {
+            'name': self.name,
+            'device': self.device,
+            'batch_size': self.batch_size,
+            'threads': torch.get_num_threads(),
+            'load_time': round(self.load_time, 3),
+            'frames_processed': self.frames_processed,
+            'frames_per_second': round(fps, 1)
+        }
+
+
+def get_engine(checkpoint_path=None, device='cpu', batch_size=DEFAULT_BATCH_SIZE, threads=DEFAULT_THREADS):
+    """Return the process-wide engine for a checkpoint, loading it on first use"""
+    checkpoint_path = checkpoint_path or os.getenv('WAV2LIP_CHECKPOINT')
+    if not checkpoint_path:
+        return None
+
+    key = (checkpoint_path, device)
+    with _engines_lock:
+        engine = _engines.get(key)
+        if engine is None:
+            if threads:
+                torch.set_num_threads(threads)
+
+            started_at = time.perf_counter()
+            model = load_wav2lip_model(checkpoint_path, device)
+            engine = Wav2LipEngine(model, device, batch_size, name=os.path.basename(checkpoint_path))
+            engine.load_time = time.perf_counter() - started_at
+            _engines[key] = engine
+
+    return engine